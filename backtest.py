@@ -0,0 +1,326 @@
+"""Historical backtest of the arbitrage strategy over recorded quotes.
+
+Instead of a constant ``spread_percentage``, each allocation trades only
+when the recorded market offers an edge: buying on its platform at the ask
+and selling at the best bid on any other venue, net of the platform's fee.
+Capital moves as in the cashflow model (``cashflow.py``): each platform
+deploys at most its ``daily_limit`` per day, deployed capital is locked for
+the platform's ``transfer_time``, and on arrival the principal plus the
+reinvested share of the profit is available again.
+
+Tick files (CSV or Parquet, with ``timestamp, venue, bid, ask`` columns, or
+OHLC bars with a ``close`` column) are streamed in chunks, so memory use
+depends on the chunk size rather than the file size. Each chunk is reduced
+to the last quote per venue in fixed time buckets, the net edge of every
+allocation is computed for all buckets at once, and only buckets with an
+actionable edge are stepped through one by one.
+"""
+import heapq
+import os
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from cashflow import HOURS_PER_MONTH, monthly_row
+from platforms import platform_arrays
+
+SECONDS_PER_DAY = 86400
+SECONDS_PER_MONTH = HOURS_PER_MONTH * 3600
+
+# Rows per chunk read from a tick file
+CHUNK_ROWS = 1000000
+
+
+@dataclass
+class BacktestResult:
+    simulation_df: pd.DataFrame     # same schema as run_simulation
+    trades_df: pd.DataFrame         # per allocation: trades, volume, profit, mean edge
+    ticks: int
+    buckets: int
+    actionable_buckets: int
+    start: float                    # first timestamp in the data
+    end: float                      # last timestamp in the data
+
+
+def epoch_seconds(timestamps):
+    """Timestamps as float seconds since the epoch; numbers pass through.
+
+    Datetimes may be naive (taken as UTC) or tz-aware, in any unit. Strings
+    such as ISO 8601 timestamps, with or without an offset, are parsed first.
+    """
+    if pd.api.types.is_object_dtype(timestamps) or pd.api.types.is_string_dtype(timestamps):
+        timestamps = pd.to_datetime(timestamps, utc=True)
+    if not pd.api.types.is_datetime64_any_dtype(timestamps):
+        return timestamps
+    if isinstance(timestamps.dtype, pd.DatetimeTZDtype):
+        timestamps = timestamps.dt.tz_convert(None)
+    return (timestamps - pd.Timestamp(0)) / pd.Timedelta(1, 's')
+
+
+def read_ticks(path, chunk_rows=CHUNK_ROWS):
+    """Yield DataFrames of ``timestamp, venue, bid, ask`` from a CSV or Parquet file, in chunks."""
+    extension = os.path.splitext(path)[1].lower()
+
+    if extension in ('.parquet', '.pq'):
+        import pyarrow.parquet as pq
+
+        parquet = pq.ParquetFile(path)
+        names = parquet.schema_arrow.names
+        columns = ['timestamp', 'venue'] + (['bid', 'ask'] if 'bid' in names else ['close'])
+        chunks = (batch.to_pandas() for batch in parquet.iter_batches(batch_size=chunk_rows, columns=columns))
+    elif extension in ('.csv', '.gz'):
+        header = pd.read_csv(path, nrows=0).columns
+        columns = ['timestamp', 'venue'] + (['bid', 'ask'] if 'bid' in header else ['close'])
+        chunks = pd.read_csv(path, usecols=columns, chunksize=chunk_rows, dtype={'venue': str})
+    else:
+        raise ValueError(f"Unsupported tick file format: {path}")
+
+    for chunk in chunks:
+        # OHLC bars trade at the close on both sides
+        if 'close' in chunk:
+            chunk = chunk.assign(bid=chunk['close'], ask=chunk['close'])
+        chunk = chunk.assign(timestamp=epoch_seconds(chunk['timestamp']))
+        yield chunk[['timestamp', 'venue', 'bid', 'ask']]
+
+
+def bucketed_chunks(chunks, bucket_seconds):
+    """Re-split tick chunks so no time bucket spans two of them.
+
+    Yields ``(start, chunk)`` pairs, where ``start`` is the first timestamp of
+    the data and bucket 0 begins.
+    """
+    start = None
+    leftover = None
+    for chunk in chunks:
+        if chunk.empty:
+            continue
+        if start is None:
+            start = float(chunk['timestamp'].iloc[0])
+        if leftover is not None:
+            chunk = pd.concat([leftover, chunk], ignore_index=True)
+
+        # Hold back the last bucket, which may continue in the next chunk
+        bucket = np.floor((chunk['timestamp'].to_numpy(dtype=float) - start) / bucket_seconds)
+        split = int(np.searchsorted(bucket, bucket[-1]))
+        leftover = chunk.iloc[split:]
+        if split:
+            yield start, chunk.iloc[:split]
+
+    if leftover is not None and len(leftover):
+        yield start, leftover
+
+
+def bucket_quotes(chunk, venues, start, bucket_seconds):
+    """Last bid and ask per bucket and venue in ``chunk``.
+
+    Returns the bucket indices and ``(buckets, venues)`` bid and ask arrays,
+    NaN where a venue didn't quote in a bucket.
+    """
+    venue_index = pd.Categorical(chunk['venue'], categories=venues).codes
+    known = venue_index >= 0
+    timestamps = chunk['timestamp'].to_numpy(dtype=float)[known]
+    venue_index = venue_index[known].astype(np.int64)
+    bid = chunk['bid'].to_numpy(dtype=float)[known]
+    ask = chunk['ask'].to_numpy(dtype=float)[known]
+
+    bucket = np.floor((timestamps - start) / bucket_seconds).astype(np.int64)
+    buckets, bucket_row = np.unique(bucket, return_inverse=True)
+
+    # Ticks are in time order, so the last write per cell is the latest quote
+    bids = np.full((len(buckets), len(venues)), np.nan)
+    asks = np.full((len(buckets), len(venues)), np.nan)
+    bids[bucket_row, venue_index] = bid
+    asks[bucket_row, venue_index] = ask
+    return buckets, bids, asks
+
+
+def forward_fill(values, carry):
+    """Fill NaNs down each column, starting from ``carry`` (the last known row)."""
+    values = np.vstack([carry, values])
+    index = np.where(np.isnan(values), 0, np.arange(len(values))[:, None])
+    np.maximum.accumulate(index, axis=0, out=index)
+    return values[index, np.arange(values.shape[1])][1:]
+
+
+def allocation_edges(bids, asks, last_seen, bucket_ids, venue_columns, fees, stale_buckets):
+    """Net edge (fraction) of each allocation in each bucket: sell elsewhere at the best bid, buy here at the ask."""
+    fresh = (bucket_ids[:, None] - last_seen) <= stale_buckets
+    bids = np.where(fresh, bids, np.nan)
+    asks = np.where(fresh, asks, np.nan)
+
+    edges = np.full((len(bids), len(venue_columns)), np.nan)
+    for i, column in enumerate(venue_columns):
+        if column < 0:
+            continue
+        others = np.delete(bids, column, axis=1)
+        if others.shape[1] == 0:
+            continue
+        with np.errstate(invalid='ignore', all='ignore'):
+            best_bid = np.fmax.reduce(others, axis=1)
+            edges[:, i] = best_bid / asks[:, column] - 1 - fees[i] / 100
+    return edges
+
+
+def run_backtest(params, path, bucket_seconds=60, min_edge=0.0, stale_seconds=300, chunk_rows=CHUNK_ROWS,
+                 venue_map=None):
+    """Backtest ``params`` against the quotes in ``path``.
+
+    ``min_edge`` is the smallest net edge (in %) worth trading. Quotes older
+    than ``stale_seconds`` are ignored. ``venue_map`` maps platform keys to
+    the venue names used in the file when they differ. The monthly table runs
+    for ``params.months`` or as many whole months as the data covers.
+    """
+    names = list(params.allocations)
+    platform_keys = params.allocation_platforms()
+    fee, transfer_time, daily_limit = platform_arrays(params.platform_data, platform_keys)
+    venue_map = venue_map or {}
+    allocation_venues = [venue_map.get(key, key) for key in platform_keys]
+    reinvest_fraction = params.reinvestment_rate / 100
+    stale_buckets = int(np.ceil(stale_seconds / bucket_seconds))
+    lock_buckets = np.maximum(np.ceil(transfer_time * 3600 / bucket_seconds).astype(np.int64), 1)
+    day_buckets = SECONDS_PER_DAY / bucket_seconds
+    month_buckets = SECONDS_PER_MONTH / bucket_seconds
+
+    # Per-allocation state, as in the cashflow model
+    available = params.allocation_vector()
+    in_transit = np.zeros(len(names))
+    remaining_limit = daily_limit.copy()
+    limit_day = np.zeros(len(names), dtype=np.int64)
+    idle_capital = params.initial_capital - available.sum()
+    pending = []    # heap of (arrival bucket, allocation, principal, profit)
+
+    trades = np.zeros(len(names), dtype=np.int64)
+    volume = np.zeros(len(names))
+    edge_sum = np.zeros(len(names))
+    trade_profit = np.zeros(len(names))
+
+    realized_profit = 0.0
+    month_start_profit = 0.0
+    month_start_capital = float(params.initial_capital)
+    rows = []
+
+    def record(month):
+        nonlocal month_start_profit, month_start_capital
+        balances = available + in_transit
+        capital = idle_capital + balances.sum()
+        profit = realized_profit - month_start_profit
+        rows.append(monthly_row(month, capital, profit, names, balances, month_start_capital, params.initial_capital))
+        month_start_profit = realized_profit
+        month_start_capital = capital
+
+    def settle(until):
+        nonlocal realized_profit
+        while pending and pending[0][0] <= until:
+            _, i, principal, profit = heapq.heappop(pending)
+            available[i] += principal + profit * reinvest_fraction
+            in_transit[i] -= principal
+            realized_profit += profit
+
+    record(0)
+    next_month = 1
+    start = None
+    end = None
+
+    # Quote columns: the allocations' venues, then every other venue in the order it first quotes
+    venues = list(dict.fromkeys(allocation_venues))
+    venue_columns = np.array([venues.index(venue) for venue in allocation_venues])
+    carry_bids = np.full(len(venues), np.nan)
+    carry_asks = np.full(len(venues), np.nan)
+    carry_seen = np.full(len(venues), -np.inf)
+    ticks = 0
+    total_buckets = 0
+    actionable_buckets = 0
+    done = False
+
+    for start, chunk in bucketed_chunks(read_ticks(path, chunk_rows), bucket_seconds):
+        new_venues = sorted(set(chunk['venue'].unique()).difference(venues))
+        if new_venues:
+            venues += new_venues
+            carry_bids = np.append(carry_bids, np.full(len(new_venues), np.nan))
+            carry_asks = np.append(carry_asks, np.full(len(new_venues), np.nan))
+            carry_seen = np.append(carry_seen, np.full(len(new_venues), -np.inf))
+
+        ticks += len(chunk)
+        end = float(chunk['timestamp'].iloc[-1])
+        buckets, bids, asks = bucket_quotes(chunk, venues, start, bucket_seconds)
+
+        # Quotes carry forward from the last bucket of the previous chunk
+        seen = np.where(np.isnan(bids), -np.inf, buckets[:, None].astype(float))
+        bids = forward_fill(bids, carry_bids)
+        asks = forward_fill(asks, carry_asks)
+        seen = np.maximum.accumulate(np.vstack([carry_seen, seen]), axis=0)[1:]
+        carry_bids, carry_asks, carry_seen = bids[-1], asks[-1], seen[-1]
+        total_buckets += len(buckets)
+
+        edges = allocation_edges(bids, asks, seen, buckets, venue_columns, fee, stale_buckets)
+        actionable = np.nan_to_num(edges, nan=-np.inf) > min_edge / 100
+        rows_with_trades = np.flatnonzero(actionable.any(axis=1))
+        actionable_buckets += len(rows_with_trades)
+
+        for row in rows_with_trades.tolist():
+            bucket = int(buckets[row])
+
+            # Close every month that ended before this bucket
+            while bucket >= next_month * month_buckets:
+                if next_month > params.months:
+                    done = True
+                    break
+                settle(next_month * month_buckets - 1)
+                record(next_month)
+                next_month += 1
+            if done:
+                break
+
+            settle(bucket)
+
+            # Daily limits reset at the start of each day
+            day = int(bucket // day_buckets)
+            reset = limit_day != day
+            remaining_limit[reset] = daily_limit[reset]
+            limit_day[reset] = day
+
+            for i in np.flatnonzero(actionable[row]).tolist():
+                deploy = min(available[i], remaining_limit[i])
+                if deploy <= 0:
+                    continue
+                edge = edges[row, i]
+                available[i] -= deploy
+                remaining_limit[i] -= deploy
+                in_transit[i] += deploy
+                heapq.heappush(pending, (bucket + int(lock_buckets[i]), i, deploy, deploy * edge))
+
+                trades[i] += 1
+                volume[i] += deploy
+                edge_sum[i] += edge
+                trade_profit[i] += deploy * edge
+
+        if done:
+            break
+
+    # Close the remaining whole months the data covers
+    if start is not None:
+        covered_months = int((end - start) // SECONDS_PER_MONTH)
+        while next_month <= min(params.months, covered_months):
+            settle(next_month * month_buckets - 1)
+            record(next_month)
+            next_month += 1
+
+    trades_df = pd.DataFrame({
+        'allocation': names,
+        'platform': platform_keys,
+        'trades': trades,
+        'volume': volume,
+        'profit': trade_profit,
+        'mean_edge': np.divide(edge_sum, trades, out=np.zeros(len(names)), where=trades > 0) * 100
+    })
+
+    return BacktestResult(
+        simulation_df=pd.DataFrame(rows),
+        trades_df=trades_df,
+        ticks=ticks,
+        buckets=total_buckets,
+        actionable_buckets=actionable_buckets,
+        start=start,
+        end=end
+    )
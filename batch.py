@@ -0,0 +1,182 @@
+"""Vectorized batch version of ``simulation.run_simulation``.
+
+Every scenario in a batch shares the time horizon and platform data, while
+initial capital, spread, cycles per month, reinvestment rate and the capital
+allocations may differ per scenario. Months are still stepped one at a time,
+but each step updates all scenarios in a single NumPy pass.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from platforms import REGISTRY, platform_arrays
+from simulation import default_platform_data
+
+# Inputs that simulate_batch takes as per-scenario scalars
+BATCH_SCALARS = ('initial_capital', 'spread_percentage', 'cycles_per_month', 'reinvestment_rate')
+
+
+@dataclass
+class BatchResult:
+    initial_capital: np.ndarray    # (n,)
+    capital: np.ndarray            # (n, months + 1)
+    profit: np.ndarray             # (n, months + 1), month 0 is zero
+    platform_capital: np.ndarray   # (n, months + 1, platforms) or None
+    names: list                    # allocation names, in column order
+
+    @property
+    def ending_capital(self):
+        return self.capital[:, -1]
+
+    @property
+    def return_rate(self):
+        """Monthly profit as a percentage of the previous month's capital."""
+        rate = np.zeros_like(self.profit)
+        rate[:, 1:] = self.profit[:, 1:] / self.capital[:, :-1] * 100
+        return rate
+
+    @property
+    def accumulated_return(self):
+        return (self.capital / self.initial_capital[:, None] - 1) * 100
+
+    def to_frame(self, index):
+        """Monthly table for one scenario, in the same schema as ``run_simulation``."""
+        months = self.capital.shape[1]
+        data = {
+            'month': np.arange(months),
+            'capital': self.capital[index].round(2),
+            'profit': self.profit[index].round(2)
+        }
+        if self.platform_capital is not None:
+            for i, name in enumerate(self.names):
+                data[f'{name}_capital'] = self.platform_capital[index, :, i].round(2)
+        data['return_rate'] = self.return_rate[index].round(2)
+        data['accumulated_return'] = self.accumulated_return[index].round(2)
+        return pd.DataFrame(data)
+
+
+@dataclass
+class BatchArrays:
+    """Per-scenario arrays shared by the batch simulator and the fast path."""
+    initial_capital: np.ndarray     # (n,)
+    capitals: np.ndarray            # (n, platforms) starting allocations
+    cycle_growth: np.ndarray        # (n, platforms) growth of one cycle
+    time_based_cycles: np.ndarray   # (n, platforms)
+    reinvest_fraction: np.ndarray   # (n,)
+    daily_limit: np.ndarray         # (platforms,), or (n, platforms) for run_batch
+    names: list
+
+
+def prepare_batch(initial_capital, spread_percentage, cycles_per_month, reinvestment_rate,
+                  allocations, platform_data=None, names=None):
+    """Broadcast batch inputs to per-scenario arrays (see ``simulate_batch``)."""
+    if platform_data is None:
+        platform_data = default_platform_data()
+    if names is None:
+        names = list(REGISTRY.allocations)
+    fee, transfer_time, daily_limit = platform_arrays(platform_data, [REGISTRY.platform_for(name) for name in names])
+
+    allocations = np.asarray(allocations, dtype=float)
+    if allocations.shape[-1] != len(fee):
+        raise ValueError(f"allocations must have {len(fee)} columns, got shape {allocations.shape}")
+    initial_capital, spread_percentage, cycles_per_month, reinvestment_rate = np.broadcast_arrays(
+        *(np.asarray(value, dtype=float) for value in
+          (initial_capital, spread_percentage, cycles_per_month, reinvestment_rate)),
+        allocations[..., 0]
+    )[:4]
+    n = initial_capital.size
+
+    # Per-scenario constants: cycle profit and time-limited cycles per platform
+    return BatchArrays(
+        initial_capital=initial_capital.reshape(n).copy(),
+        capitals=np.broadcast_to(allocations, (n, len(fee))).copy(),
+        cycle_growth=1 + (spread_percentage.reshape(n, 1) - fee) / 100,
+        time_based_cycles=cycles_per_month.reshape(n, 1) * (720 / (720 + transfer_time)),
+        reinvest_fraction=reinvestment_rate.reshape(n) / 100,
+        daily_limit=daily_limit,
+        names=list(names)
+    )
+
+
+def simulate_batch(initial_capital, spread_percentage, cycles_per_month, reinvestment_rate,
+                   allocations, months, platform_data=None, names=None, record_platforms=True):
+    """Simulate many parameter sets at once.
+
+    The scalar inputs may be numbers or arrays of shape ``(n,)``. ``allocations``
+    has shape ``(n, len(names))`` (or a single row shared by all scenarios), with
+    one column per allocation in ``names``, which defaults to the registry
+    allocations. Pass ``record_platforms=False`` to skip the per-platform
+    trajectories, which are the largest part of the result for big sweeps.
+    """
+    arrays = prepare_batch(initial_capital, spread_percentage, cycles_per_month, reinvestment_rate,
+                           allocations, platform_data, names)
+    return run_batch(arrays, months, record_platforms)
+
+
+def run_batch(arrays, months, record_platforms=True):
+    """Step prepared ``BatchArrays`` through ``months`` months.
+
+    The arrays' capitals are updated in place. ``daily_limit`` may give each
+    scenario its own limits, shaped ``(n, platforms)``.
+    """
+    capitals = arrays.capitals
+    n, platforms = capitals.shape
+    monthly_volume = arrays.daily_limit * 30
+
+    capital = np.empty((n, months + 1))
+    profit = np.zeros((n, months + 1))
+    platform_capital = np.empty((n, months + 1, platforms)) if record_platforms else None
+
+    capital[:, 0] = arrays.initial_capital
+    if record_platforms:
+        platform_capital[:, 0] = capitals
+    previous_capital = arrays.initial_capital.copy()
+
+    for month in range(1, months + 1):
+        # Cycles are limited by transfer time and by the capital each daily limit can absorb
+        capital_based_cycles = np.floor(30 * np.minimum(capitals, monthly_volume) / arrays.daily_limit)
+        adjusted_cycles = np.minimum(arrays.time_based_cycles, capital_based_cycles)
+        monthly_profit = (capitals * (np.power(arrays.cycle_growth, adjusted_cycles) - 1)).sum(axis=1)
+
+        # Reinvest and distribute proportionally to the previous total
+        reinvested_profit = monthly_profit * arrays.reinvest_fraction
+        capitals += capitals * (reinvested_profit / previous_capital)[:, None]
+        previous_capital = previous_capital + reinvested_profit
+
+        capital[:, month] = previous_capital
+        profit[:, month] = monthly_profit
+        if record_platforms:
+            platform_capital[:, month] = capitals
+
+    return BatchResult(arrays.initial_capital, capital, profit, platform_capital, arrays.names)
+
+
+def variation_inputs(params, **overrides):
+    """Batch inputs for variations of ``params`` (see ``simulate_variations``)."""
+    names = list(params.allocations)
+    allocation_names = [f'{name}_capital' for name in names]
+    n = np.broadcast(*overrides.values()).size if overrides else 1
+
+    values = {name: np.full(n, float(getattr(params, name))) for name in BATCH_SCALARS}
+    allocations = np.tile(params.allocation_vector(), (n, 1))
+    for name, column in overrides.items():
+        if name in values:
+            values[name] = np.broadcast_to(np.asarray(column, dtype=float), (n,))
+        elif name in allocation_names:
+            allocations[:, allocation_names.index(name)] = column
+        else:
+            raise ValueError(f"Cannot vary '{name}' in a batch")
+
+    return dict(values, allocations=allocations, platform_data=params.platform_data, names=names)
+
+
+def simulate_variations(params, record_platforms=False, **overrides):
+    """Simulate variations of ``params`` in one batch.
+
+    Each keyword names a ``SimulationParams`` field (one of ``BATCH_SCALARS`` or
+    an allocation such as ``kraken_capital``) and gives an array of values;
+    every other input is taken from ``params``.
+    """
+    return simulate_batch(months=params.months, record_platforms=record_platforms,
+                          **variation_inputs(params, **overrides))
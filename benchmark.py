@@ -0,0 +1,222 @@
+"""Benchmarks for the simulation and rendering hot paths.
+
+Runs headless and times:
+
+* single-run latency of ``run_simulation``, ``calculate_platform_profit``,
+  the ``simulation_df`` DataFrame construction and the Results tab figures
+  (fig1/fig2, built and serialized to JSON as Streamlit would send them),
+* the standard and lightweight figures over each horizon,
+* batch throughput of ``simulate_batch`` and the ``fastpath`` projection,
+* the route finder's route enumeration and the re-rank for a new capital,
+* the 30-day deployment schedule and the sensitivity analysis over each
+  platform count,
+* scaling over 36/120/360-month horizons and over platform count.
+
+Every benchmark starts from the dashboard's default session parameters
+(4000 capital, 5.5% spread, 15 cycles per month). Results are written to
+``.benchmarks/<timestamp>-<commit>.json`` and compared with the previous run,
+so regressions show up between commits.
+
+    python benchmark.py                # run everything and compare
+    python benchmark.py -k horizon     # only benchmarks whose name contains 'horizon'
+    python benchmark.py --quick        # fewer repeats, for a fast check
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import timeit
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from batch import simulate_batch
+from charts import capital_growth_figure, monthly_profit_figure
+from fastpath import project_batch
+from routes import RouteGraph, build_graph
+from scheduler import plan_deployments
+from sensitivity import sensitivity_analysis
+from simulation import SimulationParams, calculate_platform_profit, run_simulation
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.benchmarks')
+
+HORIZONS = (36, 120, 360)
+PLATFORM_COUNTS = (5, 20, 50)
+BATCH_SIZE = 10000
+
+# Slowdown against the previous run that counts as a regression
+REGRESSION_THRESHOLD = 1.2
+
+
+def baseline_params(**overrides):
+    """Default dashboard session parameters, with any fields overridden."""
+    return SimulationParams(**overrides)
+
+
+def params_with_platforms(count, **overrides):
+    """Baseline parameters spread evenly over ``count`` synthetic platforms."""
+    params = baseline_params(**overrides)
+    templates = list(params.platform_data.values())
+    platform_data = {f'venue_{i}': dict(templates[i % len(templates)]) for i in range(count)}
+    allocations = {name: params.initial_capital / count for name in platform_data}
+    return SimulationParams(**{**params.to_dict(), 'platform_data': platform_data, 'allocations': allocations})
+
+
+def batch_inputs(params, size):
+    """``simulate_batch`` inputs for ``size`` copies of ``params`` with spreads from 1% to 10%."""
+    return dict(
+        initial_capital=np.full(size, float(params.initial_capital)),
+        spread_percentage=np.linspace(1, 10, size),
+        cycles_per_month=np.full(size, float(params.cycles_per_month)),
+        reinvestment_rate=np.full(size, float(params.reinvestment_rate)),
+        allocations=np.tile(params.allocation_vector(), (size, 1)),
+        platform_data=params.platform_data,
+        names=params.allocation_platforms()
+    )
+
+
+def build_benchmarks():
+    """Benchmark name -> (callable, items per call) for throughput."""
+    params = baseline_params()
+    simulation_df, _ = run_simulation(params)
+    rows = simulation_df.to_dict('records')
+
+    benchmarks = {
+        'run_simulation': (lambda: run_simulation(params), 1),
+        'calculate_platform_profit': (lambda: calculate_platform_profit(params, 'kraken', 1200), 1),
+        'simulation_dataframe': (lambda: pd.DataFrame(rows), 1),
+        'fig1_capital_growth': (lambda: capital_growth_figure(simulation_df).to_json(), 1),
+        'fig2_monthly_profit': (lambda: monthly_profit_figure(simulation_df).to_json(), 1)
+    }
+
+    route_edges = build_graph(params.platform_data, params.spread_percentage)
+    route_graph = RouteGraph(route_edges)
+    benchmarks['route_search'] = (lambda: RouteGraph(route_edges), 1)
+    benchmarks['route_rank'] = (lambda: route_graph.rank(50000, params.cycles_per_month), 1)
+
+    inputs = batch_inputs(params, BATCH_SIZE)
+    benchmarks['batch_simulate'] = (lambda: simulate_batch(months=params.months, **inputs), BATCH_SIZE)
+    benchmarks['batch_project'] = (lambda: project_batch(months=params.months, **inputs), BATCH_SIZE)
+
+    for months in HORIZONS:
+        horizon_params = baseline_params(months=months)
+        horizon_inputs = batch_inputs(horizon_params, BATCH_SIZE)
+        horizon_df, _ = run_simulation(horizon_params)
+        benchmarks[f'horizon_{months}_run_simulation'] = (lambda p=horizon_params: run_simulation(p), 1)
+        benchmarks[f'horizon_{months}_fig1_standard'] = (
+            lambda df=horizon_df: capital_growth_figure(df).to_json(), 1
+        )
+        benchmarks[f'horizon_{months}_fig1_lightweight'] = (
+            lambda df=horizon_df: capital_growth_figure(df, lightweight=True).to_json(), 1
+        )
+        benchmarks[f'horizon_{months}_batch_simulate'] = (
+            lambda m=months, i=horizon_inputs: simulate_batch(months=m, record_platforms=False, **i), BATCH_SIZE
+        )
+        benchmarks[f'horizon_{months}_batch_project'] = (
+            lambda m=months, i=horizon_inputs: project_batch(months=m, **i), BATCH_SIZE
+        )
+
+    for count in PLATFORM_COUNTS:
+        platform_params = params_with_platforms(count)
+        benchmarks[f'platforms_{count}_run_simulation'] = (lambda p=platform_params: run_simulation(p), 1)
+        platform_edges = build_graph(platform_params.platform_data, platform_params.spread_percentage)
+        benchmarks[f'platforms_{count}_route_search'] = (lambda e=platform_edges: RouteGraph(e), 1)
+        benchmarks[f'platforms_{count}_schedule'] = (lambda p=platform_params: plan_deployments(p), 1)
+        benchmarks[f'platforms_{count}_sensitivity'] = (lambda p=platform_params: sensitivity_analysis(p), 1)
+
+    return benchmarks
+
+
+def time_callable(func, repeat):
+    """Seconds per call: best and median of ``repeat`` timed runs."""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    samples = np.array(timer.repeat(repeat=repeat, number=number)) / number
+    return {'min': float(samples.min()), 'median': float(np.median(samples)), 'number': number, 'repeat': repeat}
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def previous_results(exclude=None):
+    paths = sorted(path for path in glob.glob(os.path.join(RESULTS_DIR, '*.json')) if path != exclude)
+    if not paths:
+        return None
+    with open(paths[-1]) as f:
+        return json.load(f)
+
+
+def run_benchmarks(pattern=None, repeat=5):
+    results = {}
+    for name, (func, items) in build_benchmarks().items():
+        if pattern and pattern not in name:
+            continue
+        timing = time_callable(func, repeat)
+        timing['items_per_second'] = items / timing['median']
+        results[name] = timing
+        print(f"{name:<36} {timing['median'] * 1000:>10.3f} ms  {timing['items_per_second']:>14,.0f} /s", flush=True)
+    return results
+
+
+def compare(results, previous):
+    """Print the change against ``previous`` and return the names that regressed."""
+    regressions = []
+    print(f"\nCompared with {previous['commit']} ({previous['timestamp']}):")
+    for name, timing in results.items():
+        before = previous['results'].get(name)
+        if before is None:
+            continue
+        ratio = timing['median'] / before['median']
+        flag = '  REGRESSION' if ratio > REGRESSION_THRESHOLD else ''
+        print(f"{name:<36} {ratio:>6.2f}x{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('-k', dest='pattern', help="only run benchmarks whose name contains this")
+    parser.add_argument('--quick', action='store_true', help="3 repeats instead of 7")
+    parser.add_argument('--no-save', action='store_true', help="don't store the results")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.pattern, repeat=3 if args.quick else 7)
+    record = {
+        'commit': git_commit(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'machine': platform.platform(),
+        'results': results
+    }
+
+    path = None
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{record['commit']}.json")
+        with open(path, 'w') as f:
+            json.dump(record, f, indent=2)
+
+    previous = previous_results(exclude=path)
+    regressions = compare(results, previous) if previous else []
+    if path:
+        print(f"\nSaved {path}")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
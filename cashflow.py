@@ -0,0 +1,140 @@
+"""Event-driven cashflow simulator at day or hour granularity.
+
+The monthly model in ``simulation.py`` folds daily limits and transfer times
+into one ``adjusted_cycles`` number per month. This engine instead tracks
+each platform's cash as it moves:
+
+* every day a platform can deploy at most its ``daily_limit``,
+* deployed capital is locked for ``720 / cycles_per_month`` hours of
+  execution plus the platform's full ``transfer_time`` (Coinbase's 144h hold),
+* when it arrives the principal and the reinvested share of the profit
+  become available again on the same platform.
+
+State is held in NumPy arrays indexed by platform. Arrivals are bucketed in
+a calendar array of shape ``(platforms, steps)``, and a heap of the pending
+arrival steps lets the loop jump straight from one event to the next.
+"""
+import heapq
+
+import numpy as np
+import pandas as pd
+
+from platforms import platform_arrays
+
+HOURS_PER_DAY = 24
+HOURS_PER_MONTH = 720
+
+# Arrays with less than this in them are treated as empty
+EPSILON = 1e-9
+
+
+def monthly_row(month, capital, profit, names, balances, month_start_capital, initial_capital):
+    """One row of the monthly table, in the ``run_simulation`` schema."""
+    row = {'month': month, 'capital': round(capital, 2), 'profit': round(profit, 2)}
+    row.update({f'{name}_capital': round(balance, 2) for name, balance in zip(names, balances)})
+    row.update({
+        'return_rate': round(profit / month_start_capital * 100, 2),
+        'accumulated_return': round((capital / initial_capital - 1) * 100, 2)
+    })
+    return row
+
+
+def simulate_cashflows(params, step_hours=24):
+    """Simulate ``params`` at ``step_hours`` resolution (24 for days, 1 for hours).
+
+    Returns a monthly table in the same schema as ``run_simulation``. Capital in
+    transit is counted at its principal until it arrives; profit is booked in
+    the month it arrives.
+    """
+    if HOURS_PER_DAY % step_hours:
+        raise ValueError("step_hours must divide a day evenly")
+
+    fee, transfer_time, daily_limit = platform_arrays(params.platform_data, params.allocation_platforms())
+    platforms = np.arange(len(fee))
+    cycle_profit = (params.spread_percentage - fee) / 100
+    reinvest_fraction = params.reinvestment_rate / 100
+
+    day_steps = HOURS_PER_DAY // step_hours
+    month_steps = HOURS_PER_MONTH // step_hours
+    horizon = params.months * month_steps
+    cycle_hours = HOURS_PER_MONTH / params.cycles_per_month + transfer_time
+    delay_steps = np.maximum(np.ceil(cycle_hours / step_hours).astype(np.int64), 1)
+
+    # Per-platform state
+    available = params.allocation_vector()
+    in_transit = np.zeros(len(fee))
+    remaining_limit = np.zeros(len(fee))
+    idle_capital = params.initial_capital - available.sum()
+
+    # Calendar queue: amounts arriving at each step, plus a heap of steps with arrivals
+    calendar_size = horizon + int(delay_steps.max()) + 1
+    arrival_principal = np.zeros((len(fee), calendar_size))
+    arrival_profit = np.zeros((len(fee), calendar_size))
+    scheduled = np.zeros(calendar_size, dtype=bool)
+    pending = []
+
+    realized_profit = 0.0
+    month_start_profit = 0.0
+    month_start_capital = float(params.initial_capital)
+    rows = []
+
+    def record(month):
+        nonlocal month_start_profit, month_start_capital
+        balances = available + in_transit
+        capital = idle_capital + balances.sum()
+        profit = realized_profit - month_start_profit
+        rows.append(monthly_row(month, capital, profit, params.allocations, balances, month_start_capital,
+                                params.initial_capital))
+        month_start_profit = realized_profit
+        month_start_capital = capital
+
+    record(0)
+    step = 0
+    next_month = month_steps
+    limit_day = -1
+
+    while step < horizon:
+        # Settle everything arriving now
+        if scheduled[step]:
+            principal = arrival_principal[:, step]
+            profit = arrival_profit[:, step]
+            available += principal + profit * reinvest_fraction
+            in_transit -= principal
+            realized_profit += profit.sum()
+
+        # Daily limits reset on the first step of each new day, which may not be the day's first step
+        day = step // day_steps
+        if day != limit_day:
+            remaining_limit[:] = daily_limit
+            limit_day = day
+
+        # Deploy what the daily limit allows and schedule its arrival
+        deploy = np.minimum(available, remaining_limit)
+        if deploy.max() > EPSILON:
+            available -= deploy
+            remaining_limit -= deploy
+            in_transit += deploy
+            arrivals = step + delay_steps
+            arrival_principal[platforms, arrivals] += deploy
+            arrival_profit[platforms, arrivals] += deploy * cycle_profit
+            for arrival in np.unique(arrivals[deploy > EPSILON]).tolist():
+                if not scheduled[arrival]:
+                    scheduled[arrival] = True
+                    heapq.heappush(pending, arrival)
+
+        while pending and pending[0] <= step:
+            heapq.heappop(pending)
+
+        # Jump to the next arrival, or the next day if cash is waiting on a limit
+        next_step = pending[0] if pending else horizon
+        if available.max() > EPSILON:
+            next_step = min(next_step, (step // day_steps + 1) * day_steps)
+        next_step = min(next_step, horizon)
+
+        # Close every month that ends by the next event
+        while next_month <= next_step:
+            record(next_month // month_steps)
+            next_month += month_steps
+        step = next_step
+
+    return pd.DataFrame(rows)
@@ -0,0 +1,431 @@
+"""Plotly figures for the Results, Parameter Sweep and Monte Carlo tabs.
+
+Built from the ``simulation_df`` schema alone, so the same figures can be
+produced, cached or benchmarked outside Streamlit.
+
+Each figure has a lightweight variant for long horizons and many series:
+WebGL (``Scattergl``) line traces without markers, every series downsampled
+with largest-triangle-three-buckets (LTTB) to about one point per horizontal
+pixel, and, past ``MAX_SERIES`` allocations, percentile bands of the
+allocations instead of one trace each. ``FigureCache`` keeps built figures
+keyed on a hash of their data, so reruns with unchanged results skip
+building them again.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from platforms import REGISTRY
+
+CHART_MODES = ['Auto', 'Standard', 'Lightweight']
+
+# Points kept per series in lightweight mode, about one per pixel of a full-width chart
+PIXEL_BUDGET = 800
+
+# Auto mode goes lightweight once a figure would plot more points than this
+AUTO_POINT_LIMIT = 2000
+
+# Above this many allocations the lightweight capital chart shows them as percentile bands
+MAX_SERIES = 12
+
+# Percentile bands (low, high, fill opacity) around a median line
+BANDS = ((5, 95, 0.15), (25, 75, 0.3))
+
+# Monthly ticks stay readable up to this many months
+MAX_MONTHLY_TICKS = 36
+
+
+def lttb_indices(x, y, threshold):
+    """Indices of the ``threshold`` points of ``(x, y)`` kept by largest-triangle-three-buckets.
+
+    The first and last points are always kept. Each bucket in between keeps
+    the point forming the largest triangle with the point kept before it and
+    the average of the next bucket, which preserves peaks and troughs.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    # threshold - 2 buckets over the interior points, then the last point on its own
+    edges = np.append((np.arange(threshold - 1) * ((n - 2) / (threshold - 2))).astype(np.int64) + 1, n)
+    x_sum = np.concatenate([[0.0], np.cumsum(x)])
+    y_sum = np.concatenate([[0.0], np.cumsum(y)])
+    counts = edges[1:] - edges[:-1]
+    x_mean = (x_sum[edges[1:]] - x_sum[edges[:-1]]) / counts
+    y_mean = (y_sum[edges[1:]] - y_sum[edges[:-1]]) / counts
+
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        area = np.abs((x[a] - x_mean[i + 1]) * (y[start:end] - y[a])
+                      - (x[a] - x[start:end]) * (y_mean[i + 1] - y[a]))
+        a = start + int(np.argmax(area))
+        indices[i + 1] = a
+    return indices
+
+
+def downsample(x, y, max_points=PIXEL_BUDGET):
+    """``(x, y)`` reduced to at most ``max_points`` points with LTTB."""
+    x = np.asarray(x)
+    y = np.asarray(y)
+    indices = lttb_indices(x, y, max_points)
+    return x[indices], y[indices]
+
+
+def use_lightweight(mode, points):
+    """Whether chart ``mode`` renders lightweight figures for ``points`` plotted points."""
+    if mode == 'Auto':
+        return points > AUTO_POINT_LIMIT
+    return mode == 'Lightweight'
+
+
+def simulation_points(simulation_df):
+    # Total capital plus one series per allocation
+    return len(simulation_df) * (1 + len(REGISTRY.allocations))
+
+
+def band_traces(x, bands, color, name, max_points=None, lightweight=False):
+    """Filled percentile bands and a median line from ``bands``, a mapping of percentile to series.
+
+    With ``max_points`` every band is sampled at the points LTTB keeps for
+    the median, so the fills between bands stay aligned.
+    """
+    x = np.asarray(x)
+    indices = lttb_indices(x, bands[50], max_points) if max_points else np.arange(len(x))
+    scatter = go.Scattergl if lightweight else go.Scatter
+    r, g, b = (int(color[i:i + 2], 16) for i in (1, 3, 5))
+
+    traces = []
+    for low, high, opacity in BANDS:
+        traces.append(scatter(
+            x=x[indices],
+            y=np.asarray(bands[high])[indices],
+            mode='lines',
+            line=dict(width=0),
+            showlegend=False,
+            hoverinfo='skip'
+        ))
+        traces.append(scatter(
+            x=x[indices],
+            y=np.asarray(bands[low])[indices],
+            mode='lines',
+            line=dict(width=0),
+            fill='tonexty',
+            fillcolor=f'rgba({r}, {g}, {b}, {opacity})',
+            name=f'{low}th-{high}th Percentile'
+        ))
+
+    traces.append(scatter(
+        x=x[indices],
+        y=np.asarray(bands[50])[indices],
+        mode='lines' if lightweight else 'lines+markers',
+        name=name,
+        line=dict(color=color, width=3)
+    ))
+    return traces
+
+
+def _month_ticks(fig, months, tick0):
+    # One tick per month while that stays readable, otherwise Plotly's automatic ticks
+    if months <= MAX_MONTHLY_TICKS:
+        fig.update_xaxes(tickmode='linear', tick0=tick0, dtick=1)
+
+
+def capital_growth_figure(simulation_df, lightweight=False, max_points=PIXEL_BUDGET):
+    # Create a plotly figure for capital growth
+    fig = go.Figure()
+
+    if lightweight:
+        months = simulation_df['month'].to_numpy()
+        x, y = downsample(months, simulation_df['capital'].to_numpy(), max_points)
+        fig.add_trace(go.Scattergl(
+            x=x,
+            y=y,
+            mode='lines',
+            name='Total Capital ($)',
+            line=dict(color='#8884d8', width=3)
+        ))
+
+        columns = [f'{name}_capital' for name in REGISTRY.allocations]
+        if len(columns) > MAX_SERIES:
+            # Spread of the allocations' capital rather than one trace each
+            capitals = simulation_df[columns].to_numpy()
+            percentiles = sorted({p for band in BANDS for p in band[:2]} | {50})
+            bands = dict(zip(percentiles, np.percentile(capitals, percentiles, axis=1)))
+            fig.add_traces(band_traces(months, bands, '#82ca9d', 'Median Allocation Capital ($)',
+                                       max_points=max_points, lightweight=True))
+        else:
+            for name, allocation in REGISTRY.allocations.items():
+                x, y = downsample(months, simulation_df[f'{name}_capital'].to_numpy(), max_points)
+                fig.add_trace(go.Scattergl(
+                    x=x,
+                    y=y,
+                    mode='lines',
+                    name=f'{REGISTRY.label(name)} Capital',
+                    line=dict(color=allocation.get('color'))
+                ))
+    else:
+        # Add traces for each capital type
+        fig.add_trace(go.Scatter(
+            x=simulation_df['month'],
+            y=simulation_df['capital'],
+            mode='lines+markers',
+            name='Total Capital ($)',
+            line=dict(color='#8884d8', width=3),
+            marker=dict(size=8)
+        ))
+
+        for name, allocation in REGISTRY.allocations.items():
+            fig.add_trace(go.Scatter(
+                x=simulation_df['month'],
+                y=simulation_df[f'{name}_capital'],
+                mode='lines',
+                name=f'{REGISTRY.label(name)} Capital',
+                line=dict(color=allocation.get('color'))
+            ))
+
+    # Update layout
+    fig.update_layout(
+        title='',
+        xaxis_title='Month',
+        yaxis_title='Capital ($)',
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="right",
+            x=1
+        ),
+        height=500,
+        margin=dict(l=20, r=20, t=30, b=20),
+        hovermode="x unified"
+    )
+
+    _month_ticks(fig, len(simulation_df) - 1, 0)
+
+    return fig
+
+
+def monthly_profit_figure(simulation_df, lightweight=False, max_points=PIXEL_BUDGET):
+    # Filter out the initial month (0) which has no profit
+    profit_data = simulation_df[simulation_df['month'] > 0]
+
+    if lightweight:
+        # A filled line instead of one bar per month
+        x, y = downsample(profit_data['month'].to_numpy(), profit_data['profit'].to_numpy(), max_points)
+        fig = go.Figure(go.Scattergl(
+            x=x,
+            y=y,
+            mode='lines',
+            fill='tozeroy',
+            name='Profit ($)',
+            line=dict(color='#82ca9d')
+        ))
+    else:
+        # Create a plotly bar chart for monthly profit, the same bars plotly.express would build
+        # without the cost of importing it
+        fig = go.Figure(go.Bar(
+            x=profit_data['month'],
+            y=profit_data['profit'],
+            marker=dict(color='#82ca9d'),
+            hovertemplate='Month=%{x}<br>Profit ($)=%{y}<extra></extra>',
+            name='',
+            showlegend=False
+        ))
+        fig.update_layout(barmode='relative')
+
+    fig.update_layout(
+        title='',
+        xaxis_title='Month',
+        yaxis_title='Monthly Profit ($)',
+        height=400,
+        margin=dict(l=20, r=20, t=30, b=20),
+        hovermode="x unified"
+    )
+
+    _month_ticks(fig, len(profit_data), 1)
+
+    return fig
+
+
+def monte_carlo_figure(capital_bands, percentiles, lightweight=False, max_points=PIXEL_BUDGET):
+    """Fan chart of Monte Carlo capital percentile bands, one row of ``capital_bands`` per percentile."""
+    bands = dict(zip(percentiles, capital_bands))
+    months = np.arange(len(capital_bands[0]))
+
+    fig = go.Figure()
+    fig.add_traces(band_traces(months, bands, '#8884d8', 'Median Capital ($)',
+                               max_points=max_points if lightweight else None, lightweight=lightweight))
+
+    fig.update_layout(
+        title='',
+        xaxis_title='Month',
+        yaxis_title='Capital ($)',
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="right",
+            x=1
+        ),
+        height=500,
+        margin=dict(l=20, r=20, t=30, b=20),
+        hovermode="x unified"
+    )
+
+    return fig
+
+
+def deployment_figure(schedule):
+    """Stacked bars of the capital each allocation deploys per day of a ``scheduler`` plan."""
+    fig = go.Figure()
+    for name, deployments in schedule.groupby('allocation', sort=False):
+        fig.add_trace(go.Bar(
+            x=deployments['day'] + 1,
+            y=deployments['deployed'],
+            name=REGISTRY.label(name),
+            marker=dict(color=REGISTRY.allocations.get(name, {}).get('color'))
+        ))
+
+    fig.update_layout(
+        title='',
+        xaxis_title='Day',
+        yaxis_title='Deployed ($)',
+        barmode='stack',
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="right",
+            x=1
+        ),
+        height=400,
+        margin=dict(l=20, r=20, t=30, b=20),
+        hovermode="x unified"
+    )
+
+    return fig
+
+
+def tornado_figure(sensitivity, label, max_inputs=15):
+    """Tornado chart of one output's ``sensitivity`` rows: the output with each input at its low and high value."""
+    base = sensitivity['base'].iloc[0]
+    rows = sensitivity.assign(range=(sensitivity['high'] - sensitivity['low']).abs())
+    # Widest bar on top
+    rows = rows.nlargest(max_inputs, 'range').iloc[::-1]
+
+    fig = go.Figure()
+    for side, color, name in (('low', '#ef5350', 'Input Lowered'), ('high', '#66bb6a', 'Input Raised')):
+        fig.add_trace(go.Bar(
+            y=rows['label'],
+            x=rows[side] - base,
+            base=base,
+            orientation='h',
+            name=name,
+            marker=dict(color=color),
+            customdata=np.column_stack([rows[f'{side}_value'], rows[side]]),
+            hovertemplate=f"%{{y}} = %{{customdata[0]:,.4g}}<br>{label}: %{{customdata[1]:,.2f}}<extra></extra>"
+        ))
+
+    fig.add_vline(x=base, line=dict(color='#666', dash='dash'))
+    fig.update_layout(
+        title='',
+        xaxis_title=label,
+        barmode='overlay',
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="right",
+            x=1
+        ),
+        height=max(300, 28 * len(rows) + 100),
+        margin=dict(l=20, r=20, t=30, b=20)
+    )
+
+    return fig
+
+
+def sweep_heatmap_figure(sweep_grid, x_values, y_values, x_label, y_label):
+    """Heatmap of a parameter sweep's ending capital, one row of ``sweep_grid`` per y value."""
+    fig = go.Figure(go.Heatmap(
+        x=x_values,
+        y=y_values,
+        z=sweep_grid,
+        colorscale='Viridis',
+        colorbar=dict(title='Ending Capital ($)'),
+        hovertemplate=(
+            f"{x_label}: %{{x}}<br>"
+            f"{y_label}: %{{y}}<br>"
+            "Ending Capital: $%{z:,.2f}<extra></extra>"
+        )
+    ))
+
+    fig.update_layout(
+        title='',
+        xaxis_title=x_label,
+        yaxis_title=y_label,
+        height=600,
+        margin=dict(l=20, r=20, t=30, b=20)
+    )
+
+    return fig
+
+
+def data_key(data):
+    """Hash of a DataFrame's or array's contents."""
+    digest = hashlib.sha256()
+    if isinstance(data, pd.DataFrame):
+        digest.update(repr(list(data.columns)).encode())
+        digest.update(pd.util.hash_pandas_object(data, index=True).to_numpy().tobytes())
+    else:
+        data = np.ascontiguousarray(data)
+        digest.update(repr((data.shape, data.dtype.str)).encode())
+        digest.update(data.tobytes())
+    return digest.hexdigest()
+
+
+class FigureCache:
+    """Bounded, thread-safe LRU cache of built figures, keyed on the builder, its data and options.
+
+    The returned figures are shared between callers and must not be modified.
+    """
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def figure(self, builder, data, *args, **options):
+        # Arrays are hashed in full, since their repr elides the middle of large ones
+        key = (builder.__name__,) + tuple(
+            data_key(value) if isinstance(value, (np.ndarray, pd.DataFrame)) else repr(value)
+            for value in (data, *args, *sorted(options.items()))
+        )
+        with self.lock:
+            fig = self.entries.get(key)
+            if fig is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return fig
+            self.misses += 1
+
+        fig = builder(data, *args, **options)
+
+        with self.lock:
+            self.entries[key] = fig
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return fig
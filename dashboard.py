@@ -1,10 +1,24 @@
+import functools
+import inspect
+import time
+
+# Taken before the other imports, so the first rerun's timings include them
+script_started = time.perf_counter()
+
 import streamlit as st
 import pandas as pd
 import numpy as np
-import plotly.graph_objects as go
-import plotly.express as px
+import os
 from datetime import datetime
 
+# Plotting (charts) and the modules behind single tabs or sections are imported where they're used,
+# so a cold start only loads what the first tab needs
+from instrumentation import Instrumentation, enabled_by_environment
+from platforms import REGISTRY
+from results_cache import ResultsCache, simulation_key
+from shared_store import SessionHandles, SharedStore, result_key, server_mode_enabled
+from simulation import SimulationParams
+
 # Set page config
 st.set_page_config(
     page_title="Crypto Arbitrage System Optimization",
@@ -12,6 +26,17 @@ st.set_page_config(
     layout="wide"
 )
 
+# Stage timings are shared by every session; each rerun is only timed when opted in
+@st.cache_resource
+def get_instrumentation():
+    return Instrumentation()
+
+def timings_enabled():
+    return st.session_state.get('debug_timings', False) or enabled_by_environment()
+
+rerun_timer = get_instrumentation().rerun(enabled=timings_enabled(), started=script_started)
+rerun_timer.mark('imports')
+
 # Add custom CSS
 st.markdown("""
 <style>
@@ -60,31 +85,49 @@ st.markdown("""
 
 # Title and description
 st.markdown("<div class='main-header'>Crypto Arbitrage System Optimization</div>", unsafe_allow_html=True)
-st.markdown("Optimize your cryptocurrency arbitrage between Robinhood, Coinbase, Kraken, and Binance")
+platform_labels = [REGISTRY.label(name) for name in REGISTRY.allocations]
+st.markdown("Optimize your cryptocurrency arbitrage between " + (
+    f"{', '.join(platform_labels[:-1])}, and {platform_labels[-1]}" if len(platform_labels) > 2
+    else " and ".join(platform_labels)
+))
 
 # Initialize session state for parameters
 if 'initialized' not in st.session_state:
     st.session_state.initialized = True
-    st.session_state.initial_capital = 4000
-    st.session_state.months = 12
-    st.session_state.spread_percentage = 5.5
-    st.session_state.reinvestment_rate = 100
-    st.session_state.cycles_per_month = 15
-    
-    # Capital distribution
-    st.session_state.robinhood_capital = 1000
-    st.session_state.coinbase_capital = 1500
-    st.session_state.kraken_capital = 1000
-    st.session_state.cashapp_capital = 500
-    
-    # Platform data
-    st.session_state.platform_data = {
-        'robinhood': {'fee': 0.1, 'transfer_time': 24, 'daily_limit': 1000},
-        'coinbase': {'fee': 0.4, 'transfer_time': 144, 'daily_limit': 10000},
-        'kraken': {'fee': 0.26, 'transfer_time': 24, 'daily_limit': 5000},
-        'cashapp_fast': {'fee': 1.7, 'transfer_time': 1, 'daily_limit': 7500},
-        'cashapp_standard': {'fee': 0, 'transfer_time': 48, 'daily_limit': 7500}
-    }
+
+    # Simulation parameters, capital distribution and platform data
+    for key, value in SimulationParams().to_mapping().items():
+        st.session_state[key] = value
+
+    st.session_state.simulation_model = 'Monthly'
+
+    # Spread source and price feed settings
+    st.session_state.spread_source = 'Manual'
+    st.session_state.price_feed_files = os.environ.get('PRICE_FEED_REPLAY', '')
+    st.session_state.price_feed_speed = 1.0
+
+    # Tick file for the historical backtest
+    st.session_state.backtest_file = os.environ.get('BACKTEST_DATA', '')
+
+    # Standard, lightweight, or lightweight only for large figures
+    st.session_state.chart_mode = 'Auto'
+
+# Simulation models and the step size (hours) of the cashflow engine behind each
+SIMULATION_MODELS = {
+    'Monthly': None,
+    'Daily Cashflow': 24,
+    'Hourly Cashflow': 1,
+    'Historical Backtest': None
+}
+
+# Model that replays recorded quotes instead of a constant spread
+BACKTEST_MODEL = 'Historical Backtest'
+
+# Where the simulated spread comes from
+SPREAD_SOURCES = ['Manual', 'Live Feed']
+
+# Rolling window of the live spread, in seconds
+LIVE_SPREAD_WINDOW = 60
 
 # Helper function to format currencies
 def format_currency(value):
@@ -98,143 +141,230 @@ def format_percentage(value):
 def format_platform_name(name):
     if not name:
         return ''
-    name = name.replace('_', ' ')
-    return ' '.join(word.capitalize() for word in name.split())
-
-# Calculate profit for a specific platform
-def calculate_platform_profit(platform_key, capital):
-    if platform_key not in st.session_state.platform_data:
-        return 0
-    
-    platform = st.session_state.platform_data[platform_key]
-    fee = platform['fee']
-    transfer_time = platform['transfer_time']
-    daily_limit = platform['daily_limit']
-    
-    # Effective capital is limited by daily limit
-    effective_capital = min(capital, daily_limit * 30)
-    
-    # Calculate cycles based on time and capital constraints
-    time_based_cycles = st.session_state.cycles_per_month * (720 / (720 + transfer_time))
-    capital_based_cycles = np.floor(30 * effective_capital / daily_limit)
-    adjusted_cycles = min(time_based_cycles, capital_based_cycles)
-    
-    # Calculate profit
-    cycle_profit = (st.session_state.spread_percentage - fee) / 100
-    monthly_return = np.power(1 + cycle_profit, adjusted_cycles) - 1
-    
-    return capital * monthly_return
-
-# Run the simulation
-def run_simulation():
-    sim_data = []
-    comp_data = []
-    
-    # Initial state
-    current_capital = st.session_state.initial_capital
-    previous_capital = st.session_state.initial_capital
-    r_capital = st.session_state.robinhood_capital
-    c_capital = st.session_state.coinbase_capital
-    k_capital = st.session_state.kraken_capital
-    ca_capital = st.session_state.cashapp_capital
-    
-    # Calculate total profit from all platforms
-    def calculate_multi_platform_return():
-        robinhood_profit = calculate_platform_profit('robinhood', r_capital)
-        coinbase_profit = calculate_platform_profit('coinbase', c_capital)
-        kraken_profit = calculate_platform_profit('kraken', k_capital)
-        cashapp_profit = calculate_platform_profit('cashapp_standard', ca_capital)
-        
-        return robinhood_profit + coinbase_profit + kraken_profit + cashapp_profit
-    
-    # Simulate month by month
-    for month in range(st.session_state.months + 1):
-        if month == 0:
-            # Initial month
-            sim_data.append({
-                'month': month,
-                'capital': st.session_state.initial_capital,
-                'profit': 0,
-                'robinhood_capital': st.session_state.robinhood_capital,
-                'coinbase_capital': st.session_state.coinbase_capital,
-                'kraken_capital': st.session_state.kraken_capital,
-                'cashapp_capital': st.session_state.cashapp_capital,
-                'return_rate': 0,
-                'accumulated_return': 0
-            })
-        else:
-            # Calculate profit for this month
-            monthly_profit = calculate_multi_platform_return()
-            monthly_return = monthly_profit / current_capital
-            
-            # Apply reinvestment
-            reinvested_profit = monthly_profit * st.session_state.reinvestment_rate / 100
-            current_capital = previous_capital + reinvested_profit
-            
-            # Distribute reinvested profits proportionally
-            total_previous = previous_capital
-            r_percent = r_capital / total_previous
-            c_percent = c_capital / total_previous
-            k_percent = k_capital / total_previous
-            ca_percent = ca_capital / total_previous
-            
-            r_capital += reinvested_profit * r_percent
-            c_capital += reinvested_profit * c_percent
-            k_capital += reinvested_profit * k_percent
-            ca_capital += reinvested_profit * ca_percent
-            
-            # Record data
-            sim_data.append({
-                'month': month,
-                'capital': round(current_capital, 2),
-                'profit': round(monthly_profit, 2),
-                'robinhood_capital': round(r_capital, 2),
-                'coinbase_capital': round(c_capital, 2),
-                'kraken_capital': round(k_capital, 2),
-                'cashapp_capital': round(ca_capital, 2),
-                'return_rate': round(monthly_return * 100, 2),
-                'accumulated_return': round((current_capital / st.session_state.initial_capital - 1) * 100, 2)
-            })
-            
-            previous_capital = current_capital
-    
-    # Generate comparison data for each platform
-    platform_keys = ['robinhood', 'coinbase', 'kraken', 'cashapp_fast', 'cashapp_standard']
-    
-    for key in platform_keys:
-        platform = st.session_state.platform_data[key]
-        
-        adjusted_cycles = min(
-            st.session_state.cycles_per_month * (720 / (720 + platform['transfer_time'])),
-            np.floor(30 * st.session_state.initial_capital / platform['daily_limit'])
-        )
-        
-        cycle_profit = (st.session_state.spread_percentage - platform['fee']) / 100
-        monthly_return = np.power(1 + cycle_profit, adjusted_cycles) - 1
-        yearly_return = np.power(1 + monthly_return, 12) - 1
-        
-        comp_data.append({
-            'platform': key,
-            'fee': platform['fee'],
-            'transfer_time': platform['transfer_time'],
-            'daily_limit': platform['daily_limit'],
-            'monthly_volume': platform['daily_limit'] * 30,
-            'cycles_per_month': round(adjusted_cycles, 1),
-            'monthly_return': round(monthly_return * 100, 2),
-            'yearly_return': round(yearly_return * 100, 2)
-        })
-    
-    return pd.DataFrame(sim_data), pd.DataFrame(comp_data)
+    return REGISTRY.label(name)
 
 # Get total allocated capital
 def get_total_allocated_capital():
-    return (st.session_state.robinhood_capital + 
-            st.session_state.coinbase_capital + 
-            st.session_state.kraken_capital + 
-            st.session_state.cashapp_capital)
+    return sum(st.session_state[f'{name}_capital'] for name in REGISTRY.allocations)
+
+# Describe how an allocation is used, from its registry note
+def allocation_note(name):
+    platform = st.session_state.platform_data[REGISTRY.platform_for(name)]
+    capital = st.session_state[f'{name}_capital']
+    return REGISTRY.allocations[name].get('note', '').format(
+        throughput=format_currency(min(platform['daily_limit'], capital)),
+        hold_days=platform['transfer_time'] / 24
+    )
+
+# Simulation results are shared by every session, so identical inputs are only simulated once
+@st.cache_resource
+def get_results_cache():
+    return ResultsCache(max_entries=256)
+
+# Local HTTP API for batch jobs, sharing the results cache with every session (see service.py)
+@st.cache_resource
+def get_api_server(port):
+    from service import ApiServer, ScenarioEvaluator
+    return ApiServer(ScenarioEvaluator(get_results_cache()), port=port).start()
+
+# Built figures are shared by every session, so unchanged results skip building them again
+@st.cache_resource
+def get_figure_cache():
+    from charts import FigureCache
+    return FigureCache(max_entries=64)
+
+# Route graphs and their routes are shared by every session, so only capital changes re-rank them
+@st.cache_resource
+def get_route_finder():
+    from routes import RouteFinder
+    return RouteFinder()
+
+# In server mode heavy results live once per process and sessions only hold handles to them (see shared_store.py)
+SERVER_MODE = server_mode_enabled()
+
+@st.cache_resource
+def get_shared_store():
+    return SharedStore(max_idle_entries=128)
+
+# Handles this session holds on the shared store, released when the session's state goes away
+def session_handles():
+    if 'shared_handles' not in st.session_state:
+        st.session_state.shared_handles = SessionHandles(get_shared_store())
+    return st.session_state.shared_handles
+
+# Memoize a heavy result: one shared, reference-counted copy per input in server mode, st.cache_data otherwise
+def shared_result(max_entries, show_spinner=True):
+    def decorate(func):
+        if not SERVER_MODE:
+            return st.cache_data(max_entries=max_entries, show_spinner=show_spinner)(func)
+
+        @functools.wraps(func)
+        def held(*args):
+            key = result_key(func.__name__, *args)
+            with st.spinner(show_spinner if isinstance(show_spinner, str) else f"Running {func.__name__}(...)"):
+                return session_handles().get(func.__name__, key, lambda: func(*args))
+        return held
+    return decorate
+
+# On-disk store of saved scenarios and sweeps, imported on first use to keep pyarrow's compute and parquet modules off the cold start
+@st.cache_resource
+def get_scenario_store():
+    from scenario_store import ScenarioStore
+    return ScenarioStore()
+
+# Copy a saved scenario's inputs into the Simulation Parameters inputs
+def load_scenario(name):
+    params, _, _ = get_scenario_store().load_tables(name)
+    for key, value in params.to_mapping().items():
+        st.session_state[key] = value
+
+# Backtest against a tick file, memoized on the inputs and the file's size and modification time
+@shared_result(max_entries=8, show_spinner="Backtesting...")
+def backtest_results(params, path, size, modified):
+    from backtest import run_backtest
+    return run_backtest(SimulationParams(**params), path)
+
+# Price feeds run in a background thread shared by every session using the same recordings
+@st.cache_resource
+def get_price_feed(paths, speed):
+    from pricefeed import FeedPipeline, ReplayFeed
+    feeds = [ReplayFeed(path, speed=speed, loop=True) for path in paths]
+    return FeedPipeline(feeds, window_seconds=LIVE_SPREAD_WINDOW, drop_when_full=True).start()
+
+# Sweep cells are shared by every session, so overlapping grids are only simulated once
+@st.cache_resource
+def get_sweep_cache():
+    from sweep import SweepCache
+    return SweepCache()
+
+# Evaluate a parameter sweep grid, memoized on the grid definition
+@shared_result(max_entries=64)
+def evaluate_sweep(params, x_name, x_axis, y_name, y_axis):
+    from sweep import axis_values
+    return get_sweep_cache().evaluate(
+        SimulationParams(**params), x_name, axis_values(*x_axis), y_name, axis_values(*y_axis)
+    )
+
+# Days covered by the deployment schedule
+SCHEDULE_DAYS = 30
+
+# Empty pending transfers table; the editor keeps the rows added to it
+PENDING_TRANSFERS = pd.DataFrame({
+    'allocation': pd.Series(dtype=str),
+    'amount': pd.Series(dtype=float),
+    'day': pd.Series(dtype=int)
+})
+
+# Plan a month of deployments and transfers, memoized on the simulation inputs and pending transfers
+@shared_result(max_entries=32)
+def deployment_plan(params, pending):
+    from scheduler import PendingTransfer, plan_deployments
+    return plan_deployments(
+        SimulationParams(**params), days=SCHEDULE_DAYS, pending=[PendingTransfer(*transfer) for transfer in pending]
+    )
+
+# Search for the best allocation, memoized on the simulation inputs
+@shared_result(max_entries=32)
+def find_optimal_allocation(params, max_transfer_time):
+    from optimizer import optimize_allocation
+    return optimize_allocation(SimulationParams(**params), max_transfer_time=max_transfer_time)
+
+# Copy an optimized allocation into the capital distribution inputs
+def apply_allocation(allocation):
+    for name in REGISTRY.allocations:
+        st.session_state[f'{name}_capital'] = int(round(allocation[f'{name}_capital']))
+    st.session_state.inputs_changed = True
+
+# Run a Monte Carlo simulation, memoized on the simulation inputs and configuration
+@shared_result(max_entries=16)
+def monte_carlo_bands(params, config):
+    from montecarlo import MonteCarloConfig, run_monte_carlo
+    return run_monte_carlo(SimulationParams(**params), MonteCarloConfig(**config))
+
+# Sections wrapped in a fragment rerun on their own when their widgets change, on Streamlit versions that have fragments
+FRAGMENT = getattr(st, 'fragment', None) or getattr(st, 'experimental_fragment', None)
+
+def fragment(func):
+    if not FRAGMENT:
+        return func
+
+    # A fragment rerunning on its own runs after the script's timer has finished, so it gets a timer of its own
+    @functools.wraps(func)
+    def timed(*args, **kwargs):
+        global rerun_timer
+        if not rerun_timer.finished:
+            return func(*args, **kwargs)
+        rerun_timer = get_instrumentation().fragment_rerun(func.__name__, enabled=timings_enabled())
+        try:
+            return func(*args, **kwargs)
+        finally:
+            rerun_timer.finish()
+
+    return FRAGMENT(timed)
+
+# Only the open tab runs, on Streamlit versions whose tabs track which one is open; the others run every tab
+TAB_LABELS = ["Simulation Parameters", "Results", "Strategy", "Parameter Sweep", "Monte Carlo"]
+
+def create_tabs():
+    try:
+        return st.tabs(TAB_LABELS, key='open_tab', on_change='rerun')
+    except TypeError:
+        return st.tabs(TAB_LABELS)
+
+def tab_open(tab):
+    # Tabs that don't track their state report None
+    return getattr(tab, 'open', None) is not False
+
+# Widgets in tabs that aren't run keep their values, on Streamlit versions that can persist them
+PERSIST_STATE = {'persist_state': 'session'} if 'persist_state' in inspect.signature(st.radio).parameters else {}
+
+# Rerun the whole script, from a fragment whose callbacks changed the Simulation Parameters
+def rerun_app():
+    rerun = getattr(st, 'rerun', None) or st.experimental_rerun
+    rerun()
+
+# Expensive sections only run once asked for, then keep up with the inputs (from the cache where possible)
+def requested(section, label):
+    if st.session_state.get(f'{section}_requested'):
+        return True
+    if st.button(label, key=f'{section}_request'):
+        st.session_state[f'{section}_requested'] = True
+        return True
+    return False
+
+# Horizons shown in the long-horizon projection, in months
+PROJECTION_HORIZONS = (12, 60, 120, 240, 360)
+
+# Project ending capital over several horizons at once, memoized on the simulation inputs
+@shared_result(max_entries=32)
+def project_horizons(params):
+    from fastpath import project_variations
+    return project_variations(SimulationParams(**params), months=np.array(PROJECTION_HORIZONS))
+
+# Sensitivity of the outputs to every input, memoized on the simulation inputs
+@shared_result(max_entries=32)
+def input_sensitivity(params):
+    from sensitivity import sensitivity_analysis
+    return sensitivity_analysis(SimulationParams(**params))
+
+# Start/stop/step inputs for one sweep axis
+def sweep_axis_inputs(axis, name):
+    from sweep import SWEEP_PARAMETERS
+    label, start, stop, step = SWEEP_PARAMETERS[name]
+    col_start, col_stop, col_step = st.columns(3)
+    with col_start:
+        start = st.number_input("From", value=float(start), key=f"sweep_{axis}_{name}_start", **PERSIST_STATE)
+    with col_stop:
+        stop = st.number_input("To", value=float(stop), key=f"sweep_{axis}_{name}_stop", **PERSIST_STATE)
+    with col_step:
+        step = st.number_input("Step", min_value=0.01, value=float(step), key=f"sweep_{axis}_{name}_step",
+                               **PERSIST_STATE)
+    return start, stop, step
+
+rerun_timer.mark('setup')
 
 # Create tabs for the dashboard
-tab1, tab2, tab3 = st.tabs(["Simulation Parameters", "Results", "Strategy"])
+tab1, tab2, tab3, tab4, tab5 = create_tabs()
 
 # Tab 1: Simulation Parameters
 with tab1:
@@ -283,45 +413,82 @@ with tab1:
             value=st.session_state.reinvestment_rate,
             step=5
         )
+
+        st.session_state.simulation_model = st.radio(
+            "Simulation Model",
+            list(SIMULATION_MODELS),
+            index=list(SIMULATION_MODELS).index(st.session_state.simulation_model),
+            horizontal=True,
+            help="Cashflow models step through each day or hour, so transfer holds lock capital "
+                 "and daily limits cap how much each platform deploys per day. The historical backtest "
+                 "trades only when recorded quotes offer a spread net of fees"
+        )
+
+        if st.session_state.simulation_model == BACKTEST_MODEL:
+            st.session_state.backtest_file = st.text_input(
+                "Tick File",
+                value=st.session_state.backtest_file,
+                help="CSV or Parquet file with timestamp, venue, bid and ask columns (or OHLC bars with close)"
+            )
+
+        st.session_state.spread_source = st.radio(
+            "Spread Source",
+            SPREAD_SOURCES,
+            index=SPREAD_SOURCES.index(st.session_state.spread_source),
+            horizontal=True,
+            help="Live Feed replaces the spread slider with the rolling mean cross-venue spread from the price feed"
+        )
+
+        live_feed = None
+        if st.session_state.spread_source == 'Live Feed':
+            st.session_state.price_feed_files = st.text_input(
+                "Replay Files",
+                value=st.session_state.price_feed_files,
+                help="Comma-separated CSV recordings with timestamp, venue, symbol, bid and ask columns"
+            )
+            st.session_state.price_feed_speed = st.number_input(
+                "Replay Speed (x)",
+                min_value=0.1,
+                max_value=1000.0,
+                value=float(st.session_state.price_feed_speed),
+                step=1.0
+            )
+
+            feed_paths = tuple(path.strip() for path in st.session_state.price_feed_files.split(',') if path.strip())
+            missing_paths = [path for path in feed_paths if not os.path.exists(path)]
+            if not feed_paths:
+                st.info("Enter one or more replay files to start the price feed")
+            elif missing_paths:
+                st.error(f"Replay file not found: {', '.join(missing_paths)}")
+            else:
+                live_feed = get_price_feed(feed_paths, st.session_state.price_feed_speed).snapshot()
+                for error in live_feed['errors']:
+                    st.error(error)
+                if live_feed['mean_spread'] is None:
+                    st.info("Waiting for quotes from at least two venues; using the manual spread")
+                    live_feed = None
+                else:
+                    st.markdown(
+                        f"Live spread ({LIVE_SPREAD_WINDOW}s mean): **{format_percentage(live_feed['mean_spread'])}** · "
+                        f"last {format_percentage(live_feed['last_spread'])} buying on "
+                        f"{format_platform_name(live_feed['buy_venue'])} and selling on "
+                        f"{format_platform_name(live_feed['sell_venue'])} · "
+                        f"{live_feed['ticks_per_second']:,.0f} ticks/s"
+                    )
+                    st.button("Refresh Spread")
     
     with col2:
         st.markdown("<div class='sub-header'>Capital Distribution</div>", unsafe_allow_html=True)
         
-        st.session_state.robinhood_capital = st.number_input(
-            "Robinhood Capital ($)",
-            min_value=0,
-            max_value=int(st.session_state.initial_capital),
-            value=min(st.session_state.robinhood_capital, st.session_state.initial_capital),
-            step=100,
-            help="Daily limit: $1,000"
-        )
-        
-        st.session_state.coinbase_capital = st.number_input(
-            "Coinbase Capital ($)",
-            min_value=0,
-            max_value=int(st.session_state.initial_capital),
-            value=min(st.session_state.coinbase_capital, st.session_state.initial_capital),
-            step=100,
-            help="6-day holding period"
-        )
-        
-        st.session_state.kraken_capital = st.number_input(
-            "Kraken Capital ($)",
-            min_value=0,
-            max_value=int(st.session_state.initial_capital),
-            value=min(st.session_state.kraken_capital, st.session_state.initial_capital),
-            step=100,
-            help="Daily limit: $5,000"
-        )
-        
-        st.session_state.cashapp_capital = st.number_input(
-            "CashApp Capital ($)",
-            min_value=0,
-            max_value=int(st.session_state.initial_capital),
-            value=min(st.session_state.cashapp_capital, st.session_state.initial_capital),
-            step=100,
-            help="Instant (1.7% fee) or Standard (0% fee, 48h)"
-        )
+        for name, allocation in REGISTRY.allocations.items():
+            st.session_state[f'{name}_capital'] = st.number_input(
+                f"{REGISTRY.label(name)} Capital ($)",
+                min_value=0,
+                max_value=int(st.session_state.initial_capital),
+                value=min(st.session_state[f'{name}_capital'], st.session_state.initial_capital),
+                step=100,
+                help=allocation.get('help')
+            )
         
         total_allocated = get_total_allocated_capital()
         is_matching = total_allocated == st.session_state.initial_capital
@@ -337,228 +504,750 @@ with tab1:
         
         st.markdown("</div>", unsafe_allow_html=True)
 
+        # Cash already on its way to an allocation, which the deployment schedule can use once it arrives
+        st.markdown("<div class='sub-header'>Pending Transfers</div>", unsafe_allow_html=True)
+        pending_df = st.data_editor(
+            PENDING_TRANSFERS,
+            key='pending_transfers',
+            num_rows='dynamic',
+            hide_index=True,
+            use_container_width=True,
+            column_config={
+                'allocation': st.column_config.SelectboxColumn(
+                    "Allocation", options=list(REGISTRY.allocations), required=True
+                ),
+                'amount': st.column_config.NumberColumn("Amount ($)", min_value=0, step=100, required=True),
+                'day': st.column_config.NumberColumn(
+                    "Arrives on Day", min_value=1, max_value=SCHEDULE_DAYS, step=1, required=True
+                )
+            }
+        )
+        pending_transfers = tuple(
+            (transfer.allocation, float(transfer.amount), int(transfer.day) - 1)
+            for transfer in pending_df.dropna().itertuples()
+        )
+
+rerun_timer.mark('widgets')
+
 # Run simulation and generate data
-simulation_df, comparison_df = run_simulation()
+simulation_params = SimulationParams.from_mapping(st.session_state)
+if live_feed is not None:
+    simulation_params.spread_percentage = live_feed['mean_spread']
+step_hours = SIMULATION_MODELS[st.session_state.simulation_model]
+results_cache = get_results_cache()
+recompute = {}
+if SERVER_MODE:
+    simulation_df, comparison_df = session_handles().get(
+        'simulation', simulation_key(simulation_params, step_hours),
+        lambda: results_cache.simulate(simulation_params, step_hours, recompute)
+    )
+else:
+    simulation_df, comparison_df = results_cache.simulate(simulation_params, step_hours, recompute)
+
+# The engine is shared, so keep what this session's own last miss recomputed
+if recompute:
+    st.session_state.last_recompute = recompute
+
+# Batch jobs reach the same cache through the HTTP API when a port is configured
+api_port = os.environ.get('DASHBOARD_API_PORT')
+if api_port:
+    get_api_server(int(api_port))
+
+backtest = None
+if st.session_state.simulation_model == BACKTEST_MODEL:
+    backtest_file = st.session_state.backtest_file.strip()
+    if not backtest_file:
+        st.warning("Enter a tick file on the Simulation Parameters tab to run the historical backtest")
+    elif not os.path.exists(backtest_file):
+        st.error(f"Tick file not found: {backtest_file}")
+    else:
+        try:
+            file_stat = os.stat(backtest_file)
+            backtest = backtest_results(simulation_params.to_dict(), backtest_file, file_stat.st_size, file_stat.st_mtime)
+            simulation_df = backtest.simulation_df
+        except (ValueError, KeyError) as e:
+            st.error(f"Could not backtest {backtest_file}: {e}")
+rerun_timer.mark('simulation')
+
+# Sensitivity analysis, which reruns on its own when the output changes
+@fragment
+def sensitivity_section(params):
+    from charts import tornado_figure
+    from sensitivity import OUTPUTS as SENSITIVITY_OUTPUTS, SWING
+
+    st.markdown("<div class='sub-header'>Sensitivity Analysis</div>", unsafe_allow_html=True)
+
+    output = st.radio(
+        "Output",
+        list(SENSITIVITY_OUTPUTS),
+        format_func=SENSITIVITY_OUTPUTS.get,
+        horizontal=True,
+        key='sensitivity_output',
+        **PERSIST_STATE
+    )
+    label = SENSITIVITY_OUTPUTS[output]
+
+    sensitivity_df = input_sensitivity(params.to_dict())
+    output_df = sensitivity_df[sensitivity_df['output'] == output].reset_index(drop=True)
+
+    fig6 = get_figure_cache().figure(tornado_figure, output_df, label)
+    rerun_timer.mark('sensitivity')
+    rerun_timer.chart('fig6', fig6)
+    st.plotly_chart(fig6, use_container_width=True)
+    st.caption(
+        f"{label.rsplit(' (', 1)[0]} with each input {SWING:.0%} lower and higher, every other input unchanged "
+        f"(monthly model, all {len(output_df)} inputs in one batched evaluation)"
+    )
+
+    format_output = format_currency if output == 'ending_capital' else format_percentage
+    gradient_df = pd.DataFrame({
+        'Input': output_df['label'],
+        'Value': output_df['value'].apply(lambda value: f"{value:,.4g}"),
+        'Gradient (per Unit)': output_df['gradient'].apply(lambda value: f"{value:,.4g}"),
+        'Elasticity': output_df['elasticity'].apply(lambda value: f"{value:.3f}" if np.isfinite(value) else ''),
+        f'{SWING:.0%} Lower': output_df['low'].apply(format_output),
+        f'{SWING:.0%} Higher': output_df['high'].apply(format_output)
+    })
+    st.dataframe(gradient_df, use_container_width=True, hide_index=True)
+    st.caption("Gradient: change in the output per unit of the input, by central differences over ±1%. "
+               "Elasticity: % change in the output per 1% change in the input.")
 
 # Tab 2: Results
 with tab2:
-    # Summary statistics in cards at the top
-    st.markdown("<div class='sub-header'>Summary Statistics</div>", unsafe_allow_html=True)
-    col1, col2, col3 = st.columns(3)
+    if tab_open(tab2):
+        # Summary statistics in cards at the top
+        st.markdown("<div class='sub-header'>Summary Statistics</div>", unsafe_allow_html=True)
+        col1, col2, col3 = st.columns(3)
     
-    with col1:
-        st.markdown("<div class='metric-card'>", unsafe_allow_html=True)
-        st.markdown("**Ending Capital**")
-        ending_capital = simulation_df.iloc[-1]['capital'] if not simulation_df.empty else st.session_state.initial_capital
-        st.markdown(f"<span class='stat-value'>{format_currency(ending_capital)}</span>", unsafe_allow_html=True)
-        st.markdown("</div>", unsafe_allow_html=True)
+        with col1:
+            st.markdown("<div class='metric-card'>", unsafe_allow_html=True)
+            st.markdown("**Ending Capital**")
+            ending_capital = simulation_df.iloc[-1]['capital'] if not simulation_df.empty else st.session_state.initial_capital
+            st.markdown(f"<span class='stat-value'>{format_currency(ending_capital)}</span>", unsafe_allow_html=True)
+            st.markdown("</div>", unsafe_allow_html=True)
     
-    with col2:
-        st.markdown("<div class='metric-card'>", unsafe_allow_html=True)
-        st.markdown("**Total Profit**")
-        total_profit = ending_capital - st.session_state.initial_capital
-        st.markdown(f"<span class='stat-value green-text'>{format_currency(total_profit)}</span>", unsafe_allow_html=True)
-        st.markdown("</div>", unsafe_allow_html=True)
+        with col2:
+            st.markdown("<div class='metric-card'>", unsafe_allow_html=True)
+            st.markdown("**Total Profit**")
+            total_profit = ending_capital - st.session_state.initial_capital
+            st.markdown(f"<span class='stat-value green-text'>{format_currency(total_profit)}</span>", unsafe_allow_html=True)
+            st.markdown("</div>", unsafe_allow_html=True)
     
-    with col3:
-        st.markdown("<div class='metric-card'>", unsafe_allow_html=True)
-        st.markdown("**Return Rate**")
-        return_rate = simulation_df.iloc[-1]['accumulated_return'] if not simulation_df.empty else 0
-        st.markdown(f"<span class='stat-value blue-text'>{format_percentage(return_rate)}</span>", unsafe_allow_html=True)
-        st.markdown("</div>", unsafe_allow_html=True)
+        with col3:
+            st.markdown("<div class='metric-card'>", unsafe_allow_html=True)
+            st.markdown("**Return Rate**")
+            return_rate = simulation_df.iloc[-1]['accumulated_return'] if not simulation_df.empty else 0
+            st.markdown(f"<span class='stat-value blue-text'>{format_percentage(return_rate)}</span>", unsafe_allow_html=True)
+            st.markdown("</div>", unsafe_allow_html=True)
     
-    # Capital growth chart
-    st.markdown("<div class='sub-header'>Capital Growth Over Time</div>", unsafe_allow_html=True)
-    
-    # Create a plotly figure for capital growth
-    fig1 = go.Figure()
-    
-    # Add traces for each capital type
-    fig1.add_trace(go.Scatter(
-        x=simulation_df['month'],
-        y=simulation_df['capital'],
-        mode='lines+markers',
-        name='Total Capital ($)',
-        line=dict(color='#8884d8', width=3),
-        marker=dict(size=8)
-    ))
+        rerun_timer.mark('summary')
+
+        from charts import (CHART_MODES, capital_growth_figure, deployment_figure, monthly_profit_figure,
+                            simulation_points, use_lightweight)
+
+        # Lightweight charts use WebGL traces downsampled to the chart width
+        st.radio("Chart Mode", CHART_MODES, key='chart_mode', horizontal=True,
+                 help="Auto switches to lightweight charts for long horizons or many platforms", **PERSIST_STATE)
+        figure_cache = get_figure_cache()
+        lightweight = use_lightweight(st.session_state.chart_mode, simulation_points(simulation_df))
+
+        # Capital growth chart
+        st.markdown("<div class='sub-header'>Capital Growth Over Time</div>", unsafe_allow_html=True)
     
-    fig1.add_trace(go.Scatter(
-        x=simulation_df['month'],
-        y=simulation_df['robinhood_capital'],
-        mode='lines',
-        name='Robinhood Capital',
-        line=dict(color='#2196F3')
-    ))
+        fig1 = figure_cache.figure(capital_growth_figure, simulation_df, lightweight=lightweight)
+        rerun_timer.mark('fig1_build')
+        rerun_timer.chart('fig1', fig1)
     
-    fig1.add_trace(go.Scatter(
-        x=simulation_df['month'],
-        y=simulation_df['coinbase_capital'],
-        mode='lines',
-        name='Coinbase Capital',
-        line=dict(color='#9C27B0')
-    ))
+        # Display the chart
+        st.plotly_chart(fig1, use_container_width=True)
+        rerun_timer.mark('fig1_render')
     
-    fig1.add_trace(go.Scatter(
-        x=simulation_df['month'],
-        y=simulation_df['kraken_capital'],
-        mode='lines',
-        name='Kraken Capital',
-        line=dict(color='#4CAF50')
-    ))
+        # Monthly profit chart
+        st.markdown("<div class='sub-header'>Monthly Profit</div>", unsafe_allow_html=True)
     
-    fig1.add_trace(go.Scatter(
-        x=simulation_df['month'],
-        y=simulation_df['cashapp_capital'],
-        mode='lines',
-        name='CashApp Capital',
-        line=dict(color='#FFC107')
-    ))
+        fig2 = figure_cache.figure(monthly_profit_figure, simulation_df, lightweight=lightweight)
+        rerun_timer.mark('fig2_build')
+        rerun_timer.chart('fig2', fig2)
     
-    # Update layout
-    fig1.update_layout(
-        title='',
-        xaxis_title='Month',
-        yaxis_title='Capital ($)',
-        legend=dict(
-            orientation="h",
-            yanchor="bottom",
-            y=1.02,
-            xanchor="right",
-            x=1
-        ),
-        height=500,
-        margin=dict(l=20, r=20, t=30, b=20),
-        hovermode="x unified"
-    )
+        # Display the chart
+        st.plotly_chart(fig2, use_container_width=True)
+        rerun_timer.mark('fig2_render')
+
+        # Throughput of the day-by-day deployment plan, which the Strategy tab shows as a calendar
+        plan = deployment_plan(simulation_params.to_dict(), pending_transfers)
+        rerun_timer.mark('schedule')
+
+        st.markdown("<div class='sub-header'>Scheduled Throughput</div>", unsafe_allow_html=True)
+        col1, col2, col3 = st.columns(3)
+
+        with col1:
+            st.markdown("<div class='metric-card'>", unsafe_allow_html=True)
+            st.markdown("**Monthly Volume**")
+            st.markdown(f"<span class='stat-value'>{format_currency(plan.monthly_volume)}</span>", unsafe_allow_html=True)
+            st.markdown("</div>", unsafe_allow_html=True)
+
+        with col2:
+            st.markdown("<div class='metric-card'>", unsafe_allow_html=True)
+            st.markdown("**Scheduled Profit**")
+            st.markdown(f"<span class='stat-value green-text'>{format_currency(plan.profit)}</span>", unsafe_allow_html=True)
+            st.markdown("</div>", unsafe_allow_html=True)
+
+        with col3:
+            st.markdown("<div class='metric-card'>", unsafe_allow_html=True)
+            st.markdown("**Capital Turnover**")
+            turnover = plan.monthly_volume / st.session_state.initial_capital
+            st.markdown(f"<span class='stat-value blue-text'>{turnover:.1f}x</span>", unsafe_allow_html=True)
+            st.markdown("</div>", unsafe_allow_html=True)
+
+        fig5 = figure_cache.figure(deployment_figure, plan.schedule)
+        rerun_timer.chart('fig5', fig5)
+        st.plotly_chart(fig5, use_container_width=True)
+        st.caption(
+            f"Deployments over {SCHEDULE_DAYS} days within each platform's daily limit and transfer hold, "
+            f"with idle cash moved through the bank to where it cycles fastest; profit is not reinvested within the month"
+        )
+        rerun_timer.mark('schedule_render')
     
-    fig1.update_xaxes(tickmode='linear', tick0=0, dtick=1)
+        # Trades taken by the historical backtest
+        if backtest is not None:
+            st.markdown("<div class='sub-header'>Backtest Trades</div>", unsafe_allow_html=True)
+
+            trades_df = backtest.trades_df.drop(columns='platform')
+            trades_df['allocation'] = trades_df['allocation'].apply(format_platform_name)
+            trades_df['volume'] = trades_df['volume'].apply(format_currency)
+            trades_df['profit'] = trades_df['profit'].apply(format_currency)
+            trades_df['mean_edge'] = trades_df['mean_edge'].apply(format_percentage)
+            trades_df.columns = ['Allocation', 'Trades', 'Volume', 'Profit', 'Mean Net Edge']
+            st.dataframe(trades_df, use_container_width=True, hide_index=True)
+
+            covered_days = (backtest.end - backtest.start) / 86400
+            st.caption(
+                f"{backtest.ticks:,} ticks over {covered_days:,.1f} days · "
+                f"{backtest.actionable_buckets:,} of {backtest.buckets:,} minutes had a net edge"
+            )
+
+        # Platform comparison
+        st.markdown("<div class='sub-header'>Platform Comparison</div>", unsafe_allow_html=True)
     
-    # Display the chart
-    st.plotly_chart(fig1, use_container_width=True)
+        # Format the comparison dataframe for display
+        display_comparison_df = comparison_df.copy()
+        display_comparison_df['platform'] = display_comparison_df['platform'].apply(format_platform_name)
+        display_comparison_df.columns = [col.replace('_', ' ').title() for col in display_comparison_df.columns]
     
-    # Monthly profit chart
-    st.markdown("<div class='sub-header'>Monthly Profit</div>", unsafe_allow_html=True)
+        # Format columns
+        display_comparison_df['Fee'] = display_comparison_df['Fee'].apply(lambda x: f"{x}%")
+        display_comparison_df['Daily Limit'] = display_comparison_df['Daily Limit'].apply(lambda x: f"${x:,}")
+        display_comparison_df['Monthly Volume'] = display_comparison_df['Monthly Volume'].apply(lambda x: f"${x:,}")
+        display_comparison_df['Monthly Return'] = display_comparison_df['Monthly Return'].apply(lambda x: f"{x}%")
+        display_comparison_df['Yearly Return'] = display_comparison_df['Yearly Return'].apply(lambda x: f"{x}%")
     
-    # Filter out the initial month (0) which has no profit
-    profit_data = simulation_df[simulation_df['month'] > 0]
+        # Rename columns for better display
+        display_comparison_df = display_comparison_df.rename(columns={
+            'Platform': 'Platform',
+            'Fee': 'Fee (%)',
+            'Transfer Time': 'Transfer Time (hrs)',
+            'Daily Limit': 'Daily Limit ($)',
+            'Monthly Volume': 'Monthly Volume ($)',
+            'Cycles Per Month': 'Cycles/Month',
+            'Monthly Return': 'Monthly Return',
+            'Yearly Return': 'Yearly Return'
+        })
     
-    # Create a plotly bar chart for monthly profit
-    fig2 = px.bar(
-        profit_data,
-        x='month',
-        y='profit',
-        labels={'month': 'Month', 'profit': 'Profit ($)'},
-        color_discrete_sequence=['#82ca9d']
+        rerun_timer.mark('comparison_format')
+
+        # Display the table
+        st.dataframe(display_comparison_df, use_container_width=True)
+        rerun_timer.mark('comparison_render')
+
+        # Long-horizon projection from the closed-form fast path (monthly model)
+        st.markdown("<div class='sub-header'>Long-Horizon Projection</div>", unsafe_allow_html=True)
+
+        projected = project_horizons(simulation_params.to_dict())
+        projection_df = pd.DataFrame({
+            'Horizon': [f"{months // 12} {'Year' if months == 12 else 'Years'}" for months in PROJECTION_HORIZONS],
+            'Ending Capital': [format_currency(value) for value in projected],
+            'Accumulated Return': [
+                format_percentage((value / simulation_params.initial_capital - 1) * 100) for value in projected
+            ]
+        })
+        st.dataframe(projection_df, use_container_width=True, hide_index=True)
+        rerun_timer.mark('projection')
+
+        sensitivity_section(simulation_params)
+
+        # Saved scenarios
+        st.markdown("<div class='sub-header'>Saved Scenarios</div>", unsafe_allow_html=True)
+
+        scenario_store = get_scenario_store()
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            scenario_name = st.text_input("Scenario Name", value=f"Scenario {datetime.now().strftime('%Y-%m-%d %H%M')}")
+        with col2:
+            st.markdown("<br>", unsafe_allow_html=True)
+            if st.button("Save Scenario"):
+                try:
+                    scenario_store.save(scenario_name, simulation_params, simulation_df, comparison_df)
+                    st.success(f"Saved '{scenario_name}'")
+                except ValueError as e:
+                    st.error(str(e))
+
+        saved_scenarios = scenario_store.scenarios()
+        if saved_scenarios:
+            saved_df = pd.DataFrame(saved_scenarios)
+            saved_df['initial_capital'] = saved_df['initial_capital'].apply(format_currency)
+            saved_df['ending_capital'] = saved_df['ending_capital'].apply(format_currency)
+            saved_df.columns = ['Name', 'Saved At', 'Months', 'Initial Capital', 'Ending Capital']
+            st.dataframe(saved_df, use_container_width=True, hide_index=True)
+
+            col1, col2, col3 = st.columns([3, 1, 1])
+            with col1:
+                selected_scenario = st.selectbox("Saved Scenario", [row['name'] for row in saved_scenarios])
+            with col2:
+                st.markdown("<br>", unsafe_allow_html=True)
+                st.button("Load Scenario", on_click=load_scenario, args=(selected_scenario,))
+            with col3:
+                st.markdown("<br>", unsafe_allow_html=True)
+                st.button("Delete Scenario", on_click=scenario_store.delete, args=(selected_scenario,))
+        else:
+            st.caption("No saved scenarios yet")
+
+rerun_timer.mark('scenarios')
+
+# Allocation search, which reruns on its own when the transfer time cap changes
+@fragment
+def optimized_allocation_section(params):
+    st.markdown("### Optimized Allocation")
+
+    max_transfer_time = st.number_input(
+        "Max Transfer Time (hrs)",
+        min_value=1,
+        max_value=720,
+        value=168,
+        step=1,
+        help="Platforms that take longer than this to transfer are left out of the search",
+        key='optimizer_max_transfer_time',
+        **PERSIST_STATE
     )
-    
-    fig2.update_layout(
-        title='',
-        xaxis_title='Month',
-        yaxis_title='Monthly Profit ($)',
-        height=400,
-        margin=dict(l=20, r=20, t=30, b=20),
-        hovermode="x unified"
+
+    if not requested('optimizer', "Find Optimal Allocation"):
+        return
+
+    try:
+        optimization = find_optimal_allocation(
+            params.to_dict(), max_transfer_time
+        )
+    except ValueError as e:
+        st.warning(str(e))
+    else:
+        best = optimization.best
+        improvement = best['ending_capital'] - optimization.current_ending_capital
+
+        st.markdown(
+            f"Best of {optimization.evaluated:,} allocations (in {format_currency(optimization.step)} steps, then refined) "
+            f"ends at <span class='stat-value green-text'>{format_currency(best['ending_capital'])}</span> "
+            f"({format_currency(improvement)} more than the current distribution)",
+            unsafe_allow_html=True
+        )
+
+        display_allocations_df = optimization.allocations.copy()
+        display_allocations_df = display_allocations_df.rename(columns={
+            **{f'{name}_capital': format_platform_name(name) for name in REGISTRY.allocations},
+            'ending_capital': 'Ending Capital',
+            'accumulated_return': 'Return'
+        })
+        for col in display_allocations_df.columns:
+            if col == 'Return':
+                display_allocations_df[col] = display_allocations_df[col].apply(format_percentage)
+            else:
+                display_allocations_df[col] = display_allocations_df[col].apply(format_currency)
+
+        st.dataframe(display_allocations_df, use_container_width=True)
+        st.button("Apply Optimized Allocation", on_click=apply_allocation, args=(best.to_dict(),))
+
+    # Applying an allocation changes the Simulation Parameters, which a fragment rerun wouldn't pick up
+    if FRAGMENT and st.session_state.pop('inputs_changed', False):
+        rerun_app()
+
+# Best multi-leg routes, which re-rank on their own when the capital per route changes
+@fragment
+def best_routes_section(params):
+    st.markdown("### Best Routes")
+    st.markdown("Bank → exchange → P2P venue → payment rail → bank cycles, ranked by monthly profit.")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        route_capital = st.number_input(
+            "Capital per Route ($)",
+            min_value=100,
+            value=int(params.initial_capital),
+            step=100,
+            help="Capital cycled through a single route",
+            key='route_capital',
+            **PERSIST_STATE
+        )
+    with col2:
+        route_count = st.number_input("Routes Shown", min_value=1, max_value=20, value=5, step=1, key='route_count',
+                                      **PERSIST_STATE)
+
+    try:
+        routes_df = get_route_finder().top_routes(params, capital=route_capital, k=route_count)
+    except ValueError as e:
+        st.warning(str(e))
+        return
+
+    display_routes_df = routes_df.drop(columns='path')
+    display_routes_df['cycle_return'] = display_routes_df['cycle_return'].apply(format_percentage)
+    display_routes_df['cycle_time'] = display_routes_df['cycle_time'].apply(lambda hours: f"{hours:g} hrs")
+    display_routes_df['daily_limit'] = display_routes_df['daily_limit'].apply(
+        lambda limit: "Unlimited" if np.isinf(limit) else format_currency(limit)
     )
-    
-    fig2.update_xaxes(tickmode='linear', tick0=1, dtick=1)
-    
-    # Display the chart
-    st.plotly_chart(fig2, use_container_width=True)
-    
-    # Platform comparison
-    st.markdown("<div class='sub-header'>Platform Comparison</div>", unsafe_allow_html=True)
-    
-    # Format the comparison dataframe for display
-    display_comparison_df = comparison_df.copy()
-    display_comparison_df['platform'] = display_comparison_df['platform'].apply(format_platform_name)
-    display_comparison_df.columns = [col.replace('_', ' ').title() for col in display_comparison_df.columns]
-    
-    # Format columns
-    display_comparison_df['Fee'] = display_comparison_df['Fee'].apply(lambda x: f"{x}%")
-    display_comparison_df['Daily Limit'] = display_comparison_df['Daily Limit'].apply(lambda x: f"${x:,}")
-    display_comparison_df['Monthly Volume'] = display_comparison_df['Monthly Volume'].apply(lambda x: f"${x:,}")
-    display_comparison_df['Monthly Return'] = display_comparison_df['Monthly Return'].apply(lambda x: f"{x}%")
-    display_comparison_df['Yearly Return'] = display_comparison_df['Yearly Return'].apply(lambda x: f"{x}%")
-    
-    # Rename columns for better display
-    display_comparison_df = display_comparison_df.rename(columns={
-        'Platform': 'Platform',
-        'Fee': 'Fee (%)',
-        'Transfer Time': 'Transfer Time (hrs)',
-        'Daily Limit': 'Daily Limit ($)',
-        'Monthly Volume': 'Monthly Volume ($)',
-        'Cycles Per Month': 'Cycles/Month',
-        'Monthly Return': 'Monthly Return',
-        'Yearly Return': 'Yearly Return'
-    })
-    
-    # Display the table
-    st.dataframe(display_comparison_df, use_container_width=True)
+    display_routes_df['cycles_per_month'] = display_routes_df['cycles_per_month'].round(1)
+    display_routes_df['monthly_return'] = display_routes_df['monthly_return'].apply(format_percentage)
+    display_routes_df['monthly_profit'] = display_routes_df['monthly_profit'].apply(format_currency)
+    display_routes_df.columns = ['Route', 'Return per Cycle', 'Cycle Time', 'Daily Limit', 'Cycles/Month',
+                                 'Monthly Return', 'Monthly Profit']
+    st.dataframe(display_routes_df, use_container_width=True, hide_index=True)
 
 # Tab 3: Strategy
 with tab3:
-    st.markdown("<div class='sub-header'>Optimized Multi-Platform Strategy</div>", unsafe_allow_html=True)
+    if tab_open(tab3):
+        st.markdown("<div class='sub-header'>Optimized Multi-Platform Strategy</div>", unsafe_allow_html=True)
     
-    st.markdown("<div class='card' style='background-color: #fffde7;'>", unsafe_allow_html=True)
-    st.markdown("### Current Capital Distribution")
-    st.markdown(f"Optimized allocation of your {format_currency(st.session_state.initial_capital)} starting capital:")
+        st.markdown("<div class='card' style='background-color: #fffde7;'>", unsafe_allow_html=True)
+        st.markdown("### Current Capital Distribution")
+        st.markdown(f"Allocation of your {format_currency(st.session_state.initial_capital)} starting capital:")
     
-    # Display the capital distribution as a bullet list
-    st.markdown(f"""
-    * **Robinhood:** {format_currency(st.session_state.robinhood_capital)} ({format_currency(min(st.session_state.platform_data['robinhood']['daily_limit'], st.session_state.robinhood_capital))}/day effective throughput)
-    * **Coinbase:** {format_currency(st.session_state.coinbase_capital)} (6-day cycle, rolling deposits)
-    * **Kraken:** {format_currency(st.session_state.kraken_capital)} ({format_currency(min(st.session_state.platform_data['kraken']['daily_limit'], st.session_state.kraken_capital))}/day effective throughput)
-    * **CashApp:** {format_currency(st.session_state.cashapp_capital)} (reserve for opportunistic trades)
-    """)
+        # Display the capital distribution as a bullet list
+        st.markdown("\n".join(
+            f"* **{REGISTRY.label(name)}:** {format_currency(st.session_state[f'{name}_capital'])} ({allocation_note(name)})"
+            for name in REGISTRY.allocations
+        ))
     
-    st.markdown("### Daily Operational Schedule:")
+        optimized_allocation_section(simulation_params)
+
+        best_routes_section(simulation_params)
+
+        # Cross-venue spreads from the price feed, net of both platforms' fees
+        if live_feed is not None and live_feed['pairs']:
+            st.markdown("### Live Cross-Venue Spreads")
+
+            platform_data = st.session_state.platform_data
+            live_pairs_df = pd.DataFrame(live_feed['pairs'])
+            live_pairs_df['net'] = [
+                pair['spread'] - platform_data.get(pair['buy'], {}).get('fee', 0) - platform_data.get(pair['sell'], {}).get('fee', 0)
+                for pair in live_feed['pairs']
+            ]
+            live_pairs_df = live_pairs_df.sort_values('net', ascending=False)
+            live_pairs_df['buy'] = live_pairs_df['buy'].apply(format_platform_name)
+            live_pairs_df['sell'] = live_pairs_df['sell'].apply(format_platform_name)
+            live_pairs_df['spread'] = live_pairs_df['spread'].apply(format_percentage)
+            live_pairs_df['net'] = live_pairs_df['net'].apply(format_percentage)
+            live_pairs_df.columns = ['Buy On', 'Sell On', 'Spread', 'Net of Fees']
+            st.dataframe(live_pairs_df, use_container_width=True, hide_index=True)
+
+        st.markdown("### Daily Operational Schedule:")
+        plan = deployment_plan(simulation_params.to_dict(), pending_transfers)
+
+        # Capital each allocation deploys per day, with cash moved through the bank between them
+        calendar_df = plan.schedule.pivot(index='day', columns='allocation', values='deployed')
+        calendar_df = calendar_df[list(plan.schedule['allocation'].unique())]
+        calendar_df = calendar_df[calendar_df.sum(axis=1) > 0]
+        calendar_df.index = [f"Day {day + 1}" for day in calendar_df.index]
+        calendar_df.columns = [format_platform_name(name) for name in calendar_df.columns]
+        for col in calendar_df.columns:
+            calendar_df[col] = calendar_df[col].apply(lambda amount: format_currency(amount) if amount else '')
+        st.dataframe(calendar_df, use_container_width=True)
+
+        if not plan.transfers.empty:
+            transfers_df = plan.transfers.copy()
+            transfers_df['day'] = transfers_df['day'] + 1
+            transfers_df['arrival_day'] = transfers_df['arrival_day'] + 1
+            transfers_df['source'] = transfers_df['source'].apply(format_platform_name)
+            transfers_df['target'] = transfers_df['target'].apply(format_platform_name)
+            transfers_df['amount'] = transfers_df['amount'].apply(format_currency)
+            transfers_df.columns = ['Day', 'From', 'To', 'Amount', 'Arrives on Day']
+            st.markdown("**Transfers:**")
+            st.dataframe(transfers_df, use_container_width=True, hide_index=True)
+
+        st.markdown("### Maximum Monthly Throughput:")
+
+        st.markdown(f"<span class='stat-value green-text'>{format_currency(plan.monthly_volume)}</span>", unsafe_allow_html=True)
+
+        volume_by_allocation = plan.volume_by_allocation()
+        st.markdown(f"""
+        <p style='font-size: 0.9rem; color: #666;'>
+        (Based on {', '.join(f'{REGISTRY.label(name)}: {format_currency(volume)}' for name, volume in volume_by_allocation.items() if volume)};
+        scheduled in {plan.solve_time * 1000:,.0f} ms)
+        </p>
+        """, unsafe_allow_html=True)
     
+        st.markdown("</div>", unsafe_allow_html=True)
+
+rerun_timer.mark('strategy')
+
+# Parameter sweep, which reruns on its own when its axes change
+@fragment
+def parameter_sweep_section(params):
+    from charts import sweep_heatmap_figure
+    from sweep import SWEEP_PARAMETERS, axis_values
+
+    st.markdown("<div class='sub-header'>Parameter Sweep</div>", unsafe_allow_html=True)
+    st.markdown("Ending capital over a grid of two inputs, with every other input taken from the Simulation Parameters tab.")
+
+    sweep_names = list(SWEEP_PARAMETERS)
     col1, col2 = st.columns(2)
-    
+
     with col1:
-        st.markdown("**Monday-Friday:**")
-        st.markdown("""
-        * Deploy Robinhood capital ($1,000/day)
-        * Deploy Kraken capital (up to $5,000/day)
-        * Monitor Coinbase capital releases (after 6-day hold)
-        """)
-    
+        x_name = st.selectbox(
+            "X Axis",
+            sweep_names,
+            index=sweep_names.index('spread_percentage'),
+            format_func=lambda name: SWEEP_PARAMETERS[name][0],
+            key='sweep_x_name',
+            **PERSIST_STATE
+        )
+        x_axis = sweep_axis_inputs('x', x_name)
+
     with col2:
-        st.markdown("**Timing Strategy:**")
-        st.markdown("""
-        * Morning: Initiate transfers from purchasing platforms
-        * Afternoon: Execute P2P trades on Binance
-        * Evening: Prepare next day's transactions
-        """)
-    
-    st.markdown("### Maximum Monthly Throughput:")
-    
-    max_throughput = (
-        st.session_state.platform_data['robinhood']['daily_limit'] * 30 +
-        st.session_state.platform_data['kraken']['daily_limit'] * 30 +
-        st.session_state.coinbase_capital / 2
-    )
-    
-    st.markdown(f"<span class='stat-value green-text'>{format_currency(max_throughput)}</span>", unsafe_allow_html=True)
-    
-    st.markdown(f"""
-    <p style='font-size: 0.9rem; color: #666;'>
-    (Based on Robinhood: {format_currency(st.session_state.platform_data['robinhood']['daily_limit'] * 30)}, 
-    Kraken: {format_currency(st.session_state.platform_data['kraken']['daily_limit'] * 30)}, 
-    Coinbase: ~{format_currency(st.session_state.coinbase_capital / 2)} with 6-day cycle)
-    </p>
-    """, unsafe_allow_html=True)
-    
-    st.markdown("</div>", unsafe_allow_html=True)
+        y_names = [name for name in sweep_names if name != x_name]
+        y_name = st.selectbox(
+            "Y Axis",
+            y_names,
+            index=y_names.index('cycles_per_month') if 'cycles_per_month' in y_names else 0,
+            format_func=lambda name: SWEEP_PARAMETERS[name][0],
+            key='sweep_y_name',
+            **PERSIST_STATE
+        )
+        y_axis = sweep_axis_inputs('y', y_name)
+
+    if not requested('sweep', "Run Sweep"):
+        return
+
+    try:
+        sweep_grid = evaluate_sweep(
+            params.to_dict(), x_name, x_axis, y_name, y_axis
+        )
+    except ValueError as e:
+        st.error(str(e))
+    else:
+        x_values = axis_values(*x_axis)
+        y_values = axis_values(*y_axis)
+
+        fig3 = get_figure_cache().figure(
+            sweep_heatmap_figure, sweep_grid, x_values, y_values,
+            SWEEP_PARAMETERS[x_name][0], SWEEP_PARAMETERS[y_name][0]
+        )
+
+        rerun_timer.mark('sweep')
+        rerun_timer.chart('fig3', fig3)
+        st.plotly_chart(fig3, use_container_width=True)
+        rerun_timer.mark('fig3_render')
+        st.caption(f"{len(y_values)} × {len(x_values)} cells over {params.months} months")
+
+        # Save the grid in long form (one row per cell) to the scenario store
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            sweep_name = st.text_input("Sweep Name", value=f"{x_name} x {y_name}")
+        with col2:
+            st.markdown("<br>", unsafe_allow_html=True)
+            if st.button("Save Sweep"):
+                xs, ys = np.meshgrid(x_values, y_values)
+                try:
+                    get_scenario_store().save_sweep(
+                        sweep_name,
+                        {x_name: xs.ravel(), y_name: ys.ravel(), 'ending_capital': sweep_grid.ravel()},
+                        params=params,
+                        metadata={'x': x_name, 'y': y_name}
+                    )
+                    st.success(f"Saved '{sweep_name}' ({sweep_grid.size:,} rows)")
+                except ValueError as e:
+                    st.error(str(e))
+
+# Tab 4: Parameter Sweep
+with tab4:
+    if tab_open(tab4):
+        parameter_sweep_section(simulation_params)
+
+rerun_timer.mark('sweep_tab')
+
+# Monte Carlo simulation, which reruns on its own when its form is submitted
+@fragment
+def monte_carlo_section(params):
+    st.markdown("<div class='sub-header'>Monte Carlo Simulation</div>", unsafe_allow_html=True)
+    st.markdown("Each path draws a new spread, fees, transfer delays and failed cycles every month around the Simulation Parameters.")
+
+    # Imported here since the process pool machinery it loads is only needed once this tab is used
+    from charts import monte_carlo_figure, use_lightweight
+    from montecarlo import MonteCarloConfig
+
+    defaults = MonteCarloConfig()
+
+    with st.form("monte_carlo"):
+        col1, col2, col3 = st.columns(3)
+
+        with col1:
+            mc_paths = st.number_input("Paths", min_value=1000, max_value=1000000, value=defaults.paths, step=10000,
+                                       key='mc_paths', **PERSIST_STATE)
+            mc_seed = st.number_input("Random Seed", min_value=0, value=defaults.seed, step=1, key='mc_seed',
+                                      **PERSIST_STATE)
+
+        with col2:
+            mc_spread_std = st.number_input(
+                "Spread Std Dev (%)", min_value=0.0, max_value=5.0, value=defaults.spread_std, step=0.1,
+                key='mc_spread_std', **PERSIST_STATE
+            )
+            mc_fee_std = st.number_input(
+                "Fee Std Dev (%)", min_value=0.0, max_value=1.0, value=defaults.fee_std, step=0.01,
+                key='mc_fee_std', **PERSIST_STATE
+            )
+
+        with col3:
+            mc_delay = st.number_input(
+                "Mean Transfer Delay (hrs)", min_value=0.0, max_value=168.0, value=defaults.transfer_delay_mean, step=1.0,
+                key='mc_delay', **PERSIST_STATE
+            )
+            mc_failure = st.slider(
+                "Failed Cycle Rate (%)", min_value=0.0, max_value=50.0, value=defaults.failure_rate * 100, step=0.5,
+                key='mc_failure', **PERSIST_STATE
+            )
+
+        if st.form_submit_button("Run Monte Carlo"):
+            st.session_state.monte_carlo_config = {
+                'paths': int(mc_paths),
+                'spread_std': mc_spread_std,
+                'fee_std': mc_fee_std,
+                'transfer_delay_mean': mc_delay,
+                'failure_rate': mc_failure / 100,
+                'seed': int(mc_seed)
+            }
+
+    if 'monte_carlo_config' in st.session_state:
+        mc = monte_carlo_bands(
+            params.to_dict(), st.session_state.monte_carlo_config
+        )
+        bands = dict(zip(mc.percentiles, mc.capital_bands))
+
+        col1, col2, col3 = st.columns(3)
+
+        with col1:
+            st.markdown("<div class='metric-card'>", unsafe_allow_html=True)
+            st.markdown("**Median Ending Capital**")
+            st.markdown(f"<span class='stat-value'>{format_currency(bands[50][-1])}</span>", unsafe_allow_html=True)
+            st.markdown("</div>", unsafe_allow_html=True)
+
+        with col2:
+            st.markdown("<div class='metric-card'>", unsafe_allow_html=True)
+            st.markdown("**5th Percentile Ending Capital**")
+            st.markdown(f"<span class='stat-value blue-text'>{format_currency(bands[5][-1])}</span>", unsafe_allow_html=True)
+            st.markdown("</div>", unsafe_allow_html=True)
+
+        with col3:
+            st.markdown("<div class='metric-card'>", unsafe_allow_html=True)
+            st.markdown("**Probability of Loss**")
+            st.markdown(f"<span class='stat-value purple-text'>{format_percentage(mc.loss_probability * 100)}</span>", unsafe_allow_html=True)
+            st.markdown("</div>", unsafe_allow_html=True)
+
+        # Fan chart of the capital percentile bands
+        fig4 = get_figure_cache().figure(
+            monte_carlo_figure, mc.capital_bands, mc.percentiles,
+            lightweight=use_lightweight(st.session_state.chart_mode, mc.capital_bands.size)
+        )
+
+        rerun_timer.mark('monte_carlo')
+        rerun_timer.chart('fig4', fig4)
+        st.plotly_chart(fig4, use_container_width=True)
+        rerun_timer.mark('fig4_render')
+
+        st.markdown("<div class='sub-header'>Percentiles</div>", unsafe_allow_html=True)
+        percentile_df = pd.DataFrame({
+            'Percentile': [f"{p}th" for p in mc.percentiles],
+            'Ending Capital': [format_currency(v) for v in mc.ending_capital],
+            'Max Drawdown': [format_percentage(v) for v in mc.max_drawdown]
+        })
+        st.dataframe(percentile_df, use_container_width=True)
+        st.caption(f"{mc.paths:,} paths over {params.months} months")
+
+# Tab 5: Monte Carlo
+with tab5:
+    if tab_open(tab5):
+        monte_carlo_section(simulation_params)
+
+rerun_timer.mark('monte_carlo_tab')
 
 # Add info about when the simulation was last run
 st.sidebar.markdown("### Simulation Info")
 st.sidebar.markdown(f"Last updated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
 st.sidebar.markdown(f"Initial capital: {format_currency(st.session_state.initial_capital)}")
-st.sidebar.markdown(f"Spread percentage: {format_percentage(st.session_state.spread_percentage)}")
+st.sidebar.markdown(f"Spread percentage: {format_percentage(simulation_params.spread_percentage)}")
 st.sidebar.markdown(f"Time horizon: {st.session_state.months} months")
 
+# Shared results cache counters
+cache_stats = results_cache.stats()
+st.sidebar.markdown("### Results Cache")
+st.sidebar.markdown(f"Hits: {cache_stats['hits']:,} · Misses: {cache_stats['misses']:,} ({cache_stats['hit_rate']:.0%} hit rate)")
+st.sidebar.markdown(f"Entries: {cache_stats['entries']:,} / {cache_stats['max_entries']:,}")
+if api_port:
+    st.sidebar.markdown(f"Batch API: http://127.0.0.1:{api_port}/evaluate")
+
+# Shared store counters, in server mode
+if SERVER_MODE:
+    store_stats = get_shared_store().stats()
+    st.sidebar.markdown("### Shared Store")
+    st.sidebar.markdown(
+        f"Sessions: {store_stats['sessions']:,} · Entries: {store_stats['entries']:,} "
+        f"({store_stats['held']:,} held, {store_stats['bytes'] / 2**20:,.1f} MB)"
+    )
+    st.sidebar.markdown(
+        f"Computed: {store_stats['computed']:,} · Reused: {store_stats['hits']:,} · "
+        f"Coalesced: {store_stats['coalesced']:,}"
+    )
+
+# What this session's last cache miss had to recompute
+last_run = st.session_state.get('last_recompute')
+if last_run:
+    st.sidebar.markdown(
+        f"Last recompute: {len(last_run['rebuilt_profiles'])} of {last_run['platforms']} platform profiles, "
+        f"monthly series {last_run['series']}"
+    )
+
+rerun_timer.mark('sidebar')
+rerun_timer.finish()
+
 # Add a button to re-run the simulation manually if needed
 if st.sidebar.button("Re-run Simulation"):
     st.experimental_rerun()
+
+# Opt-in per-stage timing panel
+with st.sidebar.expander("Debug: Rerun Timings"):
+    st.checkbox("Time each rerun", key='debug_timings', help="Timings start with the next rerun")
+
+    instrumentation = get_instrumentation()
+    if instrumentation.startup:
+        startup_stages = instrumentation.startup['stages']
+        st.caption(
+            f"Cold start: {instrumentation.startup['total'] * 1000:,.0f} ms, "
+            f"of which imports {startup_stages.get('imports', 0) * 1000:,.0f} ms"
+        )
+
+    stage_summary = instrumentation.stage_summary()
+    if stage_summary:
+        timing_df = pd.DataFrame(stage_summary)
+        timing_df.columns = ['Stage', 'Last (ms)', 'p50 (ms)', 'p95 (ms)', 'Samples']
+        st.dataframe(timing_df.round(2), use_container_width=True, hide_index=True)
+
+        chart_summary = instrumentation.chart_summary()
+        if chart_summary:
+            payload_df = pd.DataFrame(chart_summary)
+            payload_df['last_bytes'] = payload_df['last_bytes'] / 1024
+            payload_df['p50_bytes'] = payload_df['p50_bytes'] / 1024
+            payload_df.columns = ['Chart', 'Last (KB)', 'p50 (KB)', 'Samples']
+            st.dataframe(payload_df.round(1), use_container_width=True, hide_index=True)
+
+        st.download_button(
+            "Export Prometheus Metrics",
+            instrumentation.prometheus_text(),
+            file_name='dashboard_metrics.prom',
+            mime='text/plain'
+        )
+    else:
+        st.caption("No timed reruns yet")
@@ -0,0 +1,245 @@
+"""Incremental recompute of ``run_simulation``.
+
+A simulation breaks into pieces with narrower inputs than the whole
+``SimulationParams``:
+
+* a platform's *profile* (cycle growth, time-based cycles, daily limit)
+  depends only on its ``platform_data`` entry, the spread and cycles per month,
+* its comparison-table row additionally depends on the initial capital,
+* the per-allocation capital and profit series depend on every funded
+  profile, the allocations, initial capital and reinvestment rate, since
+  reinvested profit is shared out in proportion to capital, and
+* the monthly table is rounded from those series.
+
+``IncrementalSimulation`` caches each piece under the values it depends on,
+so editing one platform's fee or limit only rebuilds that profile and its
+comparison row before the series are re-aggregated, and editing an
+unfunded platform leaves the series untouched. The series are kept for the
+longest horizon computed so far; a shorter horizon is a slice of it and a
+longer one continues from its last month. Results are identical to
+``run_simulation``.
+"""
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass
+class PlatformProfile:
+    fee: float
+    transfer_time: float
+    daily_limit: float
+    cycle_profit: float         # net profit per cycle, as a fraction
+    time_based_cycles: float
+
+
+@dataclass
+class AllocationSeries:
+    capitals: np.ndarray        # (months + 1, allocations) capital after each month
+    totals: np.ndarray          # (months + 1,) total capital after each month
+    profits: np.ndarray         # (months + 1,) monthly profit, 0 for month 0
+    returns: np.ndarray         # (months + 1,) monthly return as a fraction, 0 for month 0
+
+    @property
+    def months(self):
+        return len(self.totals) - 1
+
+
+class _LRU:
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        value = self.entries.get(key)
+        if value is not None:
+            self.entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+
+def _platform_key(key, platform):
+    return (key, float(platform['fee']), float(platform['transfer_time']), float(platform['daily_limit']))
+
+
+def build_profile(platform, spread_percentage, cycles_per_month):
+    fee = platform['fee']
+    transfer_time = platform['transfer_time']
+    return PlatformProfile(
+        fee=fee,
+        transfer_time=transfer_time,
+        daily_limit=platform['daily_limit'],
+        cycle_profit=(spread_percentage - fee) / 100,
+        time_based_cycles=cycles_per_month * (720 / (720 + transfer_time))
+    )
+
+
+def comparison_row(key, profile, initial_capital):
+    """One row of ``comparison_df``, exactly as ``run_simulation`` builds it."""
+    adjusted_cycles = min(profile.time_based_cycles, np.floor(30 * initial_capital / profile.daily_limit))
+    monthly_return = np.power(1 + profile.cycle_profit, adjusted_cycles) - 1
+    yearly_return = np.power(1 + monthly_return, 12) - 1
+    return {
+        'platform': key,
+        'fee': profile.fee,
+        'transfer_time': profile.transfer_time,
+        'daily_limit': profile.daily_limit,
+        'monthly_volume': profile.daily_limit * 30,
+        'cycles_per_month': round(adjusted_cycles, 1),
+        'monthly_return': round(monthly_return * 100, 2),
+        'yearly_return': round(yearly_return * 100, 2)
+    }
+
+
+def extend_series(series, profiles, allocations, initial_capital, reinvestment_rate, months):
+    """Series for ``months`` months, continuing ``series`` (or starting from month 0 if None)."""
+    cycle_profit = np.array([profile.cycle_profit for profile in profiles])
+    time_based_cycles = np.array([profile.time_based_cycles for profile in profiles])
+    daily_limit = np.array([profile.daily_limit for profile in profiles], dtype=float)
+    monthly_volume = daily_limit * 30
+
+    if series is None:
+        capitals = [np.array(allocations, dtype=float)]
+        totals = [initial_capital]
+        profits = [0]
+        returns = [0]
+    else:
+        capitals = list(series.capitals)
+        totals = list(series.totals)
+        profits = list(series.profits)
+        returns = list(series.returns)
+
+    current = totals[-1]
+    for month in range(len(totals), months + 1):
+        # Same operations, in the same order, as run_simulation
+        effective_capital = np.minimum(capitals[-1], monthly_volume)
+        capital_based_cycles = np.floor(30 * effective_capital / daily_limit)
+        adjusted_cycles = np.minimum(time_based_cycles, capital_based_cycles)
+        monthly_profit = (capitals[-1] * (np.power(1 + cycle_profit, adjusted_cycles) - 1)).sum()
+
+        previous = current
+        reinvested_profit = monthly_profit * reinvestment_rate / 100
+        current = previous + reinvested_profit
+        capitals.append(capitals[-1] + reinvested_profit * (capitals[-1] / previous))
+        totals.append(current)
+        profits.append(monthly_profit)
+        returns.append(monthly_profit / previous)
+
+    return AllocationSeries(
+        capitals=np.array(capitals),
+        totals=np.array(totals, dtype=float),
+        profits=np.array(profits, dtype=float),
+        returns=np.array(returns, dtype=float)
+    )
+
+
+class IncrementalSimulation:
+    """Dependency-tracked, per-platform cache in front of ``run_simulation``.
+
+    ``last_run`` describes what the most recent ``run`` had to recompute, for
+    any caller; pass ``report`` to ``run`` to get it for that call alone.
+    """
+
+    def __init__(self, max_profiles=1024, max_series=64):
+        self.profiles = _LRU(max_profiles)
+        self.rows = _LRU(max_profiles)
+        self.series = _LRU(max_series)
+        self.lock = threading.Lock()
+        self.last_run = {}
+
+    def profile(self, key, platform, spread_percentage, cycles_per_month, rebuilt):
+        cache_key = (_platform_key(key, platform), float(spread_percentage), float(cycles_per_month))
+        profile = self.profiles.get(cache_key)
+        if profile is None:
+            profile = build_profile(platform, spread_percentage, cycles_per_month)
+            self.profiles.put(cache_key, profile)
+            rebuilt.append(key)
+        return profile
+
+    def run(self, params, report=None):
+        """``(simulation_df, comparison_df)`` for ``params``, identical to ``run_simulation``.
+
+        If ``report`` is a dict, it is filled with what this run recomputed.
+        """
+        with self.lock:
+            rebuilt_profiles = []
+            rebuilt_rows = []
+
+            # Platform profiles and comparison rows, each keyed on its own inputs
+            profiles = {
+                key: self.profile(key, platform, params.spread_percentage, params.cycles_per_month, rebuilt_profiles)
+                for key, platform in params.platform_data.items()
+            }
+            comparison = []
+            for key, platform in params.platform_data.items():
+                row_key = (_platform_key(key, platform), float(params.spread_percentage),
+                           float(params.cycles_per_month), float(params.initial_capital))
+                row = self.rows.get(row_key)
+                if row is None:
+                    row = comparison_row(key, profiles[key], params.initial_capital)
+                    self.rows.put(row_key, row)
+                    rebuilt_rows.append(key)
+                comparison.append(row)
+
+            # Allocation series depend on the funded profiles, not on every platform
+            names = list(params.allocations)
+            allocation_platforms = params.allocation_platforms()
+            allocation_profiles = [
+                profiles.get(key) or build_profile(params.platform_data[key], params.spread_percentage,
+                                                   params.cycles_per_month)
+                for key in allocation_platforms
+            ]
+            series_key = (
+                tuple(zip(names, (_platform_key(key, params.platform_data[key]) for key in allocation_platforms),
+                          map(float, params.allocations.values()))),
+                float(params.spread_percentage),
+                float(params.cycles_per_month),
+                params.initial_capital,
+                float(params.reinvestment_rate)
+            )
+            series = self.series.get(series_key)
+            if series is not None and series.months >= params.months:
+                series_status = 'reused'
+            else:
+                series_status = 'extended' if series is not None else 'computed'
+                series = extend_series(series, allocation_profiles, list(params.allocations.values()),
+                                       params.initial_capital, params.reinvestment_rate, params.months)
+                self.series.put(series_key, series)
+
+            self.last_run = {
+                'platforms': len(profiles),
+                'rebuilt_profiles': rebuilt_profiles,
+                'rebuilt_rows': rebuilt_rows,
+                'series': series_status
+            }
+            if report is not None:
+                report.update(self.last_run)
+
+        return self.simulation_frame(params, names, series), pd.DataFrame(comparison)
+
+    @staticmethod
+    def simulation_frame(params, names, series):
+        months = params.months
+
+        # Month 0 holds the inputs as given, later months are rounded to cents like run_simulation
+        def monthly(first, values):
+            return np.concatenate([[first], np.round(values[1:months + 1], 2)])
+
+        data = {
+            'month': np.arange(months + 1),
+            'capital': monthly(params.initial_capital, series.totals),
+            'profit': monthly(0, series.profits)
+        }
+        for i, (name, amount) in enumerate(params.allocations.items()):
+            data[f'{name}_capital'] = monthly(amount, series.capitals[:, i])
+        data['return_rate'] = monthly(0, series.returns * 100)
+        data['accumulated_return'] = monthly(0, (series.totals / params.initial_capital - 1) * 100)
+        return pd.DataFrame(data)
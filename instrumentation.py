@@ -0,0 +1,230 @@
+"""Opt-in timing of dashboard reruns.
+
+A ``RerunTimer`` splits one script rerun into named stages with
+``mark(stage)``, which books the time since the previous mark to that stage,
+so the linear dashboard script only needs one call between blocks. Chart
+payloads are measured as the size of the figure's JSON, which is what
+Streamlit sends to the browser.
+
+The first rerun of each process is always timed as its cold start, from a
+start time the dashboard takes before its own imports, so import time shows
+up as a stage of its own. A fragment that reruns on its own gets a timer of
+its own, whose total is booked as ``<fragment>_total`` rather than as a
+rerun's ``total``.
+
+Finished reruns go into a process-wide ``Instrumentation`` that keeps a
+rolling window per stage for p50/p95 summaries, logs each rerun as one JSON
+line on the ``dashboard.instrumentation`` logger, and can render everything
+in the Prometheus text exposition format (optionally rewriting a file for
+the node exporter's textfile collector).
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+
+import numpy as np
+
+logger = logging.getLogger('dashboard.instrumentation')
+
+# Set to 1 to time every session's reruns, not only those that opt in from the sidebar
+ENABLE_VARIABLE = 'DASHBOARD_INSTRUMENTATION'
+
+# Path of a Prometheus textfile to rewrite after each timed rerun
+PROMETHEUS_FILE_VARIABLE = 'DASHBOARD_PROMETHEUS_FILE'
+
+QUANTILES = (50, 95)
+
+
+def enabled_by_environment():
+    return os.environ.get(ENABLE_VARIABLE, '').lower() in ('1', 'true', 'yes')
+
+
+class RerunTimer:
+    """Stage timings and chart payload sizes of a single rerun.
+
+    ``started`` backdates the start (to before the script's imports, for
+    example). A ``startup`` timer runs even when not ``enabled`` and is
+    recorded as the process's cold start. ``fragment`` names the fragment a
+    timer covers when it reruns on its own.
+    """
+
+    def __init__(self, instrumentation=None, enabled=True, started=None, startup=False, fragment=None):
+        self.instrumentation = instrumentation
+        self.record_rerun = enabled
+        self.startup = startup
+        self.fragment = fragment
+        self.enabled = enabled or startup
+        self.finished = False
+        self.stages = {}
+        self.charts = {}
+        self.started = self.last = time.perf_counter() if started is None else started
+
+    def mark(self, stage):
+        """Book the time since the previous mark (or the start) to ``stage``."""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.stages[stage] = self.stages.get(stage, 0.0) + now - self.last
+        self.last = now
+
+    def chart(self, name, fig):
+        """Record the serialized size of a Plotly figure, excluding the time it takes from the stages."""
+        if not self.enabled:
+            return
+        self.charts[name] = len(fig.to_json().encode())
+        self.last = time.perf_counter()
+
+    def finish(self):
+        self.finished = True
+        if not self.enabled:
+            return
+        total = time.perf_counter() - self.started
+        if self.instrumentation is not None:
+            if self.startup:
+                self.instrumentation.record_startup(self.stages, total)
+            if self.record_rerun:
+                self.instrumentation.record(self.stages, self.charts, total, self.fragment)
+        self.enabled = False
+
+
+class Instrumentation:
+    """Rolling stage timings and chart payload sizes across reruns, shared by every session."""
+
+    def __init__(self, window=500, prometheus_file=None):
+        self.window = window
+        self.prometheus_file = prometheus_file or os.environ.get(PROMETHEUS_FILE_VARIABLE)
+        self.lock = threading.Lock()
+        self.stage_seconds = defaultdict(lambda: deque(maxlen=self.window))
+        self.chart_bytes = defaultdict(lambda: deque(maxlen=self.window))
+
+        # Lifetime totals for the Prometheus summaries
+        self.stage_count = defaultdict(int)
+        self.stage_sum = defaultdict(float)
+        self.reruns = 0
+
+        # Stage timings of the process's first rerun, once it finishes
+        self.startup = None
+        self.startup_claimed = False
+
+    def rerun(self, enabled=True, started=None):
+        # The first rerun asked for is the cold start
+        with self.lock:
+            startup = not self.startup_claimed
+            self.startup_claimed = True
+        return RerunTimer(self, enabled, started, startup)
+
+    def fragment_rerun(self, name, enabled=True):
+        """Timer for a fragment rerunning on its own, after its script rerun's timer has finished."""
+        return RerunTimer(self, enabled, fragment=name)
+
+    def record_startup(self, stages, total):
+        with self.lock:
+            self.startup = {'stages': dict(stages), 'total': total}
+
+        logger.info(json.dumps({
+            'event': 'startup',
+            'total_ms': round(total * 1000, 3),
+            'stages_ms': {stage: round(seconds * 1000, 3) for stage, seconds in stages.items()}
+        }))
+
+    def record(self, stages, charts, total, fragment=None):
+        total_stage = f'{fragment}_total' if fragment else 'total'
+        with self.lock:
+            for stage, seconds in {**stages, total_stage: total}.items():
+                self.stage_seconds[stage].append(seconds)
+                self.stage_count[stage] += 1
+                self.stage_sum[stage] += seconds
+            for name, size in charts.items():
+                self.chart_bytes[name].append(size)
+            if not fragment:
+                self.reruns += 1
+
+        logger.info(json.dumps({
+            'event': 'fragment' if fragment else 'rerun',
+            **({'fragment': fragment} if fragment else {}),
+            'total_ms': round(total * 1000, 3),
+            'stages_ms': {stage: round(seconds * 1000, 3) for stage, seconds in stages.items()},
+            'chart_bytes': charts
+        }))
+
+        if self.prometheus_file:
+            self.write_prometheus(self.prometheus_file)
+
+    def stage_summary(self):
+        """Per-stage rows with the last, p50 and p95 time in milliseconds, in first-seen order."""
+        with self.lock:
+            samples = {stage: np.array(values) * 1000 for stage, values in self.stage_seconds.items()}
+        rows = []
+        for stage, values in samples.items():
+            p50, p95 = np.percentile(values, QUANTILES)
+            rows.append({'stage': stage, 'last_ms': values[-1], 'p50_ms': p50, 'p95_ms': p95, 'samples': len(values)})
+        return rows
+
+    def chart_summary(self):
+        """Per-chart rows with the last and p50 payload size in bytes."""
+        with self.lock:
+            samples = {name: np.array(values) for name, values in self.chart_bytes.items()}
+        return [
+            {'chart': name, 'last_bytes': int(values[-1]), 'p50_bytes': float(np.median(values)), 'samples': len(values)}
+            for name, values in samples.items()
+        ]
+
+    def prometheus_text(self):
+        """Current metrics in the Prometheus text exposition format."""
+        lines = [
+            '# HELP dashboard_stage_seconds Time spent in each stage of a dashboard rerun.',
+            '# TYPE dashboard_stage_seconds summary'
+        ]
+        with self.lock:
+            stages = {stage: np.array(values) for stage, values in self.stage_seconds.items()}
+            charts = {name: values[-1] for name, values in self.chart_bytes.items()}
+            counts = dict(self.stage_count)
+            sums = dict(self.stage_sum)
+            reruns = self.reruns
+            startup = self.startup
+
+        for stage, values in stages.items():
+            for quantile, value in zip(QUANTILES, np.percentile(values, QUANTILES)):
+                lines.append(f'dashboard_stage_seconds{{stage="{stage}",quantile="{quantile / 100:g}"}} {value:.6f}')
+            lines.append(f'dashboard_stage_seconds_sum{{stage="{stage}"}} {sums[stage]:.6f}')
+            lines.append(f'dashboard_stage_seconds_count{{stage="{stage}"}} {counts[stage]}')
+
+        lines += [
+            '# HELP dashboard_chart_payload_bytes Serialized size of the last render of each chart.',
+            '# TYPE dashboard_chart_payload_bytes gauge'
+        ]
+        lines += [f'dashboard_chart_payload_bytes{{chart="{name}"}} {size}' for name, size in charts.items()]
+
+        if startup:
+            lines += [
+                '# HELP dashboard_startup_seconds Time spent in each stage of the process\'s first rerun.',
+                '# TYPE dashboard_startup_seconds gauge'
+            ]
+            lines += [
+                f'dashboard_startup_seconds{{stage="{stage}"}} {seconds:.6f}'
+                for stage, seconds in {**startup['stages'], 'total': startup['total']}.items()
+            ]
+
+        lines += [
+            '# HELP dashboard_reruns_total Timed dashboard reruns.',
+            '# TYPE dashboard_reruns_total counter',
+            f'dashboard_reruns_total {reruns}'
+        ]
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path):
+        # Write and rename so the collector never reads a partial file
+        with open(path + '.tmp', 'w') as f:
+            f.write(self.prometheus_text())
+        os.replace(path + '.tmp', path)
+
+    def clear(self):
+        with self.lock:
+            self.stage_seconds.clear()
+            self.chart_bytes.clear()
+            self.stage_count.clear()
+            self.stage_sum.clear()
+            self.reruns = 0
@@ -0,0 +1,164 @@
+"""Monte Carlo simulation with stochastic spreads, fees, transfer delays and failed cycles.
+
+Each path follows the same monthly recurrence as ``run_simulation``, but
+every month draws its own market conditions:
+
+* the spread is normal around ``spread_percentage`` (shared by all platforms),
+* each platform's fee is normal around its ``fee``,
+* each platform's transfer time gets an exponential delay on top,
+* each cycle fails with ``failure_rate``; a failed cycle pays the fee but
+  earns no spread.
+
+Paths are generated in vectorized chunks, each with its own child of one
+``SeedSequence``, so results depend only on the seed and chunk size and not
+on how many worker processes ran them. Worker pools are started on first
+use and kept for later runs, so a rerun doesn't pay for starting processes
+and importing NumPy in each of them again.
+"""
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import asdict, dataclass
+
+import numpy as np
+
+from platforms import platform_arrays
+from simulation import SimulationParams
+
+# Percentiles reported for the capital bands, ending capital and drawdown
+PERCENTILES = (5, 25, 50, 75, 95)
+
+
+@dataclass
+class MonteCarloConfig:
+    paths: int = 100000
+    spread_std: float = 1.0            # percentage points
+    fee_std: float = 0.05              # percentage points
+    transfer_delay_mean: float = 12.0  # hours
+    failure_rate: float = 0.05         # probability that a cycle fails
+    seed: int = 42
+    chunk_size: int = 10000
+    workers: int = None                # None uses every core, 1 runs in-process
+
+
+@dataclass
+class MonteCarloResult:
+    percentiles: tuple
+    capital_bands: np.ndarray       # (len(percentiles), months + 1)
+    ending_capital: np.ndarray      # (len(percentiles),)
+    max_drawdown: np.ndarray        # (len(percentiles),) in percent
+    mean_ending_capital: float
+    loss_probability: float         # share of paths ending below the initial capital
+    paths: int
+
+
+def simulate_paths(params, config, rng, paths):
+    """Simulate ``paths`` Monte Carlo paths, returning capital of shape ``(paths, months + 1)``."""
+    fee, transfer_time, daily_limit = platform_arrays(params.platform_data, params.allocation_platforms())
+    platforms = len(fee)
+    monthly_volume = daily_limit * 30
+
+    capitals = np.tile(params.allocation_vector(), (paths, 1))
+    capital = np.empty((paths, params.months + 1))
+    capital[:, 0] = params.initial_capital
+    previous_capital = np.full(paths, float(params.initial_capital))
+
+    for month in range(1, params.months + 1):
+        # Draw this month's market conditions
+        spread = np.maximum(rng.normal(params.spread_percentage, config.spread_std, (paths, 1)), 0)
+        fees = np.maximum(rng.normal(fee, config.fee_std, (paths, platforms)), 0)
+        if config.transfer_delay_mean > 0:
+            delays = rng.exponential(config.transfer_delay_mean, (paths, platforms))
+        else:
+            delays = 0
+        time_based_cycles = params.cycles_per_month * (720 / (720 + transfer_time + delays))
+
+        capital_based_cycles = np.floor(30 * np.minimum(capitals, monthly_volume) / daily_limit)
+        adjusted_cycles = np.minimum(time_based_cycles, capital_based_cycles)
+
+        # Failed cycles pay the fee without earning the spread
+        failed_cycles = rng.binomial(np.ceil(adjusted_cycles).astype(np.int64), config.failure_rate)
+        successful_cycles = np.maximum(adjusted_cycles - failed_cycles, 0)
+        growth = np.power(1 + (spread - fees) / 100, successful_cycles) * np.power(1 - fees / 100, failed_cycles)
+        monthly_profit = (capitals * (growth - 1)).sum(axis=1)
+
+        # Reinvest and distribute proportionally to the previous total
+        reinvested_profit = monthly_profit * params.reinvestment_rate / 100
+        capitals += capitals * (reinvested_profit / previous_capital)[:, None]
+        previous_capital = previous_capital + reinvested_profit
+        capital[:, month] = previous_capital
+
+    return capital
+
+
+def max_drawdown(capital):
+    """Largest peak-to-trough fall of each path, in percent."""
+    peaks = np.maximum.accumulate(capital, axis=1)
+    return ((peaks - capital) / peaks).max(axis=1) * 100
+
+
+def _run_chunk(params, config, seed, paths):
+    params = SimulationParams(**params)
+    capital = simulate_paths(params, config, np.random.default_rng(seed), paths)
+    return capital, max_drawdown(capital)
+
+
+# Process pools shared by every run, keyed on their worker count
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def worker_pool(workers=None):
+    """Pool of ``workers`` processes (every core if None), started on first use and reused afterwards."""
+    with _pools_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            # Spawned rather than forked, since the dashboard runs threads
+            pool = _pools[workers] = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'))
+        return pool
+
+
+def shutdown_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown()
+
+
+def run_monte_carlo(params, config=None):
+    """Run ``config.paths`` paths of ``params`` and summarize them in percentile bands."""
+    if config is None:
+        config = MonteCarloConfig()
+
+    chunks = [min(config.chunk_size, config.paths - start) for start in range(0, config.paths, config.chunk_size)]
+    seeds = np.random.SeedSequence(config.seed).spawn(len(chunks))
+    tasks = [(asdict(params), config, seed, size) for seed, size in zip(seeds, chunks)]
+
+    if config.workers == 1 or len(tasks) == 1:
+        results = [_run_chunk(*task) for task in tasks]
+    else:
+        pool = worker_pool(config.workers)
+        try:
+            results = list(pool.map(_run_chunk, *zip(*tasks)))
+        except BrokenProcessPool:
+            # A worker died, so the next run starts a fresh pool
+            with _pools_lock:
+                if _pools.get(config.workers) is pool:
+                    del _pools[config.workers]
+            raise
+
+    capital = np.concatenate([result[0] for result in results])
+    drawdown = np.concatenate([result[1] for result in results])
+    ending = capital[:, -1]
+
+    return MonteCarloResult(
+        percentiles=PERCENTILES,
+        capital_bands=np.percentile(capital, PERCENTILES, axis=0),
+        ending_capital=np.percentile(ending, PERCENTILES),
+        max_drawdown=np.percentile(drawdown, PERCENTILES),
+        mean_ending_capital=float(ending.mean()),
+        loss_probability=float((ending < params.initial_capital).mean()),
+        paths=config.paths
+    )
@@ -0,0 +1,153 @@
+"""Search for the capital allocation that maximizes ending capital.
+
+Candidates are every split of ``initial_capital`` across the allocation
+platforms on a lattice of whole-dollar steps, evaluated together through the
+closed-form fast path. The best lattice point is then refined by hill climbing,
+moving ever smaller amounts between pairs of platforms.
+"""
+from dataclasses import dataclass
+from itertools import combinations
+from math import comb
+
+import numpy as np
+import pandas as pd
+
+from fastpath import project_variations
+
+# Lattice step sizes ($) the search may use, smallest first
+ALLOCATION_STEPS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000)
+
+# Candidates simulated per batch
+CHUNK_SIZE = 100000
+
+
+@dataclass
+class OptimizationResult:
+    allocations: pd.DataFrame   # best allocations first, one column per platform plus ending capital
+    current_ending_capital: float
+    evaluated: int
+    step: float
+
+    @property
+    def best(self):
+        return self.allocations.iloc[0]
+
+
+def allocation_bounds(params, max_transfer_time=None):
+    """Most capital each allocation may hold: nothing for platforms slower than
+    ``max_transfer_time`` hours, no limit otherwise.
+
+    Daily limits aren't bounds here, since the profit model already caps the
+    capital each platform can turn over; capital beyond that just earns less.
+    """
+    bounds = []
+    for platform_key in params.allocation_platforms():
+        platform = params.platform_data[platform_key]
+        if max_transfer_time is not None and platform['transfer_time'] > max_transfer_time:
+            bounds.append(0.0)
+        else:
+            bounds.append(np.inf)
+    return np.array(bounds)
+
+
+def choose_step(total, platforms, max_candidates):
+    """Smallest step in ``ALLOCATION_STEPS`` that keeps the lattice under max_candidates."""
+    for step in ALLOCATION_STEPS:
+        units = int(total // step)
+        if comb(units + platforms - 1, platforms - 1) <= max_candidates:
+            return step
+    return ALLOCATION_STEPS[-1]
+
+
+def allocation_lattice(total, step, bounds):
+    """Every split of ``total`` into multiples of ``step`` that respects ``bounds``.
+
+    Any remainder below one step goes to the largest allocation of each split.
+    """
+    platforms = len(bounds)
+    units = int(total // step)
+
+    # Stars and bars: positions of the platforms - 1 dividers among units + platforms - 1 slots
+    dividers = np.array(list(combinations(range(units + platforms - 1), platforms - 1)), dtype=np.int64)
+    dividers = dividers.reshape(-1, platforms - 1)
+    edges = np.hstack([
+        np.full((len(dividers), 1), -1, dtype=np.int64),
+        dividers,
+        np.full((len(dividers), 1), units + platforms - 1, dtype=np.int64)
+    ])
+    lattice = (np.diff(edges, axis=1) - 1) * float(step)
+
+    remainder = total - units * step
+    if remainder:
+        lattice[np.arange(len(lattice)), lattice.argmax(axis=1)] += remainder
+
+    return lattice[(lattice <= bounds).all(axis=1)]
+
+
+def evaluate_allocations(params, allocations):
+    """Ending capital of ``params`` under each row of ``allocations``."""
+    names = [f'{name}_capital' for name in params.allocations]
+    ending = np.empty(len(allocations))
+    for start in range(0, len(allocations), CHUNK_SIZE):
+        chunk = allocations[start:start + CHUNK_SIZE]
+        ending[start:start + CHUNK_SIZE] = project_variations(
+            params, **{name: chunk[:, i] for i, name in enumerate(names)}
+        )
+    return ending
+
+
+def refine_allocation(params, allocation, ending, step, bounds, max_iterations=200):
+    """Hill climb from ``allocation`` by moving capital between pairs of platforms."""
+    platforms = len(allocation)
+    pairs = [(i, j) for i in range(platforms) for j in range(platforms) if i != j]
+    moves = np.zeros((len(pairs), platforms))
+    for row, (i, j) in enumerate(pairs):
+        moves[row, i] = -1
+        moves[row, j] = 1
+
+    for delta in [s for s in reversed(ALLOCATION_STEPS) if s < step]:
+        for _ in range(max_iterations):
+            candidates = allocation + moves * delta
+            candidates = candidates[((candidates >= 0) & (candidates <= bounds)).all(axis=1)]
+            if not len(candidates):
+                break
+            candidate_ending = evaluate_allocations(params, candidates)
+            best = candidate_ending.argmax()
+            if candidate_ending[best] <= ending * (1 + 1e-12):
+                break
+            allocation, ending = candidates[best], candidate_ending[best]
+
+    return allocation, ending
+
+
+def optimize_allocation(params, max_candidates=50000, max_transfer_time=None, top=5):
+    """Find the allocations of ``params.initial_capital`` with the highest ending capital."""
+    total = float(params.initial_capital)
+    bounds = allocation_bounds(params, max_transfer_time)
+    if not bounds.any():
+        raise ValueError(f"No platform transfers within {max_transfer_time:g} hours")
+
+    step = choose_step(total, len(bounds), max_candidates)
+    lattice = allocation_lattice(total, step, bounds)
+    if not len(lattice):
+        raise ValueError("No allocation satisfies the platform limits at this step size")
+
+    ending = evaluate_allocations(params, lattice)
+    order = np.argsort(ending)[::-1][:top]
+    best_allocation, best_ending = refine_allocation(params, lattice[order[0]], ending[order[0]], step, bounds)
+
+    # Refined best first, then the remaining top lattice points
+    runners_up = [i for i in order[1:] if not np.array_equal(lattice[i], best_allocation)]
+    rows = [best_allocation] + [lattice[i] for i in runners_up]
+    endings = [best_ending] + [ending[i] for i in runners_up]
+    allocations = pd.DataFrame(np.array(rows), columns=[f'{name}_capital' for name in params.allocations])
+    allocations['ending_capital'] = endings
+    allocations['accumulated_return'] = (allocations['ending_capital'] / total - 1) * 100
+
+    current = params.allocation_vector()[None, :]
+    return OptimizationResult(
+        allocations=allocations,
+        current_ending_capital=float(evaluate_allocations(params, current)[0]),
+        evaluated=len(lattice),
+        step=step
+    )
@@ -0,0 +1,120 @@
+"""Platform registry loaded from a config file.
+
+The registry lists every venue with its fee (%), transfer time (hours) and
+daily limit ($), plus the capital allocations the dashboard exposes and the
+platform whose fees and limits apply to each. The engine, UI and charts
+iterate over it instead of naming platforms in code.
+
+For the route finder (``routes.py``) each platform also has a ``role``: an
+``exchange`` buys crypto with cash, a ``rail`` moves cash back to the bank.
+``p2p_venues`` lists the peer-to-peer venues where crypto sells at the
+spread, each with its own fee (%) and transfer time (hours).
+
+``platforms.json`` next to this module is used unless the
+``PLATFORM_CONFIG`` environment variable points at another JSON, TOML or
+YAML file with the same layout.
+"""
+import json
+import os
+
+import numpy as np
+
+DEFAULT_CONFIG = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'platforms.json')
+
+PLATFORM_FIELDS = ('fee', 'transfer_time', 'daily_limit')
+
+PLATFORM_ROLES = ('exchange', 'rail')
+
+
+def _load_config(path):
+    extension = os.path.splitext(path)[1].lower()
+
+    if extension == '.json':
+        with open(path) as f:
+            return json.load(f)
+
+    if extension == '.toml':
+        try:
+            import tomllib
+        except ImportError:
+            try:
+                import tomli as tomllib
+            except ImportError:
+                raise ImportError("Reading TOML platform configs needs Python 3.11+ or the 'tomli' package")
+        with open(path, 'rb') as f:
+            return tomllib.load(f)
+
+    if extension in ('.yaml', '.yml'):
+        try:
+            import yaml
+        except ImportError:
+            raise ImportError("Reading YAML platform configs needs the 'PyYAML' package")
+        with open(path) as f:
+            return yaml.safe_load(f)
+
+    raise ValueError(f"Unsupported platform config format: {path}")
+
+
+def platform_arrays(platform_data, keys):
+    """Return fee, transfer_time and daily_limit arrays for the given platform keys."""
+    fee = np.array([platform_data[key]['fee'] for key in keys], dtype=float)
+    transfer_time = np.array([platform_data[key]['transfer_time'] for key in keys], dtype=float)
+    daily_limit = np.array([platform_data[key]['daily_limit'] for key in keys], dtype=float)
+    return fee, transfer_time, daily_limit
+
+
+class PlatformRegistry:
+    def __init__(self, platforms, allocations, p2p_venues=None):
+        for key, platform in platforms.items():
+            missing = [name for name in PLATFORM_FIELDS if name not in platform]
+            if missing:
+                raise ValueError(f"Platform '{key}' is missing {', '.join(missing)}")
+            if platform.get('role', 'exchange') not in PLATFORM_ROLES:
+                raise ValueError(f"Platform '{key}' has unknown role '{platform['role']}'")
+        for name, allocation in allocations.items():
+            if allocation.get('platform', name) not in platforms:
+                raise ValueError(f"Allocation '{name}' refers to unknown platform '{allocation.get('platform', name)}'")
+
+        self.platforms = platforms
+        self.allocations = allocations
+        self.p2p_venues = p2p_venues or {}
+
+    @classmethod
+    def from_file(cls, path):
+        config = _load_config(path)
+        return cls(config['platforms'], config.get('allocations', {}), config.get('p2p_venues'))
+
+    @property
+    def keys(self):
+        return list(self.platforms)
+
+    def label(self, key):
+        """Display name of a platform, allocation or P2P venue."""
+        entry = self.allocations.get(key) or self.platforms.get(key) or self.p2p_venues.get(key) or {}
+        return entry.get('label') or ' '.join(word.capitalize() for word in key.split('_'))
+
+    def role(self, key):
+        """Route role of a platform; platforms missing from the registry are treated as exchanges."""
+        return self.platforms.get(key, {}).get('role', 'exchange')
+
+    def platform_for(self, name):
+        """Platform whose fees and limits apply to an allocation.
+
+        Allocations missing from the registry are assumed to be named after
+        their platform, so ad-hoc venues need no allocation entry.
+        """
+        return self.allocations.get(name, {}).get('platform', name)
+
+    def platform_data(self):
+        """Fee, transfer time and daily limit per platform, in the ``platform_data`` format."""
+        return {key: {name: platform[name] for name in PLATFORM_FIELDS} for key, platform in self.platforms.items()}
+
+    def default_allocations(self):
+        return {name: allocation.get('capital', 0) for name, allocation in self.allocations.items()}
+
+
+def load_registry(path=None):
+    return PlatformRegistry.from_file(path or os.environ.get('PLATFORM_CONFIG', DEFAULT_CONFIG))
+
+
+REGISTRY = load_registry()
@@ -0,0 +1,337 @@
+"""Live price-feed ingestion for cross-venue spreads.
+
+Feeds stream ``Tick`` quotes (best bid and ask per venue) from an async
+iterator. ``FeedPipeline`` runs one producer task per feed on an asyncio
+event loop in a background thread; producers push into a bounded queue and a
+worker drains it in batches into a ``SpreadTracker``, which keeps each
+venue's latest quote and a rolling window of the best cross-venue spread
+(buy at the cheapest ask, sell at the highest bid on another venue). The
+dashboard only reads thread-safe snapshots, so ingestion never blocks a
+Streamlit rerun.
+
+``ReplayFeed`` plays back a recorded CSV of ticks, optionally at recorded
+speed, so the whole pipeline runs offline. Other sources (exchange
+websockets, for example) plug in by subclassing ``PriceFeed``.
+"""
+import asyncio
+import csv
+import threading
+import time
+from collections import deque
+from typing import NamedTuple
+
+import numpy as np
+
+# Columns of a replay file
+REPLAY_COLUMNS = ('timestamp', 'venue', 'symbol', 'bid', 'ask')
+
+
+class Tick(NamedTuple):
+    timestamp: float    # seconds since the epoch
+    venue: str
+    symbol: str
+    bid: float
+    ask: float
+
+
+class PriceFeed:
+    """Source of ticks. Subclasses implement ``stream`` as an async generator."""
+
+    name = 'feed'
+
+    async def stream(self):
+        raise NotImplementedError
+        yield
+
+
+class ReplayFeed(PriceFeed):
+    """Replay ticks from a CSV file with ``REPLAY_COLUMNS``, sorted by timestamp.
+
+    ``speed`` scales the recorded pacing (2 replays twice as fast); None replays
+    as fast as the pipeline accepts ticks. ``venues`` keeps only those venues,
+    so several feeds can share one recording. With ``loop`` the recording
+    plays over and over, each pass shifted by the recording's span plus one
+    tick interval, so time keeps moving forward.
+    """
+
+    def __init__(self, path, speed=None, venues=None, loop=False, chunk_size=5000):
+        self.path = path
+        self.speed = speed
+        self.venues = set(venues) if venues else None
+        self.loop = loop
+        self.chunk_size = chunk_size
+        self.name = f"replay:{path}"
+
+    def _read_chunks(self, span):
+        # Fills ``span`` with the first and last timestamps and the row count of the whole file,
+        # before the venue filter, so feeds sharing a recording shift their passes alike
+        with open(self.path, newline='') as f:
+            reader = csv.DictReader(f)
+            chunk = []
+            for row in reader:
+                timestamp = float(row['timestamp'])
+                span['first'] = span.get('first', timestamp)
+                span['last'] = timestamp
+                span['rows'] = span.get('rows', 0) + 1
+                if self.venues and row['venue'] not in self.venues:
+                    continue
+                chunk.append(Tick(timestamp, row['venue'], row['symbol'], float(row['bid']), float(row['ask'])))
+                if len(chunk) >= self.chunk_size:
+                    yield chunk
+                    chunk = []
+            if chunk:
+                yield chunk
+
+    async def stream(self):
+        loop = asyncio.get_running_loop()
+        started = time.monotonic()
+        first_timestamp = None
+        offset = 0.0
+        while True:
+            span = {}
+            chunks = self._read_chunks(span)
+
+            while True:
+                # Parse the next chunk off the event loop so producers stay responsive
+                chunk = await loop.run_in_executor(None, next, chunks, None)
+                if chunk is None:
+                    break
+                for tick in chunk:
+                    if offset:
+                        tick = tick._replace(timestamp=tick.timestamp + offset)
+                    if self.speed:
+                        if first_timestamp is None:
+                            first_timestamp = tick.timestamp
+                        delay = (tick.timestamp - first_timestamp) / self.speed - (time.monotonic() - started)
+                        # Sleeping per tick can't keep up with thousands per second, so only pause when ahead
+                        if delay > 0.001:
+                            await asyncio.sleep(delay)
+                    yield tick
+
+            if not self.loop or not span:
+                return
+            # The next pass starts one average tick interval after this one ended
+            duration = span['last'] - span['first']
+            offset += duration + (duration / (span['rows'] - 1) if span['rows'] > 1 else 1.0)
+
+
+class SpreadTracker:
+    """Latest quote per venue and a rolling window of the best cross-venue spread.
+
+    The tracker's clock is the newest timestamp seen, so feeds interleaving
+    slightly out of order still keep the window in time order. A tick older
+    than its venue's latest quote (a feed starting over, for example) is
+    rejected.
+    """
+
+    def __init__(self, window_seconds=60, stale_seconds=5):
+        self.window_seconds = window_seconds
+        self.stale_seconds = stale_seconds
+        self.quotes = {}
+        self.history = deque()     # (timestamp, spread %, buy venue, sell venue)
+        self.history_sum = 0.0
+        self.ticks = 0
+        self.rejected = 0
+        self.now = None
+
+    def best_spread(self, now):
+        """Best ``(spread %, buy venue, sell venue)`` across distinct venues with fresh quotes, or None."""
+        fresh = [(venue, quote) for venue, quote in self.quotes.items() if now - quote.timestamp <= self.stale_seconds]
+        best = None
+        for buy_venue, buy in fresh:
+            for sell_venue, sell in fresh:
+                if buy_venue == sell_venue or buy.ask <= 0:
+                    continue
+                spread = (sell.bid / buy.ask - 1) * 100
+                if best is None or spread > best[0]:
+                    best = (spread, buy_venue, sell_venue)
+        return best
+
+    def update(self, tick):
+        previous = self.quotes.get(tick.venue)
+        if previous is not None and tick.timestamp < previous.timestamp:
+            self.rejected += 1
+            return
+        self.quotes[tick.venue] = tick
+        self.ticks += 1
+        self.now = tick.timestamp if self.now is None else max(self.now, tick.timestamp)
+
+        best = self.best_spread(self.now)
+        if best is not None:
+            self.history.append((self.now, *best))
+            self.history_sum += best[0]
+
+        # Drop observations that have left the window
+        cutoff = self.now - self.window_seconds
+        while self.history and self.history[0][0] < cutoff:
+            self.history_sum -= self.history.popleft()[1]
+
+    def pair_spreads(self):
+        """Spread (%) of buying on each venue and selling on each other venue, from the latest quotes."""
+        venues = sorted(self.quotes)
+        return [
+            {'buy': buy, 'sell': sell, 'spread': (self.quotes[sell].bid / self.quotes[buy].ask - 1) * 100}
+            for buy in venues for sell in venues
+            if buy != sell and self.quotes[buy].ask > 0
+        ]
+
+    def summary(self):
+        spreads = np.array([entry[1] for entry in self.history])
+        last = self.history[-1] if self.history else None
+        return {
+            'ticks': self.ticks,
+            'rejected': self.rejected,
+            'observations': len(spreads),
+            'mean_spread': self.history_sum / len(spreads) if len(spreads) else None,
+            'median_spread': float(np.median(spreads)) if len(spreads) else None,
+            'max_spread': float(spreads.max()) if len(spreads) else None,
+            'last_spread': last[1] if last else None,
+            'buy_venue': last[2] if last else None,
+            'sell_venue': last[3] if last else None,
+            'as_of': last[0] if last else None
+        }
+
+
+class FeedPipeline:
+    """Ingest several feeds concurrently on a background event loop.
+
+    Each feed's producer pushes into a queue of at most ``queue_size`` ticks.
+    With ``drop_when_full`` a full queue drops the newest tick (live feeds
+    shouldn't fall behind); otherwise producers wait (replays shouldn't lose
+    data). The worker applies up to ``batch_size`` ticks per lock acquisition.
+    """
+
+    def __init__(self, feeds, window_seconds=60, queue_size=10000, batch_size=1000,
+                 drop_when_full=False, symbol=None):
+        self.feeds = list(feeds)
+        self.tracker = SpreadTracker(window_seconds)
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.drop_when_full = drop_when_full
+        self.symbol = symbol
+
+        self.lock = threading.Lock()
+        self.thread = None
+        self.loop = None
+        self.stopping = None
+        self.dropped = 0
+        self.errors = []
+        self.finished_feeds = 0
+        self.started_at = None
+
+    def start(self):
+        if self.thread is not None:
+            return self
+        self.thread = threading.Thread(target=self._run, name='price-feed', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self, timeout=5):
+        if self.loop is not None and self.stopping is not None:
+            self.loop.call_soon_threadsafe(self.stopping.set)
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        try:
+            self.loop.run_until_complete(self._main())
+        finally:
+            self.loop.close()
+
+    async def _main(self):
+        self.stopping = asyncio.Event()
+        self.started_at = time.monotonic()
+        queue = asyncio.Queue(maxsize=self.queue_size)
+
+        producers = [asyncio.create_task(self._produce(feed, queue)) for feed in self.feeds]
+        worker = asyncio.create_task(self._consume(queue))
+
+        # Run until stopped, or until every feed has ended and the queue is drained
+        done = asyncio.create_task(asyncio.wait(producers))
+        stop = asyncio.create_task(self.stopping.wait())
+        await asyncio.wait([done, stop], return_when=asyncio.FIRST_COMPLETED)
+        if not stop.done():
+            await queue.join()
+        for task in producers + [worker, stop]:
+            task.cancel()
+        await asyncio.gather(*producers, worker, stop, return_exceptions=True)
+
+    async def _produce(self, feed, queue):
+        try:
+            async for tick in feed.stream():
+                if self.symbol and tick.symbol != self.symbol:
+                    continue
+                if self.drop_when_full:
+                    try:
+                        queue.put_nowait(tick)
+                    except asyncio.QueueFull:
+                        self.dropped += 1
+                else:
+                    await queue.put(tick)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            with self.lock:
+                self.errors.append(f"{feed.name}: {e}")
+        finally:
+            self.finished_feeds += 1
+
+    async def _consume(self, queue):
+        while True:
+            batch = [await queue.get()]
+            while len(batch) < self.batch_size and not queue.empty():
+                batch.append(queue.get_nowait())
+            with self.lock:
+                for tick in batch:
+                    self.tracker.update(tick)
+            for _ in batch:
+                queue.task_done()
+
+    def snapshot(self):
+        """Thread-safe copy of the current spread summary, pair spreads and pipeline counters."""
+        with self.lock:
+            summary = self.tracker.summary()
+            pairs = self.tracker.pair_spreads()
+            quotes = {venue: tick._asdict() for venue, tick in self.tracker.quotes.items()}
+            errors = list(self.errors)
+        elapsed = time.monotonic() - self.started_at if self.started_at else 0
+        return {
+            **summary,
+            'pairs': pairs,
+            'quotes': quotes,
+            'dropped': self.dropped,
+            'errors': errors,
+            'running': self.running,
+            'feeds_finished': self.finished_feeds,
+            'ticks_per_second': summary['ticks'] / elapsed if elapsed else 0.0
+        }
+
+
+def write_synthetic_replay(path, venues, seconds=60, ticks_per_second=1000, price=60000.0,
+                           volatility=0.0002, seed=0, symbol='BTC-USD', start=None):
+    """Write a replay file of random-walk quotes for ``venues``, for offline development.
+
+    Each venue's mid price wanders independently around a shared walk, so
+    cross-venue spreads open and close over time.
+    """
+    rng = np.random.default_rng(seed)
+    count = int(seconds * ticks_per_second)
+    start = time.time() if start is None else start
+
+    timestamps = start + np.sort(rng.uniform(0, seconds, count))
+    venue_index = rng.integers(0, len(venues), count)
+    shared = price * np.exp(np.cumsum(rng.normal(0, volatility, count)))
+    offset = rng.normal(0, volatility * 20, (len(venues), count)).cumsum(axis=1) / np.sqrt(np.arange(1, count + 1))
+    mid = shared * (1 + offset[venue_index, np.arange(count)])
+    half_spread = mid * rng.uniform(0.00005, 0.0002, count)
+
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(REPLAY_COLUMNS)
+        for timestamp, venue, m, h in zip(timestamps, venue_index, mid, half_spread):
+            writer.writerow((f'{timestamp:.6f}', venues[venue], symbol, f'{m - h:.2f}', f'{m + h:.2f}'))
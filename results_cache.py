@@ -0,0 +1,115 @@
+"""Process-wide memo of simulation results.
+
+Results are keyed on a canonical hash of every ``SimulationParams`` field,
+``platform_data`` included, plus the simulation model, so identical inputs
+from any session reuse the same run. The cache holds a bounded number of
+entries and evicts the least recently used one when it is full. Misses go
+through an ``IncrementalSimulation``, so inputs that differ from an earlier
+run in one platform only recompute that platform's pieces.
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from cashflow import simulate_cashflows
+from incremental import IncrementalSimulation
+
+
+def _canonical(value):
+    # Numbers compare by value, so 4000 and 4000.0 hash the same
+    if isinstance(value, dict):
+        return {str(key): _canonical(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(item) for item in value]
+    if isinstance(value, bool) or value is None or isinstance(value, str):
+        return value
+    return float(value)
+
+
+def params_hash(params, **extra):
+    """Stable hash of ``params`` and any extra inputs, such as the simulation model."""
+    values = {'params': params.to_dict(), **extra}
+    payload = json.dumps(_canonical(values), sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def simulation_key(params, step_hours=None):
+    """Cache key of ``ResultsCache.simulate(params, step_hours)``."""
+    return params_hash(params, step_hours=step_hours)
+
+
+def compute_simulation(engine, params, step_hours=None, report=None):
+    """``run_simulation`` through ``engine``, with the monthly table from ``simulate_cashflows`` if ``step_hours`` is set."""
+    simulation_df, comparison_df = engine.run(params, report)
+    if step_hours:
+        simulation_df = simulate_cashflows(params, step_hours)
+    return simulation_df, comparison_df
+
+
+class ResultsCache:
+    """Bounded, thread-safe LRU cache of ``(simulation_df, comparison_df)`` results."""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.engine = IncrementalSimulation()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        """Cached result for ``key``, or None (counted as a miss)."""
+        with self.lock:
+            result = self.entries.get(key)
+            if result is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+            return result
+
+    def put(self, key, result):
+        with self.lock:
+            self.entries[key] = result
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def get_or_compute(self, key, compute):
+        result = self.get(key)
+        if result is None:
+            result = compute()
+            self.put(key, result)
+        return result
+
+    def simulate(self, params, step_hours=None, report=None):
+        """Memoized ``run_simulation``, with the monthly table from ``simulate_cashflows`` if ``step_hours`` is set.
+
+        On a miss, a ``report`` dict is filled with what the engine recomputed
+        (see ``IncrementalSimulation.run``); on a hit it is left empty. The
+        returned DataFrames are shared between callers and must not be modified.
+        """
+        return self.get_or_compute(
+            simulation_key(params, step_hours), lambda: compute_simulation(self.engine, params, step_hours, report)
+        )
+
+    def stats(self):
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0
+            }
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
@@ -0,0 +1,293 @@
+"""Multi-leg arbitrage routes over exchanges, P2P venues and payment rails.
+
+Venues and rails form a directed graph. Cash in the bank buys crypto on an
+exchange, the crypto sells at the spread on a P2P venue, and a payment rail
+brings the cash back to the bank. Every edge carries the leg's value
+multiplier (after fees and, on the selling leg, the spread), transfer time
+and daily limit, and a route is a cycle from the bank back to it.
+
+Edges are weighted by ``-log(multiplier)``, so the best-returning routes are
+the shortest bank-to-bank paths. Bellman-Ford computes Johnson potentials
+that make every weight non-negative, which also detects profitable loops
+that never return to the bank. Yen's algorithm then lists the routes with
+Dijkstra, best return per cycle first, until none are left (or the first
+``max_routes``). The best return per cycle isn't always the best route, since
+a slow route or one with a tight daily limit runs fewer cycles a month, so
+every route found is ranked. Only the search depends on fees, times and the
+spread; ranking the routes for a given capital is a vectorized pass that
+mirrors ``calculate_platform_profit`` (time-based cycles from the route's
+total transfer time, capital-based cycles from its tightest daily limit), so
+``RouteFinder`` caches each graph with its routes and re-ranks them in
+milliseconds when only the capital changes.
+"""
+import heapq
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from platforms import REGISTRY
+
+BANK = 'bank'
+
+# Sink standing in for the bank at the end of a route, so routes are paths rather than cycles
+_RETURN = 'bank:return'
+
+
+@dataclass
+class Edge:
+    source: str
+    target: str
+    multiplier: float       # value out per unit in
+    transfer_time: float    # hours
+    daily_limit: float      # $ per day, inf if unlimited
+    platform: str           # platform or venue the leg goes through
+
+
+def build_graph(platform_data, spread_percentage, registry=REGISTRY):
+    """Edges of the exchange -> P2P venue -> rail route graph for ``platform_data``.
+
+    Platforms keep their registry role (exchanges unless listed as rails).
+    Without rails, P2P venues pay straight back into the bank.
+    """
+    exchanges = [key for key in platform_data if registry.role(key) == 'exchange']
+    rails = [key for key in platform_data if registry.role(key) == 'rail']
+    venues = registry.p2p_venues or {'p2p': {}}
+
+    edges = []
+    for key in exchanges:
+        platform = platform_data[key]
+        edges.append(Edge(BANK, key, 1 - platform['fee'] / 100, platform['transfer_time'],
+                          platform['daily_limit'], key))
+
+    for venue, entry in venues.items():
+        # Crypto moves to the venue freely; the sale earns the spread less the venue's fee
+        for key in exchanges:
+            edges.append(Edge(key, venue, 1.0, 0.0, np.inf, venue))
+        sale = (1 + spread_percentage / 100) * (1 - entry.get('fee', 0) / 100)
+        for key in rails or [BANK]:
+            edges.append(Edge(venue, key, sale, entry.get('transfer_time', 0), np.inf, venue))
+
+    for key in rails:
+        platform = platform_data[key]
+        edges.append(Edge(key, BANK, 1 - platform['fee'] / 100, platform['transfer_time'],
+                          platform['daily_limit'], key))
+    return edges
+
+
+class RouteGraph:
+    """Route graph with Johnson potentials and its bank-to-bank routes, found once.
+
+    ``max_routes`` keeps only the routes with the best return per cycle;
+    None keeps every route.
+    """
+
+    def __init__(self, edges, source=BANK, max_routes=None):
+        # Edges into the source end at a separate sink, and legs that lose everything can't be taken
+        self.edges = [edge for edge in edges if edge.multiplier > 0]
+        self.source = source
+        self.max_routes = max_routes
+
+        self.nodes = sorted({source, _RETURN} | {e.source for e in self.edges} | {e.target for e in self.edges})
+        self.index = {node: i for i, node in enumerate(self.nodes)}
+        self.heads = np.array([self.index[e.source] for e in self.edges], dtype=np.int64)
+        self.tails = np.array([self.index[_RETURN if e.target == source else e.target] for e in self.edges],
+                              dtype=np.int64)
+        self.weights = -np.log(np.array([e.multiplier for e in self.edges], dtype=float))
+
+        self.potentials = self.johnson_potentials()
+        reduced = self.weights + self.potentials[self.heads] - self.potentials[self.tails]
+        # Rounding can leave reduced weights a hair below zero, which Dijkstra can't take
+        self.reduced = np.maximum(reduced, 0.0)
+
+        self.outgoing = [[] for _ in self.nodes]
+        for i, head in enumerate(self.heads.tolist()):
+            self.outgoing[head].append(i)
+
+        self.routes = self.k_shortest_routes(max_routes)
+        # Combined legs of every route, so ranking for a capital is one vectorized pass
+        self.multiplier = np.array([np.prod([self.edges[e].multiplier for e in route]) for route in self.routes])
+        self.cycle_time = np.array([sum(self.edges[e].transfer_time for e in route) for route in self.routes])
+        self.daily_limit = np.array([min(self.edges[e].daily_limit for e in route) for route in self.routes])
+
+    def johnson_potentials(self):
+        """Bellman-Ford distances from a virtual node joined to every node at zero cost.
+
+        Raises ValueError if a profitable loop avoids the bank, since no
+        potentials exist then and the loop can't be run from cash anyway.
+        """
+        distance = np.zeros(len(self.nodes))
+        for _ in range(len(self.nodes)):
+            candidate = distance[self.heads] + self.weights
+            updated = distance.copy()
+            np.minimum.at(updated, self.tails, candidate)
+            if np.allclose(updated, distance, rtol=0, atol=1e-15):
+                return distance
+            distance = updated
+        raise ValueError(f"Profitable loop that never returns to the bank: {' -> '.join(self.negative_cycle())}")
+
+    def negative_cycle(self):
+        # Standard Bellman-Ford with predecessors, only run to report the loop
+        distance = np.zeros(len(self.nodes))
+        predecessor = [None] * len(self.nodes)
+        last = None
+        for _ in range(len(self.nodes)):
+            last = None
+            for head, tail, weight in zip(self.heads.tolist(), self.tails.tolist(), self.weights.tolist()):
+                if distance[head] + weight < distance[tail] - 1e-15:
+                    distance[tail] = distance[head] + weight
+                    predecessor[tail] = head
+                    last = tail
+        for _ in range(len(self.nodes)):
+            last = predecessor[last]
+        cycle = [last]
+        node = predecessor[last]
+        while node != last:
+            cycle.append(node)
+            node = predecessor[node]
+        return [self.nodes[i] for i in reversed(cycle + [last])]
+
+    def shortest_path(self, start, banned_edges, banned_nodes):
+        """Dijkstra over the reduced weights: ``(cost, edge indices)`` from ``start`` to the sink, or None."""
+        target = self.index[_RETURN]
+        distance = {start: 0.0}
+        previous = {}
+        queue = [(0.0, start)]
+        while queue:
+            cost, node = heapq.heappop(queue)
+            if node == target:
+                path = []
+                while node != start:
+                    path.append(previous[node])
+                    node = self.heads[previous[node]]
+                return cost, path[::-1]
+            if cost > distance.get(node, np.inf):
+                continue
+            for edge in self.outgoing[node]:
+                tail = int(self.tails[edge])
+                if edge in banned_edges or tail in banned_nodes:
+                    continue
+                new_cost = cost + self.reduced[edge]
+                if new_cost < distance.get(tail, np.inf):
+                    distance[tail] = new_cost
+                    previous[tail] = edge
+                    heapq.heappush(queue, (new_cost, tail))
+        return None
+
+    def k_shortest_routes(self, k):
+        """Up to ``k`` (None: all) loopless bank-to-bank routes as tuples of edge indices, best return first.
+
+        Yen's algorithm: each route found spurs candidates off its prefixes,
+        and the best candidate becomes the next route.
+        """
+        source = self.index[self.source]
+        first = self.shortest_path(source, set(), set())
+        if first is None:
+            return []
+
+        routes = [tuple(first[1])]
+        candidates = []
+        seen = {routes[0]}
+        while k is None or len(routes) < k:
+            previous = routes[-1]
+            for i in range(len(previous)):
+                root = previous[:i]
+                spur_node = int(self.heads[previous[i]]) if i else source
+
+                # Leave out the next edge of every route sharing this root, and the root's own nodes
+                banned_edges = {route[i] for route in routes if route[:i] == root and len(route) > i}
+                banned_nodes = {int(self.heads[edge]) for edge in root}
+                spur = self.shortest_path(spur_node, banned_edges, banned_nodes)
+                if spur is None:
+                    continue
+
+                route = root + tuple(spur[1])
+                if route not in seen:
+                    seen.add(route)
+                    heapq.heappush(candidates, (float(self.reduced[list(route)].sum()), route))
+
+            if not candidates:
+                break
+            routes.append(heapq.heappop(candidates)[1])
+        return routes
+
+    def rank(self, capital, cycles_per_month, k=5, registry=REGISTRY):
+        """Top ``k`` routes by monthly profit on ``capital``, as a DataFrame."""
+        if not self.routes:
+            return pd.DataFrame(columns=['route', 'path', 'cycle_return', 'cycle_time', 'daily_limit',
+                                         'cycles_per_month', 'monthly_return', 'monthly_profit'])
+
+        multiplier, cycle_time, daily_limit = self.multiplier, self.cycle_time, self.daily_limit
+
+        # Same cycle count as calculate_platform_profit, with the route's total time and tightest limit
+        time_based_cycles = cycles_per_month * (720 / (720 + cycle_time))
+        effective_capital = np.minimum(capital, daily_limit * 30)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            capital_based_cycles = np.where(np.isinf(daily_limit), np.inf,
+                                            np.floor(30 * effective_capital / daily_limit))
+        cycles = np.minimum(time_based_cycles, capital_based_cycles)
+        monthly_return = np.power(multiplier, cycles) - 1
+        monthly_profit = capital * monthly_return
+
+        order = np.lexsort((-multiplier, -monthly_profit))[:k]
+        paths = [[self.source] + [self.edges[e].target for e in self.routes[i]] for i in order]
+        return pd.DataFrame({
+            'route': [' → '.join(registry.label(node) for node in path) for path in paths],
+            'path': paths,
+            'cycle_return': (multiplier[order] - 1) * 100,
+            'cycle_time': cycle_time[order],
+            'daily_limit': daily_limit[order],
+            'cycles_per_month': cycles[order],
+            'monthly_return': monthly_return[order] * 100,
+            'monthly_profit': monthly_profit[order]
+        })
+
+
+class RouteFinder:
+    """Bounded, thread-safe cache of route graphs keyed on their inputs.
+
+    ``last_solve`` records whether the latest call built its graph or reused
+    it, and how long building and ranking took.
+    """
+
+    def __init__(self, max_graphs=32, max_routes=None):
+        self.max_graphs = max_graphs
+        self.max_routes = max_routes
+        self.graphs = OrderedDict()
+        self.lock = threading.Lock()
+        self.last_solve = {}
+
+    def graph(self, platform_data, spread_percentage):
+        key = json.dumps([platform_data, float(spread_percentage)], sort_keys=True, default=float)
+        with self.lock:
+            graph = self.graphs.get(key)
+            if graph is not None:
+                self.graphs.move_to_end(key)
+                return graph, False
+
+        graph = RouteGraph(build_graph(platform_data, spread_percentage), max_routes=self.max_routes)
+        with self.lock:
+            self.graphs[key] = graph
+            while len(self.graphs) > self.max_graphs:
+                self.graphs.popitem(last=False)
+        return graph, True
+
+    def top_routes(self, params, capital=None, k=5):
+        """Best ``k`` routes for ``params`` on ``capital`` (default: the initial capital)."""
+        started = time.perf_counter()
+        graph, built = self.graph(params.platform_data, params.spread_percentage)
+        solved = time.perf_counter()
+        routes = graph.rank(params.initial_capital if capital is None else capital, params.cycles_per_month, k)
+        self.last_solve = {
+            'graph': 'built' if built else 'cached',
+            'nodes': len(graph.nodes) - 1,
+            'edges': len(graph.edges),
+            'routes': len(graph.routes),
+            'search_ms': (solved - started) * 1000,
+            'rank_ms': (time.perf_counter() - solved) * 1000
+        }
+        return routes
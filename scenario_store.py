@@ -0,0 +1,248 @@
+"""On-disk store of named scenarios and sweep outputs in Arrow format.
+
+Each scenario is a directory holding its inputs (``params.json``) and the
+``simulation_df`` and ``comparison_df`` tables from ``run_simulation`` as
+uncompressed Arrow IPC files. Arrow IPC keeps the in-memory column layout on
+disk, so reloading memory-maps the file and builds the table without copying
+or parsing; only the pages that are actually read come off disk.
+
+Sweep outputs can run to millions of rows, so they are written in record
+batches and queried batch by batch, keeping only the selected columns and the
+rows that pass the filters. Any stored table can also be exported to Parquet
+for use outside the dashboard.
+
+The store lives in ``scenarios/`` next to this module unless the
+``SCENARIO_STORE`` environment variable points elsewhere.
+"""
+import json
+import os
+import re
+import shutil
+import tempfile
+from datetime import datetime
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from simulation import SimulationParams
+
+DEFAULT_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scenarios')
+
+# Scenario and sweep names double as file names
+NAME_PATTERN = re.compile(r'^[A-Za-z0-9][A-Za-z0-9 _.-]*$')
+
+# Rows per record batch when writing sweeps
+BATCH_ROWS = 65536
+
+
+def _check_name(name):
+    if not NAME_PATTERN.match(name or ''):
+        raise ValueError(f"Invalid name '{name}': use letters, digits, spaces, '.', '_' or '-'")
+    return name
+
+
+def _write_table(table, path):
+    with pa.OSFile(path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table, max_chunksize=BATCH_ROWS)
+
+
+def read_table(path, columns=None):
+    """Memory-map an Arrow IPC file and return its table without copying it into memory."""
+    with pa.memory_map(path, 'r') as source:
+        table = pa.ipc.open_file(source).read_all()
+    return table.select(columns) if columns else table
+
+
+class SweepWriter:
+    """Stream sweep rows to an Arrow file, one batch at a time.
+
+    Use as a context manager and call ``write`` with a mapping of column name
+    to array for each chunk; the file only appears under its name once closed.
+    """
+
+    def __init__(self, path, params=None, metadata=None):
+        self.path = path
+        self.metadata = {'params': params.to_dict() if params is not None else None, **(metadata or {})}
+        self.rows = 0
+        self.sink = None
+        self.writer = None
+
+    def write(self, columns):
+        batch = pa.RecordBatch.from_pydict({name: np.asarray(values) for name, values in columns.items()})
+        if self.writer is None:
+            schema = batch.schema.with_metadata({'sweep': json.dumps(self.metadata)})
+            self.sink = pa.OSFile(self.path + '.tmp', 'wb')
+            self.writer = pa.ipc.new_file(self.sink, schema)
+        for start in range(0, batch.num_rows, BATCH_ROWS):
+            self.writer.write_batch(batch.slice(start, BATCH_ROWS))
+        self.rows += batch.num_rows
+
+    def close(self):
+        if self.writer is None:
+            raise ValueError("Sweep has no rows")
+        self.writer.close()
+        self.sink.close()
+        os.replace(self.path + '.tmp', self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        elif self.writer is not None:
+            self.writer.close()
+            self.sink.close()
+            os.remove(self.path + '.tmp')
+
+
+class ScenarioStore:
+    def __init__(self, root=None):
+        self.root = root or os.environ.get('SCENARIO_STORE', DEFAULT_ROOT)
+        self.scenario_root = os.path.join(self.root, 'scenarios')
+        self.sweep_root = os.path.join(self.root, 'sweeps')
+        os.makedirs(self.scenario_root, exist_ok=True)
+        os.makedirs(self.sweep_root, exist_ok=True)
+
+    # Scenarios
+
+    def scenario_path(self, name):
+        return os.path.join(self.scenario_root, _check_name(name))
+
+    def save(self, name, params, simulation_df, comparison_df):
+        """Save a scenario, replacing any existing one with the same name."""
+        path = self.scenario_path(name)
+
+        # Write into a scratch directory and swap it in, so readers never see half a scenario
+        staging = tempfile.mkdtemp(dir=self.scenario_root, prefix='.staging-')
+        try:
+            with open(os.path.join(staging, 'params.json'), 'w') as f:
+                json.dump({
+                    'name': name,
+                    'saved_at': datetime.now().isoformat(timespec='seconds'),
+                    'params': params.to_dict()
+                }, f, indent=2)
+            _write_table(pa.Table.from_pandas(simulation_df, preserve_index=False),
+                         os.path.join(staging, 'simulation.arrow'))
+            _write_table(pa.Table.from_pandas(comparison_df, preserve_index=False),
+                         os.path.join(staging, 'comparison.arrow'))
+
+            if os.path.exists(path):
+                shutil.rmtree(path)
+            os.replace(staging, path)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+    def load_tables(self, name):
+        """``(params, simulation_table, comparison_table)`` with the tables memory-mapped."""
+        path = self.scenario_path(name)
+        if not os.path.isdir(path):
+            raise KeyError(f"No saved scenario named '{name}'")
+        with open(os.path.join(path, 'params.json')) as f:
+            params = SimulationParams(**json.load(f)['params'])
+        return (
+            params,
+            read_table(os.path.join(path, 'simulation.arrow')),
+            read_table(os.path.join(path, 'comparison.arrow'))
+        )
+
+    def load(self, name):
+        """``(params, simulation_df, comparison_df)`` in the schemas ``run_simulation`` returns."""
+        params, simulation, comparison = self.load_tables(name)
+        return params, simulation.to_pandas(split_blocks=True), comparison.to_pandas(split_blocks=True)
+
+    def scenarios(self):
+        """Saved scenarios with their horizon and ending capital, newest first."""
+        rows = []
+        for name in os.listdir(self.scenario_root):
+            path = os.path.join(self.scenario_root, name)
+            if name.startswith('.') or not os.path.isdir(path):
+                continue
+            with open(os.path.join(path, 'params.json')) as f:
+                info = json.load(f)
+            capital = read_table(os.path.join(path, 'simulation.arrow'), ['capital']).column(0)
+            rows.append({
+                'name': info['name'],
+                'saved_at': info['saved_at'],
+                'months': info['params']['months'],
+                'initial_capital': info['params']['initial_capital'],
+                'ending_capital': capital[len(capital) - 1].as_py() if len(capital) else None
+            })
+        return sorted(rows, key=lambda row: row['saved_at'], reverse=True)
+
+    def delete(self, name):
+        shutil.rmtree(self.scenario_path(name), ignore_errors=True)
+
+    # Sweeps
+
+    def sweep_path(self, name):
+        return os.path.join(self.sweep_root, f'{_check_name(name)}.arrow')
+
+    def sweep_writer(self, name, params=None, metadata=None):
+        return SweepWriter(self.sweep_path(name), params, metadata)
+
+    def save_sweep(self, name, columns, params=None, metadata=None):
+        """Save a whole sweep held in memory; use ``sweep_writer`` to stream larger ones."""
+        with self.sweep_writer(name, params, metadata) as writer:
+            writer.write(columns)
+
+    def sweep_info(self, name):
+        with pa.memory_map(self.sweep_path(name), 'r') as source:
+            reader = pa.ipc.open_file(source)
+            info = json.loads(reader.schema.metadata[b'sweep'])
+            info['columns'] = reader.schema.names
+            info['rows'] = sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+        return info
+
+    def sweeps(self):
+        return sorted(name[:-len('.arrow')] for name in os.listdir(self.sweep_root) if name.endswith('.arrow'))
+
+    def query_sweep(self, name, columns=None, filters=None, max_rows=None):
+        """Rows of a saved sweep as a DataFrame, reading one memory-mapped batch at a time.
+
+        ``filters`` maps a column to an inclusive ``(low, high)`` range, either end
+        of which may be None. ``max_rows`` thins the matching rows evenly, which is
+        enough for charting very large sweeps.
+        """
+        filters = filters or {}
+        matched = []
+        with pa.memory_map(self.sweep_path(name), 'r') as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                batch = reader.get_batch(i)
+                mask = None
+                for column, (low, high) in filters.items():
+                    values = batch.column(column)
+                    for condition in (
+                        pc.greater_equal(values, low) if low is not None else None,
+                        pc.less_equal(values, high) if high is not None else None
+                    ):
+                        if condition is not None:
+                            mask = condition if mask is None else pc.and_(mask, condition)
+                if columns:
+                    batch = batch.select(columns)
+                matched.append(batch.filter(mask) if mask is not None else batch)
+            table = pa.Table.from_batches(matched, schema=matched[0].schema if matched else None)
+
+        if max_rows and table.num_rows > max_rows:
+            table = table.take(np.linspace(0, table.num_rows - 1, max_rows).astype(np.int64))
+        return table.to_pandas(split_blocks=True)
+
+    def delete_sweep(self, name):
+        path = self.sweep_path(name)
+        if os.path.exists(path):
+            os.remove(path)
+
+    # Export
+
+    def export_parquet(self, name, path, table='simulation'):
+        """Write a scenario table (``simulation`` or ``comparison``) or a sweep (``sweep``) to Parquet."""
+        if table == 'sweep':
+            source = read_table(self.sweep_path(name))
+        else:
+            source = read_table(os.path.join(self.scenario_path(name), f'{table}.arrow'))
+        pq.write_table(source, path)
@@ -0,0 +1,303 @@
+"""Day-by-day deployment plan that maximizes throughput.
+
+The plan is a min-cost flow over a time-expanded network with one node per
+allocation per day, plus one per day for cash in the bank:
+
+* cash on an allocation can wait a day (free) or be deployed, at most its
+  platform's ``daily_limit`` per day, earning one unit of volume per dollar;
+  deployed cash comes back after the execution time plus the platform's
+  ``transfer_time``, rounded up to whole days as in ``cashflow.py``,
+* cash in the bank (capital left unallocated) can be deposited on any
+  allocation, and with ``rebalance`` idle cash can be withdrawn to the bank,
+  each move taking ``move_days`` and a small cost so no cash moves for nothing,
+* pending transfers enter the network on the day they arrive.
+
+Deployments are weighted far above moves, so the cheapest flow is the plan
+with the most volume and, among those, the fewest moves. The network is
+solved with the primal-dual method: Dijkstra over reduced costs finds the
+cheapest remaining paths, then a Dinic blocking flow saturates every path of
+that cost at once. Costs are integers and paths only have as many distinct
+costs as deployments and moves they can chain, so a 30-day plan over 20
+allocations takes a few dozen phases. Flows conserve principal; profit is
+booked as it is made rather than reinvested within the plan.
+"""
+import heapq
+import time
+from collections import deque
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from platforms import platform_arrays
+
+BANK = 'bank'
+
+HOURS_PER_DAY = 24
+HOURS_PER_MONTH = 720
+
+# Days to move cash between the bank and an allocation
+MOVE_DAYS = 1
+
+# Cost of a deployed dollar against a moved one, so volume always comes first
+DEPLOY_COST = -1000
+MOVE_COST = 1
+
+# Flows below this are treated as empty
+EPSILON = 1e-6
+
+
+@dataclass
+class PendingTransfer:
+    allocation: str
+    amount: float
+    day: int                # day the cash becomes available on the allocation
+
+
+@dataclass
+class DeploymentPlan:
+    schedule: pd.DataFrame      # one row per day and allocation: available, deployed, returning, held
+    transfers: pd.DataFrame     # cash moved through the bank: day, source, target, amount, arrival_day
+    volume: float               # dollars deployed over the plan
+    profit: float               # spread less fees on the volume, without reinvestment
+    days: int
+    phases: int
+    solve_time: float           # seconds
+
+    @property
+    def monthly_volume(self):
+        return self.volume * 30 / self.days
+
+    def volume_by_allocation(self):
+        return self.schedule.groupby('allocation', sort=False)['deployed'].sum()
+
+
+class _FlowNetwork:
+    """Residual graph for min-cost flow, with paired forward and reverse edges."""
+
+    def __init__(self, nodes):
+        self.adjacency = [[] for _ in range(nodes)]
+        self.heads = []
+        self.capacity = []
+        self.cost = []
+
+    def add_edge(self, source, target, capacity, cost):
+        edge = len(self.heads)
+        self.heads += [target, source]
+        self.capacity += [float(capacity), 0.0]
+        self.cost += [cost, -cost]
+        self.adjacency[source].append(edge)
+        self.adjacency[target].append(edge + 1)
+        return edge
+
+    def flow(self, edge):
+        # Flow on a forward edge is what its reverse edge can send back
+        return self.capacity[edge ^ 1]
+
+    def dag_potentials(self, source):
+        # Nodes are numbered in time order and every edge moves forward in time (moves take at least a
+        # day), so one pass in order relaxes every edge after its tail
+        potential = [float('inf')] * len(self.adjacency)
+        potential[source] = 0
+        for node, edges in enumerate(self.adjacency):
+            if potential[node] == float('inf'):
+                continue
+            for edge in edges:
+                if edge % 2 == 0 and potential[node] + self.cost[edge] < potential[self.heads[edge]]:
+                    potential[self.heads[edge]] = potential[node] + self.cost[edge]
+        return potential
+
+    def min_cost_flow(self, source, sink):
+        """Send as much flow as possible from ``source`` to ``sink`` at least cost; returns the number of phases."""
+        potential = self.dag_potentials(source)
+        phases = 0
+        while True:
+            distance = self.dijkstra(source, sink, potential)
+            if distance is None:
+                return phases
+            phases += 1
+
+            # Capping at the sink's distance keeps reduced costs non-negative for nodes Dijkstra didn't settle
+            sink_distance = distance[sink]
+            for node in range(len(potential)):
+                potential[node] += min(distance.get(node, sink_distance), sink_distance)
+            self.blocking_flow(source, sink, potential)
+
+    def dijkstra(self, source, sink, potential):
+        distance = {source: 0}
+        queue = [(0, source)]
+        settled = set()
+        while queue:
+            cost, node = heapq.heappop(queue)
+            if node in settled:
+                continue
+            settled.add(node)
+            if node == sink:
+                return distance
+            for edge in self.adjacency[node]:
+                if self.capacity[edge] <= EPSILON:
+                    continue
+                target = self.heads[edge]
+                new_cost = cost + self.cost[edge] + potential[node] - potential[target]
+                if new_cost < distance.get(target, float('inf')):
+                    distance[target] = new_cost
+                    heapq.heappush(queue, (new_cost, target))
+        return None
+
+    def blocking_flow(self, source, sink, potential):
+        # Max flow (Dinic) over the edges with zero reduced cost, i.e. the cheapest remaining paths
+        def admissible(node, edge):
+            return (self.capacity[edge] > EPSILON
+                    and self.cost[edge] + potential[node] - potential[self.heads[edge]] == 0)
+
+        while True:
+            level = {source: 0}
+            queue = deque([source])
+            while queue:
+                node = queue.popleft()
+                for edge in self.adjacency[node]:
+                    if self.heads[edge] not in level and admissible(node, edge):
+                        level[self.heads[edge]] = level[node] + 1
+                        queue.append(self.heads[edge])
+            if sink not in level:
+                return
+
+            position = {node: 0 for node in level}
+
+            def push(node, limit):
+                if node == sink:
+                    return limit
+                edges = self.adjacency[node]
+                while position[node] < len(edges):
+                    edge = edges[position[node]]
+                    target = self.heads[edge]
+                    if level.get(target) == level[node] + 1 and admissible(node, edge):
+                        pushed = push(target, min(limit, self.capacity[edge]))
+                        if pushed > EPSILON:
+                            self.capacity[edge] -= pushed
+                            self.capacity[edge ^ 1] += pushed
+                            return pushed
+                    position[node] += 1
+                return 0.0
+
+            while push(source, float('inf')) > EPSILON:
+                pass
+
+
+def cycle_days(params, transfer_time):
+    """Days deployed cash is locked: execution plus transfer time, rounded up as in ``cashflow.py``."""
+    cycle_hours = HOURS_PER_MONTH / params.cycles_per_month + transfer_time
+    return np.maximum(np.ceil(cycle_hours / HOURS_PER_DAY).astype(np.int64), 1)
+
+
+def plan_deployments(params, days=30, pending=(), rebalance=True, move_days=MOVE_DAYS):
+    """Deployment calendar for ``params`` over ``days`` days that maximizes volume.
+
+    Allocations start with their capital from ``params``, the bank with the
+    rest of the initial capital, and every ``PendingTransfer`` in ``pending``
+    adds cash on its day. Raises ValueError for pending transfers to unknown
+    allocations, or if ``move_days`` is under a day.
+    """
+    if move_days < 1:
+        # Same-day moves would let cash loop between the bank and an allocation, breaking the time order
+        raise ValueError(f"move_days must be at least 1, got {move_days}")
+    started = time.perf_counter()
+    names = list(params.allocations)
+    fee, transfer_time, daily_limit = platform_arrays(params.platform_data, params.allocation_platforms())
+    delays = cycle_days(params, transfer_time)
+    count = len(names)
+    balances = params.allocation_vector()
+    idle_capital = max(float(params.initial_capital) - balances.sum(), 0.0)
+
+    arrivals = np.zeros((count, days + 1))
+    for transfer in pending:
+        if transfer.allocation not in params.allocations:
+            raise ValueError(f"Pending transfer to unknown allocation '{transfer.allocation}'")
+        arrivals[names.index(transfer.allocation), min(max(int(transfer.day), 0), days)] += transfer.amount
+
+    total = idle_capital + balances.sum() + arrivals.sum()
+    unlimited = total + 1
+
+    # Node numbering follows time: the source, then the bank and every allocation for each day, then the sink
+    source = 0
+    sink = 1 + (days + 1) * (count + 1)
+
+    def bank(day):
+        return 1 + day * (count + 1)
+
+    def allocation(index, day):
+        return 1 + day * (count + 1) + 1 + index
+
+    network = _FlowNetwork(sink + 1)
+    network.add_edge(source, bank(0), idle_capital, 0)
+    for i in range(count):
+        network.add_edge(source, allocation(i, 0), balances[i] + arrivals[i, 0], 0)
+        for day in np.flatnonzero(arrivals[i, 1:]) + 1:
+            network.add_edge(source, allocation(i, day), arrivals[i, day], 0)
+
+    deploy_edges = np.zeros((count, days), dtype=np.int64)
+    hold_edges = np.zeros((count, days), dtype=np.int64)
+    moves = []
+    for day in range(days):
+        network.add_edge(bank(day), bank(day + 1), unlimited, 0)
+        arrival_day = min(day + move_days, days)
+        for i in range(count):
+            hold_edges[i, day] = network.add_edge(allocation(i, day), allocation(i, day + 1), unlimited, 0)
+            deploy_edges[i, day] = network.add_edge(allocation(i, day), allocation(i, min(day + delays[i], days)),
+                                                    daily_limit[i], DEPLOY_COST)
+            moves.append((network.add_edge(bank(day), allocation(i, arrival_day), unlimited, MOVE_COST),
+                          day, BANK, names[i], arrival_day))
+            if rebalance:
+                moves.append((network.add_edge(allocation(i, day), bank(arrival_day), unlimited, MOVE_COST),
+                              day, names[i], BANK, arrival_day))
+
+    network.add_edge(bank(days), sink, unlimited, 0)
+    for i in range(count):
+        network.add_edge(allocation(i, days), sink, unlimited, 0)
+
+    phases = network.min_cost_flow(source, sink)
+
+    flows = np.array(network.capacity)[1::2]
+    deployed = flows[deploy_edges // 2]
+    held = flows[hold_edges // 2]
+    deployed[deployed < EPSILON] = 0.0
+    held[held < EPSILON] = 0.0
+
+    # Principal coming back each day, from deployments made delays[i] days earlier
+    returning = np.zeros((count, days))
+    for i in range(count):
+        if delays[i] < days:
+            returning[i, delays[i]:] = deployed[i, :days - delays[i]]
+
+    withdrawn = np.zeros((count, days))
+    for edge, day, source_name, _, _ in moves:
+        if source_name != BANK:
+            withdrawn[names.index(source_name), day] += network.flow(edge)
+
+    # Day-major rows, allocations in their registry order within each day
+    schedule = pd.DataFrame({
+        'day': np.repeat(np.arange(days), count),
+        'allocation': np.tile(names, days),
+        'available': (deployed + held + withdrawn).T.ravel(),
+        'deployed': deployed.T.ravel(),
+        'returning': returning.T.ravel(),
+        'held': held.T.ravel()
+    })
+
+    transfers = pd.DataFrame(
+        [(day, source_name, target_name, network.flow(edge), arrival_day)
+         for edge, day, source_name, target_name, arrival_day in moves if network.flow(edge) > EPSILON],
+        columns=['day', 'source', 'target', 'amount', 'arrival_day']
+    )
+
+    volume = float(deployed.sum())
+    profit = float((deployed.sum(axis=1) * (params.spread_percentage - fee) / 100).sum())
+    return DeploymentPlan(
+        schedule=schedule,
+        transfers=transfers,
+        volume=volume,
+        profit=profit,
+        days=days,
+        phases=phases,
+        solve_time=time.perf_counter() - started
+    )
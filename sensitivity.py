@@ -0,0 +1,174 @@
+"""Sensitivity of the simulation's outputs to every input.
+
+Each input (spread, cycles per month, reinvestment rate, every funded
+platform's fee, transfer time and daily limit, and every allocation) is
+moved on its own:
+
+* ``step`` (1%) either way, for a central-difference partial derivative and
+  the elasticity (% change in the output per 1% change in the input), and
+* ``swing`` (10%) either way, for the low and high ends of the tornado chart.
+
+Every perturbed scenario, plus the unperturbed one, is a row of a single
+``BatchArrays`` stepped through the months by ``batch.run_batch``, so the
+whole analysis is one vectorized evaluation of the ``run_simulation`` model
+however many platforms there are. Platform inputs enter through the
+per-scenario cycle growth, time-based cycles and daily limit columns, so a
+platform behind several allocations moves all of them.
+
+Once a daily limit binds, cycles are whole numbers (``floor(30 * capital /
+daily_limit)``) and outputs step rather than slope, so derivatives are the
+average slope over the step. Inputs at zero move by an absolute step of the
+input's usual scale instead, and bounded inputs (nothing below zero,
+reinvestment up to 100%) are clipped, with the difference taken over the
+interval actually covered.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from batch import BatchArrays, run_batch
+from platforms import REGISTRY, platform_arrays
+
+# Outputs analysed, with their labels
+OUTPUTS = {
+    'ending_capital': 'Ending Capital ($)',
+    'accumulated_return': 'Accumulated Return (%)'
+}
+
+# Relative moves for the derivatives and for the tornado chart
+STEP = 0.01
+SWING = 0.1
+
+# Scale of each kind of input, used instead of the value when the value is zero
+SCALES = {
+    'spread_percentage': 1.0,
+    'cycles_per_month': 1.0,
+    'reinvestment_rate': 10.0,
+    'fee': 1.0,
+    'transfer_time': 24.0,
+    'daily_limit': 1000.0,
+    'allocation': 1000.0
+}
+
+# Bounds of each kind of input; fees may be negative (rebates)
+BOUNDS = {
+    'reinvestment_rate': (0.0, 100.0),
+    'fee': (-np.inf, np.inf)
+}
+
+
+@dataclass
+class SensitivityInput:
+    key: str            # e.g. 'spread_percentage' or 'fee:kraken'
+    label: str
+    kind: str           # one of SCALES
+    value: float
+    columns: list       # allocation columns it applies to, empty for scalar inputs
+
+
+def sensitivity_inputs(params):
+    """Every input the outputs depend on, in display order."""
+    inputs = [
+        SensitivityInput('spread_percentage', 'Spread (%)', 'spread_percentage', float(params.spread_percentage), []),
+        SensitivityInput('cycles_per_month', 'Cycles per Month', 'cycles_per_month', float(params.cycles_per_month), []),
+        SensitivityInput('reinvestment_rate', 'Reinvestment Rate (%)', 'reinvestment_rate',
+                         float(params.reinvestment_rate), [])
+    ]
+
+    # Only platforms behind an allocation affect the simulation
+    allocation_platforms = params.allocation_platforms()
+    for key in dict.fromkeys(allocation_platforms):
+        columns = [i for i, platform in enumerate(allocation_platforms) if platform == key]
+        platform = params.platform_data[key]
+        label = REGISTRY.label(key)
+        inputs += [
+            SensitivityInput(f'fee:{key}', f'{label} Fee (%)', 'fee', float(platform['fee']), columns),
+            SensitivityInput(f'transfer_time:{key}', f'{label} Transfer Time (hrs)', 'transfer_time',
+                             float(platform['transfer_time']), columns),
+            SensitivityInput(f'daily_limit:{key}', f'{label} Daily Limit ($)', 'daily_limit',
+                             float(platform['daily_limit']), columns)
+        ]
+
+    for i, (name, amount) in enumerate(params.allocations.items()):
+        inputs.append(SensitivityInput(f'allocation:{name}', f'{REGISTRY.label(name)} Capital ($)', 'allocation',
+                                       float(amount), [i]))
+    return inputs
+
+
+def perturbed_values(item, relative):
+    """Values of ``item`` moved down and up by ``relative``, clipped to its bounds."""
+    delta = relative * (abs(item.value) or SCALES[item.kind])
+    lower, upper = BOUNDS.get(item.kind, (0.0, np.inf))
+    return max(item.value - delta, lower), min(item.value + delta, upper)
+
+
+def sensitivity_analysis(params, step=STEP, swing=SWING):
+    """Partial derivatives, elasticities and tornado ranges of ``OUTPUTS`` for every input of ``params``.
+
+    Returns one row per input and output, with the input's ``value``, the
+    output's ``base``, ``gradient`` (output change per unit of input),
+    ``elasticity``, and the outputs at ``low_value``/``high_value`` (the
+    input moved by ``swing``) as ``low``/``high``.
+    """
+    inputs = sensitivity_inputs(params)
+    names = list(params.allocations)
+    fee, transfer_time, daily_limit = platform_arrays(params.platform_data, params.allocation_platforms())
+
+    # Row 0 is the unperturbed scenario, then four rows per input: -step, +step, -swing, +swing
+    n = 1 + 4 * len(inputs)
+    columns = {
+        'spread_percentage': np.full(n, float(params.spread_percentage)),
+        'cycles_per_month': np.full(n, float(params.cycles_per_month)),
+        'reinvestment_rate': np.full(n, float(params.reinvestment_rate)),
+        'fee': np.tile(fee, (n, 1)),
+        'transfer_time': np.tile(transfer_time, (n, 1)),
+        'daily_limit': np.tile(daily_limit, (n, 1)),
+        'allocation': np.tile(params.allocation_vector(), (n, 1))
+    }
+
+    moved = np.empty((len(inputs), 4))
+    for i, item in enumerate(inputs):
+        moved[i] = perturbed_values(item, step) + perturbed_values(item, swing)
+        rows = np.arange(1 + 4 * i, 5 + 4 * i)
+        if item.columns:
+            columns[item.kind][np.ix_(rows, item.columns)] = moved[i][:, None]
+        else:
+            columns[item.kind][rows] = moved[i]
+
+    # Same per-scenario constants as batch.prepare_batch, with every platform column per scenario
+    arrays = BatchArrays(
+        initial_capital=np.full(n, float(params.initial_capital)),
+        capitals=columns['allocation'],
+        cycle_growth=1 + (columns['spread_percentage'][:, None] - columns['fee']) / 100,
+        time_based_cycles=columns['cycles_per_month'][:, None] * (720 / (720 + columns['transfer_time'])),
+        reinvest_fraction=columns['reinvestment_rate'] / 100,
+        daily_limit=columns['daily_limit'],
+        names=names
+    )
+    result = run_batch(arrays, params.months, record_platforms=False)
+
+    values = np.array([item.value for item in inputs])
+    frames = []
+    for output, outcome in (('ending_capital', result.ending_capital),
+                            ('accumulated_return', result.accumulated_return[:, -1])):
+        base = outcome[0]
+        perturbed = outcome[1:].reshape(len(inputs), 4)
+        gradient = (perturbed[:, 1] - perturbed[:, 0]) / (moved[:, 1] - moved[:, 0])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            elasticity = np.where(base != 0, gradient * values / base, np.nan)
+        elasticity[values == 0] = 0.0
+        frames.append(pd.DataFrame({
+            'input': [item.key for item in inputs],
+            'label': [item.label for item in inputs],
+            'value': values,
+            'output': output,
+            'base': base,
+            'gradient': gradient,
+            'elasticity': elasticity,
+            'low_value': moved[:, 2],
+            'high_value': moved[:, 3],
+            'low': perturbed[:, 2],
+            'high': perturbed[:, 3]
+        }))
+    return pd.concat(frames, ignore_index=True)
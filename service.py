@@ -0,0 +1,566 @@
+"""Headless batch evaluation of scenarios, from the command line or a local HTTP API.
+
+A scenario spec is a mapping of ``SimulationParams`` inputs in the flat form
+the dashboard keeps in ``st.session_state`` (``initial_capital``, ``months``,
+``spread_percentage``, ..., one ``<name>_capital`` per allocation, or an
+``allocations`` dict), plus an optional ``id`` echoed back with its results
+and an optional ``step_hours`` for the cashflow model. Inputs left out keep
+the dashboard's defaults. Specs come as a JSON object or list, NDJSON, or CSV
+with one scenario per row.
+
+Scenarios are looked up in a ``ResultsCache`` under the same keys the
+dashboard uses, and cache misses are simulated in chunks on a process pool,
+so throughput grows with the number of cores. Results stream back in input
+order as NDJSON lines or an Arrow IPC stream, either one summary row per
+scenario or one row per scenario and month. The HTTP API validates every
+scenario before sending its status, so bad input comes back as a JSON
+error rather than a half-sent body.
+
+    python service.py evaluate scenarios.csv --format arrow --output results.arrow
+    python service.py serve --port 8765
+    curl -X POST --data-binary @scenarios.json 'http://127.0.0.1:8765/evaluate?detail=monthly'
+
+Setting ``DASHBOARD_API_PORT`` starts the same HTTP API inside the dashboard
+process, sharing its results cache with every dashboard session.
+"""
+import argparse
+import io
+import itertools
+import json
+import logging
+import multiprocessing
+import numbers
+import os
+import sys
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from cashflow import HOURS_PER_DAY
+from incremental import IncrementalSimulation
+from platforms import PLATFORM_FIELDS, REGISTRY
+from results_cache import ResultsCache, compute_simulation, simulation_key
+from simulation import SimulationParams
+
+logger = logging.getLogger('service')
+
+# Port of the HTTP API started inside the dashboard process, if set
+API_PORT_VARIABLE = 'DASHBOARD_API_PORT'
+DEFAULT_PORT = 8765
+
+INPUT_FORMATS = ('json', 'ndjson', 'csv')
+OUTPUT_FORMATS = ('ndjson', 'arrow')
+DETAILS = ('summary', 'monthly')
+
+CONTENT_TYPES = {
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+    'arrow': 'application/vnd.apache.arrow.stream'
+}
+
+# Scenarios simulated per pool task, and rows per NDJSON write or Arrow record batch
+CHUNK_SIZE = 64
+BATCH_ROWS = 4096
+
+SUMMARY_SCHEMA = pa.schema([
+    ('scenario', pa.int64()),
+    ('id', pa.string()),
+    ('key', pa.string()),
+    ('months', pa.int64()),
+    ('initial_capital', pa.float64()),
+    ('ending_capital', pa.float64()),
+    ('total_profit', pa.float64()),
+    ('accumulated_return', pa.float64()),
+    ('cached', pa.bool_())
+])
+
+MONTHLY_SCHEMA = pa.schema([
+    ('scenario', pa.int64()),
+    ('id', pa.string()),
+    ('month', pa.int64()),
+    ('capital', pa.float64()),
+    ('profit', pa.float64()),
+    ('return_rate', pa.float64()),
+    ('accumulated_return', pa.float64()),
+    ('allocation_capital', pa.map_(pa.string(), pa.float64()))
+])
+
+SCHEMAS = {'summary': SUMMARY_SCHEMA, 'monthly': MONTHLY_SCHEMA}
+
+
+@dataclass
+class Scenario:
+    index: int              # position in the request
+    id: str                 # caller's id, or None
+    params: SimulationParams
+    step_hours: float       # cashflow model step, or None for the monthly model
+    key: str                # results cache key
+
+
+def read_specs(text, input_format='json'):
+    """List of spec mappings from JSON (an object or a list), NDJSON or CSV text."""
+    if input_format == 'csv':
+        frame = pd.read_csv(io.StringIO(text))
+        return [{key: value for key, value in row.items() if not pd.isna(value)} for row in frame.to_dict('records')]
+    if input_format == 'ndjson':
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+    if input_format == 'json':
+        specs = json.loads(text)
+        return specs if isinstance(specs, list) else [specs]
+    raise ValueError(f"Unknown input format '{input_format}'")
+
+
+def _number(index, name, value, minimum=None, above=None):
+    # Numbers may come as strings (hand-written JSON, for example); anything else is rejected here
+    # rather than failing later in a worker
+    if isinstance(value, str):
+        try:
+            value = float(value)
+        except ValueError:
+            raise ValueError(f"Scenario {index}: {name} must be a number, got '{value}'") from None
+    if isinstance(value, bool) or not isinstance(value, numbers.Real) or not np.isfinite(value):
+        raise ValueError(f"Scenario {index}: {name} must be a finite number, got {value!r}")
+    if minimum is not None and value < minimum:
+        raise ValueError(f"Scenario {index}: {name} must be at least {minimum:g}")
+    if above is not None and value <= above:
+        raise ValueError(f"Scenario {index}: {name} must be above {above:g}")
+    return value
+
+
+def validate_params(index, params):
+    """Coerce ``params``' inputs to numbers in place, raising ValueError for anything the engines can't run."""
+    params.months = int(_number(index, 'months', params.months))
+    if params.months < 1:
+        raise ValueError(f"Scenario {index} needs at least one month")
+    params.initial_capital = _number(index, 'initial_capital', params.initial_capital)
+    if params.initial_capital <= 0:
+        raise ValueError(f"Scenario {index} needs a positive initial capital")
+    params.spread_percentage = _number(index, 'spread_percentage', params.spread_percentage)
+    params.reinvestment_rate = _number(index, 'reinvestment_rate', params.reinvestment_rate, minimum=0)
+    params.cycles_per_month = _number(index, 'cycles_per_month', params.cycles_per_month, minimum=0)
+
+    if not isinstance(params.platform_data, dict) or not all(isinstance(p, dict) for p in params.platform_data.values()):
+        raise ValueError(f"Scenario {index}: platform_data must map platforms to their inputs")
+    # Copied, since every scenario without its own platform_data shares the defaults'
+    params.platform_data = {key: dict(platform) for key, platform in params.platform_data.items()}
+    for key, platform in params.platform_data.items():
+        missing = [name for name in PLATFORM_FIELDS if name not in platform]
+        if missing:
+            raise ValueError(f"Scenario {index}: platform '{key}' is missing {', '.join(missing)}")
+        platform['fee'] = _number(index, f'{key} fee', platform['fee'])
+        platform['transfer_time'] = _number(index, f'{key} transfer_time', platform['transfer_time'], minimum=0)
+        platform['daily_limit'] = _number(index, f'{key} daily_limit', platform['daily_limit'], above=0)
+
+    if not isinstance(params.allocations, dict):
+        raise ValueError(f"Scenario {index}: allocations must map allocation names to capital")
+    for name, capital in params.allocations.items():
+        params.allocations[name] = _number(index, f'{name} capital', capital, minimum=0)
+        if REGISTRY.platform_for(name) not in params.platform_data:
+            raise ValueError(f"Scenario {index}: allocation '{name}' has no platform data")
+
+
+def build_scenario(index, spec, defaults=None):
+    """``Scenario`` for one spec, on top of ``defaults`` (the dashboard's, if None).
+
+    Raises ValueError for any input the simulation can't run, so a request
+    is rejected before any result is sent.
+    """
+    if not isinstance(spec, dict):
+        raise ValueError(f"Scenario {index} is not an object")
+
+    defaults = defaults or SimulationParams().to_mapping()
+    inputs = {key: value for key, value in spec.items() if key not in ('id', 'step_hours')}
+    unknown = sorted(set(inputs) - set(defaults) - {'allocations'})
+    if unknown:
+        raise ValueError(f"Unknown inputs in scenario {index}: {', '.join(unknown)}")
+
+    params = SimulationParams.from_mapping({**defaults, **inputs})
+    validate_params(index, params)
+
+    step_hours = spec.get('step_hours') or None
+    if step_hours is not None:
+        # The cashflow model steps through whole days in whole hours
+        whole_hours = isinstance(step_hours, numbers.Real) and not isinstance(step_hours, bool) \
+            and step_hours > 0 and float(step_hours).is_integer()
+        if not whole_hours or HOURS_PER_DAY % int(step_hours):
+            raise ValueError(f"Scenario {index} needs step_hours of a whole number of hours dividing {HOURS_PER_DAY}")
+        step_hours = int(step_hours)
+    return Scenario(
+        index=index,
+        id=None if spec.get('id') is None else str(spec['id']),
+        params=params,
+        step_hours=step_hours,
+        key=simulation_key(params, step_hours)
+    )
+
+
+def build_scenarios(specs):
+    defaults = SimulationParams().to_mapping()
+    return [build_scenario(index, spec, defaults) for index, spec in enumerate(specs)]
+
+
+# Each pool worker keeps its own incremental engine across the chunks it simulates
+_worker_engine = None
+
+
+def _simulate_chunk(tasks):
+    global _worker_engine
+    if _worker_engine is None:
+        _worker_engine = IncrementalSimulation()
+    return [compute_simulation(_worker_engine, SimulationParams(**params), step_hours) for params, step_hours in tasks]
+
+
+class ScenarioEvaluator:
+    """Evaluate scenarios through a ``ResultsCache``, simulating cache misses on a process pool.
+
+    With one worker, misses are simulated in this process by the cache's own
+    engine. The pool starts on first use and is kept for later requests.
+    """
+
+    def __init__(self, cache=None, workers=None, chunk_size=CHUNK_SIZE):
+        self.cache = cache if cache is not None else ResultsCache()
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.pool = None
+        self.pool_lock = threading.Lock()
+
+    def executor(self):
+        with self.pool_lock:
+            if self.pool is None:
+                # Spawned rather than forked, since the dashboard and the HTTP server run threads
+                self.pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+            return self.pool
+
+    def close(self):
+        with self.pool_lock:
+            if self.pool is not None:
+                self.pool.shutdown()
+                self.pool = None
+
+    def submit(self, chunk):
+        # Look the chunk up in the cache and start simulating its misses, once per distinct key
+        cached = {}
+        misses = {}
+        for scenario in chunk:
+            if scenario.key in cached or scenario.key in misses:
+                continue
+            result = self.cache.get(scenario.key)
+            if result is None:
+                misses[scenario.key] = scenario
+            else:
+                cached[scenario.key] = result
+
+        computed = {}
+        future = None
+        if misses and self.workers == 1:
+            for key, scenario in misses.items():
+                computed[key] = compute_simulation(self.cache.engine, scenario.params, scenario.step_hours)
+                self.cache.put(key, computed[key])
+        elif misses:
+            tasks = [(scenario.params.to_dict(), scenario.step_hours) for scenario in misses.values()]
+            future = self.executor().submit(_simulate_chunk, tasks)
+        return chunk, cached, computed, misses, future
+
+    def collect(self, submitted):
+        chunk, cached, computed, misses, future = submitted
+        if future is not None:
+            for key, result in zip(misses, future.result()):
+                self.cache.put(key, result)
+                computed[key] = result
+        return [
+            (scenario, cached[scenario.key], True) if scenario.key in cached
+            else (scenario, computed[scenario.key], False)
+            for scenario in chunk
+        ]
+
+    def evaluate_chunks(self, scenarios):
+        """Yield a list of ``(scenario, (simulation_df, comparison_df), cached)`` per chunk, in order.
+
+        Up to two chunks per worker are in flight at once, so results stream
+        back while later chunks are still being simulated.
+        """
+        pending = deque()
+        for start in range(0, len(scenarios), self.chunk_size):
+            pending.append(self.submit(scenarios[start:start + self.chunk_size]))
+            if len(pending) >= 2 * self.workers:
+                yield self.collect(pending.popleft())
+        while pending:
+            yield self.collect(pending.popleft())
+
+    def evaluate(self, scenarios):
+        """Yield ``(scenario, (simulation_df, comparison_df), cached)`` for each scenario, in order."""
+        for chunk in self.evaluate_chunks(scenarios):
+            yield from chunk
+
+
+def summary_row(scenario, result, cached):
+    simulation_df, _ = result
+    last = simulation_df.iloc[-1]
+    return {
+        'scenario': scenario.index,
+        'id': scenario.id,
+        'key': scenario.key,
+        'months': int(last['month']),
+        'initial_capital': float(scenario.params.initial_capital),
+        'ending_capital': float(last['capital']),
+        'total_profit': float(last['capital'] - scenario.params.initial_capital),
+        'accumulated_return': float(last['accumulated_return']),
+        'cached': cached
+    }
+
+
+def monthly_rows(scenario, result):
+    simulation_df, _ = result
+    allocation_columns = [f'{name}_capital' for name in scenario.params.allocations]
+    for row in simulation_df.to_dict('records'):
+        yield {
+            'scenario': scenario.index,
+            'id': scenario.id,
+            'month': int(row['month']),
+            'capital': float(row['capital']),
+            'profit': float(row['profit']),
+            'return_rate': float(row['return_rate']),
+            'accumulated_return': float(row['accumulated_return']),
+            'allocation_capital': [(column[:-len('_capital')], float(row[column])) for column in allocation_columns]
+        }
+
+
+def result_rows(results, detail='summary'):
+    for scenario, result, cached in results:
+        if detail == 'monthly':
+            yield from monthly_rows(scenario, result)
+        else:
+            yield summary_row(scenario, result, cached)
+
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def result_batches(chunks, detail='summary', batch_rows=BATCH_ROWS):
+    # One or more row batches per evaluated chunk, so each chunk is written as soon as it's simulated
+    for chunk in chunks:
+        yield from _batches(result_rows(chunk, detail), batch_rows)
+
+
+def write_rows(batches, out, output_format='ndjson', detail='summary'):
+    """Write lists of rows to the binary file-like ``out`` as NDJSON or an Arrow IPC stream, flushing after each."""
+    if output_format == 'ndjson':
+        for batch in batches:
+            for row in batch:
+                if detail == 'monthly':
+                    row = {**row, 'allocation_capital': dict(row['allocation_capital'])}
+                out.write((json.dumps(row) + '\n').encode())
+            out.flush()
+    elif output_format == 'arrow':
+        schema = SCHEMAS[detail]
+        with pa.ipc.new_stream(out, schema) as writer:
+            for batch in batches:
+                writer.write_batch(pa.RecordBatch.from_pylist(batch, schema=schema))
+                out.flush()
+    else:
+        raise ValueError(f"Unknown output format '{output_format}'")
+
+
+def evaluate_specs(specs, out, evaluator=None, output_format='ndjson', detail='summary'):
+    """Evaluate a list of specs and stream the results to ``out``."""
+    if detail not in DETAILS:
+        raise ValueError(f"Unknown detail '{detail}'")
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format '{output_format}'")
+    evaluator = evaluator or ScenarioEvaluator()
+    scenarios = build_scenarios(specs)
+    write_rows(result_batches(evaluator.evaluate_chunks(scenarios), detail), out, output_format, detail)
+
+
+class _ChunkedWriter:
+    # File-like wrapper that sends each write as one HTTP/1.1 chunk
+    def __init__(self, wfile):
+        self.wfile = wfile
+        self.closed = False
+
+    def write(self, data):
+        if data:
+            self.wfile.write(f'{len(data):X}\r\n'.encode() + bytes(data) + b'\r\n')
+        return len(data)
+
+    def flush(self):
+        self.wfile.flush()
+
+    def finish(self):
+        self.wfile.write(b'0\r\n\r\n')
+        self.wfile.flush()
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        logger.info("%s %s", self.address_string(), format % args)
+
+    def send_json(self, status, value):
+        body = json.dumps(value).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', CONTENT_TYPES['json'])
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if urlparse(self.path).path != '/health':
+            self.send_json(404, {'error': f"Unknown path {self.path}"})
+            return
+        evaluator = self.server.evaluator
+        self.send_json(200, {'status': 'ok', 'workers': evaluator.workers, 'cache': evaluator.cache.stats()})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != '/evaluate':
+            self.send_json(404, {'error': f"Unknown path {self.path}"})
+            return
+
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        output_format = query.get('format', 'ndjson')
+        detail = query.get('detail', 'summary')
+        content_type = self.headers.get('Content-Type', '').split(';')[0].strip()
+        input_format = query.get('input') or next(
+            (name for name in INPUT_FORMATS if CONTENT_TYPES[name] == content_type), 'json'
+        )
+
+        try:
+            if output_format not in OUTPUT_FORMATS:
+                raise ValueError(f"Unknown output format '{output_format}'")
+            if detail not in DETAILS:
+                raise ValueError(f"Unknown detail '{detail}'")
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            scenarios = build_scenarios(read_specs(body.decode(), input_format))
+        except (ValueError, TypeError, KeyError) as e:
+            self.send_json(400, {'error': str(e)})
+            return
+
+        # Results stream a chunk at a time as they are simulated, but the first chunk is awaited
+        # before the status, so a request whose simulations fail outright still gets an error response
+        chunks = self.server.evaluator.evaluate_chunks(scenarios)
+        try:
+            first = list(itertools.islice(chunks, 1))
+        except Exception as e:
+            logger.exception("Evaluating %d scenarios failed", len(scenarios))
+            self.send_json(500, {'error': f"Evaluating scenarios failed: {e}"})
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPES[output_format])
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        out = _ChunkedWriter(self.wfile)
+        try:
+            write_rows(result_batches(itertools.chain(first, chunks), detail), out, output_format, detail)
+        except Exception:
+            # The status has already been sent, so close without the final chunk, which clients
+            # report as a truncated response, and leave the details in the log
+            logger.exception("Evaluating %d scenarios failed", len(scenarios))
+            self.close_connection = True
+            return
+        out.finish()
+
+
+class ApiServer(ThreadingHTTPServer):
+    """Local HTTP API: ``POST /evaluate`` and ``GET /health``, one thread per request."""
+
+    daemon_threads = True
+
+    def __init__(self, evaluator=None, host='127.0.0.1', port=DEFAULT_PORT):
+        super().__init__((host, port), ApiHandler)
+        self.evaluator = evaluator or ScenarioEvaluator()
+        self.thread = None
+
+    def start(self):
+        """Serve from a background thread."""
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.serve_forever, name='api-server', daemon=True)
+            self.thread.start()
+        return self
+
+
+def input_format_for(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        return 'csv'
+    if extension in ('.ndjson', '.jsonl'):
+        return 'ndjson'
+    return 'json'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    evaluate = commands.add_parser('evaluate', help="Evaluate a file of scenario specs")
+    evaluate.add_argument('specs', help="JSON, NDJSON or CSV file of scenario specs, or - for stdin")
+    evaluate.add_argument('--input-format', choices=INPUT_FORMATS, help="Defaults to the file extension, or json")
+    evaluate.add_argument('--format', choices=OUTPUT_FORMATS, default='ndjson')
+    evaluate.add_argument('--detail', choices=DETAILS, default='summary')
+    evaluate.add_argument('--workers', type=int, help="Pool size, defaults to the number of cores")
+    evaluate.add_argument('--output', help="Output file, defaults to stdout")
+
+    serve = commands.add_parser('serve', help="Run the HTTP API")
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=DEFAULT_PORT)
+    serve.add_argument('--workers', type=int, help="Pool size, defaults to the number of cores")
+
+    args = parser.parse_args(argv)
+    evaluator = ScenarioEvaluator(workers=args.workers)
+
+    try:
+        if args.command == 'serve':
+            logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+            server = ApiServer(evaluator, args.host, args.port)
+            print(f"Serving on http://{args.host}:{args.port}", file=sys.stderr)
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+            return 0
+
+        if args.specs == '-':
+            text = sys.stdin.read()
+        else:
+            with open(args.specs) as f:
+                text = f.read()
+        specs = read_specs(text, args.input_format or input_format_for(args.specs))
+
+        if args.output:
+            with open(args.output, 'wb') as out:
+                evaluate_specs(specs, out, evaluator, args.format, args.detail)
+        else:
+            evaluate_specs(specs, sys.stdout.buffer, evaluator, args.format, args.detail)
+        return 0
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    except BrokenPipeError:
+        # The reader went away (e.g. piped into head); don't report it again when stdout is flushed at exit
+        sys.stdout = None
+        return 0
+    finally:
+        evaluator.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
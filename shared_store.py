@@ -0,0 +1,202 @@
+"""Process-wide store of heavy results for running one dashboard for many users.
+
+In server mode every session's simulations, sweeps, Monte Carlo bands and
+other heavy results live once in a ``SharedStore``, keyed on their inputs,
+and a session holds only a ``SessionHandles`` object in ``st.session_state``
+naming the entries it currently uses. Each entry counts the handles on it:
+entries in use are never evicted, entries nobody holds stay around for
+reuse (least recently used first out) up to ``max_idle_entries``. A
+session's handles are released when its state is garbage collected, so a
+closed browser tab gives its entries back.
+
+Computations are single-flight: if several sessions ask for the same key
+at once, the first computes it and the others wait for that result instead
+of computing it again.
+
+Values are shared between sessions and must not be modified.
+"""
+import hashlib
+import json
+import os
+import sys
+import threading
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass, fields, is_dataclass
+
+import numpy as np
+import pandas as pd
+
+# Set to 1 to serve heavy results from the shared store instead of per-call st.cache_data copies
+SERVER_MODE_VARIABLE = 'DASHBOARD_SERVER_MODE'
+
+
+def server_mode_enabled():
+    return os.environ.get(SERVER_MODE_VARIABLE, '').lower() in ('1', 'true', 'yes')
+
+
+def result_key(name, *args):
+    """Stable key of a computation ``name`` over JSON-like ``args``."""
+    payload = json.dumps([name, args], sort_keys=True, separators=(',', ':'), default=repr)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def approximate_size(value):
+    """Rough size in bytes of a result: DataFrames, arrays, dataclasses and containers of them."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if is_dataclass(value) and not isinstance(value, type):
+        return sum(approximate_size(getattr(value, f.name)) for f in fields(value))
+    if isinstance(value, dict):
+        return sum(approximate_size(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(approximate_size(item) for item in value)
+    return sys.getsizeof(value)
+
+
+@dataclass
+class _Entry:
+    value: object
+    size: int
+    references: int = 0
+
+
+class _Flight:
+    # A computation in progress, which other callers of the same key wait on
+    def __init__(self):
+        self.done = threading.Event()
+        self.error = None
+
+
+class SharedStore:
+    """Reference-counted, single-flight store of results shared by every session."""
+
+    def __init__(self, max_idle_entries=128):
+        self.max_idle_entries = max_idle_entries
+        self.entries = {}
+        self.idle = OrderedDict()
+        self.flights = {}
+        self.lock = threading.Lock()
+        self.sessions = 0
+        self.hits = 0
+        self.computed = 0
+        self.coalesced = 0
+
+    def acquire(self, key, compute):
+        """Value for ``key``, from ``compute()`` if no one has it yet, with a reference held until ``release(key)``."""
+        while True:
+            with self.lock:
+                entry = self.entries.get(key)
+                if entry is not None:
+                    entry.references += 1
+                    self.idle.pop(key, None)
+                    self.hits += 1
+                    return entry.value
+
+                flight = self.flights.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self.flights[key] = _Flight()
+                else:
+                    self.coalesced += 1
+
+            if not leader:
+                # Take a reference to the leader's result once it lands (or compute again if it failed)
+                flight.done.wait()
+                continue
+
+            try:
+                value = compute()
+            except BaseException as e:
+                with self.lock:
+                    del self.flights[key]
+                flight.error = e
+                flight.done.set()
+                raise
+
+            with self.lock:
+                self.entries[key] = _Entry(value, approximate_size(value), references=1)
+                del self.flights[key]
+                self.computed += 1
+            flight.done.set()
+            return value
+
+    def value(self, key):
+        """Value of an entry the caller holds a reference to."""
+        with self.lock:
+            return self.entries[key].value
+
+    def release(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry.references == 0:
+                return
+            entry.references -= 1
+            if entry.references == 0:
+                self.idle[key] = None
+                while len(self.idle) > self.max_idle_entries:
+                    evicted, _ = self.idle.popitem(last=False)
+                    del self.entries[evicted]
+
+    def session_opened(self):
+        with self.lock:
+            self.sessions += 1
+
+    def session_closed(self, keys):
+        for key in keys:
+            self.release(key)
+        with self.lock:
+            self.sessions -= 1
+
+    def stats(self):
+        with self.lock:
+            held = [entry for entry in self.entries.values() if entry.references]
+            return {
+                'entries': len(self.entries),
+                'held': len(held),
+                'references': sum(entry.references for entry in held),
+                'bytes': sum(entry.size for entry in self.entries.values()),
+                'sessions': self.sessions,
+                'hits': self.hits,
+                'computed': self.computed,
+                'coalesced': self.coalesced
+            }
+
+
+class SessionHandles:
+    """The entries one session holds on a ``SharedStore``, one per named slot.
+
+    Getting a new key for a slot releases the slot's previous entry, so a
+    session holds at most one result per kind of computation.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.keys = {}
+        store.session_opened()
+        # Runs when the session's state is garbage collected; must not reference self
+        self._finalizer = weakref.finalize(self, SessionHandles._release, store, self.keys)
+
+    @staticmethod
+    def _release(store, keys):
+        store.session_closed(list(keys.values()))
+        keys.clear()
+
+    def get(self, slot, key, compute):
+        """Shared value for ``key``, held in ``slot`` until the slot moves to another key or the session ends."""
+        if self.keys.get(slot) == key:
+            return self.store.value(key)
+
+        value = self.store.acquire(key, compute)
+        previous = self.keys.get(slot)
+        self.keys[slot] = key
+        if previous is not None:
+            self.store.release(previous)
+        return value
+
+    def close(self):
+        self._finalizer()
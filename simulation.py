@@ -0,0 +1,180 @@
+"""Headless simulation engine for the crypto arbitrage dashboard.
+
+Nothing in this module imports Streamlit or Plotly, so batch jobs, tests and
+benchmarks can run a simulation straight from a ``SimulationParams`` object.
+Platforms and their default allocations come from the registry in
+``platforms.py``.
+"""
+from dataclasses import asdict, dataclass, field, fields
+
+import numpy as np
+import pandas as pd
+
+from platforms import REGISTRY, platform_arrays
+
+
+def default_platform_data():
+    return REGISTRY.platform_data()
+
+
+def default_allocations():
+    return REGISTRY.default_allocations()
+
+
+@dataclass
+class SimulationParams:
+    initial_capital: float = 4000
+    months: int = 12
+    spread_percentage: float = 5.5
+    reinvestment_rate: float = 100
+    cycles_per_month: float = 15
+
+    # Capital distribution, keyed by allocation name
+    allocations: dict = field(default_factory=default_allocations)
+
+    platform_data: dict = field(default_factory=default_platform_data)
+
+    @classmethod
+    def from_mapping(cls, values):
+        """Build parameters from any mapping holding the same keys, e.g. ``st.session_state``.
+
+        Allocations may be given as an ``allocations`` dict or as one
+        ``<name>_capital`` key per registry allocation.
+        """
+        kwargs = {f.name: values[f.name] for f in fields(cls) if f.name in values}
+        if 'allocations' not in kwargs:
+            allocations = {
+                name: values[f'{name}_capital'] for name in REGISTRY.allocations if f'{name}_capital' in values
+            }
+            if allocations:
+                kwargs['allocations'] = allocations
+        return cls(**kwargs)
+
+    def to_dict(self):
+        return asdict(self)
+
+    def to_mapping(self):
+        """Flat inverse of ``from_mapping``, with one ``<name>_capital`` key per allocation."""
+        values = self.to_dict()
+        allocations = values.pop('allocations')
+        values.update({f'{name}_capital': capital for name, capital in allocations.items()})
+        return values
+
+    def allocation_platforms(self):
+        """Platform key behind each allocation, in allocation order."""
+        return [REGISTRY.platform_for(name) for name in self.allocations]
+
+    def allocation_vector(self):
+        return np.array(list(self.allocations.values()), dtype=float)
+
+
+# Calculate profit for a specific platform
+def calculate_platform_profit(params, platform_key, capital):
+    if platform_key not in params.platform_data:
+        return 0
+
+    platform = params.platform_data[platform_key]
+    fee = platform['fee']
+    transfer_time = platform['transfer_time']
+    daily_limit = platform['daily_limit']
+
+    # Effective capital is limited by daily limit
+    effective_capital = min(capital, daily_limit * 30)
+
+    # Calculate cycles based on time and capital constraints
+    time_based_cycles = params.cycles_per_month * (720 / (720 + transfer_time))
+    capital_based_cycles = np.floor(30 * effective_capital / daily_limit)
+    adjusted_cycles = min(time_based_cycles, capital_based_cycles)
+
+    # Calculate profit
+    cycle_profit = (params.spread_percentage - fee) / 100
+    monthly_return = np.power(1 + cycle_profit, adjusted_cycles) - 1
+
+    return capital * monthly_return
+
+
+# Calculate profit for every allocation at once, given an array of their capital
+def calculate_platform_profits(params, capitals):
+    fee, transfer_time, daily_limit = platform_arrays(params.platform_data, params.allocation_platforms())
+
+    # Effective capital is limited by daily limit
+    effective_capital = np.minimum(capitals, daily_limit * 30)
+
+    # Calculate cycles based on time and capital constraints
+    time_based_cycles = params.cycles_per_month * (720 / (720 + transfer_time))
+    capital_based_cycles = np.floor(30 * effective_capital / daily_limit)
+    adjusted_cycles = np.minimum(time_based_cycles, capital_based_cycles)
+
+    # Calculate profit
+    cycle_profit = (params.spread_percentage - fee) / 100
+    monthly_return = np.power(1 + cycle_profit, adjusted_cycles) - 1
+
+    return capitals * monthly_return
+
+
+# Run the simulation
+def run_simulation(params):
+    sim_data = []
+    comp_data = []
+
+    # Initial state
+    current_capital = params.initial_capital
+    previous_capital = params.initial_capital
+    names = list(params.allocations)
+    capitals = params.allocation_vector()
+
+    # Simulate month by month
+    for month in range(params.months + 1):
+        if month == 0:
+            # Initial month
+            row = {'month': month, 'capital': params.initial_capital, 'profit': 0}
+            row.update({f'{name}_capital': capital for name, capital in params.allocations.items()})
+            row.update({'return_rate': 0, 'accumulated_return': 0})
+            sim_data.append(row)
+        else:
+            # Calculate total profit from all platforms for this month
+            monthly_profit = calculate_platform_profits(params, capitals).sum()
+            monthly_return = monthly_profit / current_capital
+
+            # Apply reinvestment
+            reinvested_profit = monthly_profit * params.reinvestment_rate / 100
+            current_capital = previous_capital + reinvested_profit
+
+            # Distribute reinvested profits proportionally
+            total_previous = previous_capital
+            capitals = capitals + reinvested_profit * (capitals / total_previous)
+
+            # Record data
+            row = {'month': month, 'capital': round(current_capital, 2), 'profit': round(monthly_profit, 2)}
+            row.update({f'{name}_capital': round(capital, 2) for name, capital in zip(names, capitals)})
+            row.update({
+                'return_rate': round(monthly_return * 100, 2),
+                'accumulated_return': round((current_capital / params.initial_capital - 1) * 100, 2)
+            })
+            sim_data.append(row)
+
+            previous_capital = current_capital
+
+    # Generate comparison data for each platform
+    for key, platform in params.platform_data.items():
+        adjusted_cycles = min(
+            params.cycles_per_month * (720 / (720 + platform['transfer_time'])),
+            np.floor(30 * params.initial_capital / platform['daily_limit'])
+        )
+
+        cycle_profit = (params.spread_percentage - platform['fee']) / 100
+        monthly_return = np.power(1 + cycle_profit, adjusted_cycles) - 1
+        yearly_return = np.power(1 + monthly_return, 12) - 1
+
+        comp_data.append({
+            'platform': key,
+            'fee': platform['fee'],
+            'transfer_time': platform['transfer_time'],
+            'daily_limit': platform['daily_limit'],
+            'monthly_volume': platform['daily_limit'] * 30,
+            'cycles_per_month': round(adjusted_cycles, 1),
+            'monthly_return': round(monthly_return * 100, 2),
+            'yearly_return': round(yearly_return * 100, 2)
+        })
+
+    return pd.DataFrame(sim_data), pd.DataFrame(comp_data)
@@ -0,0 +1,31 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# The engine modules live at the repository root rather than in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simulation import SimulationParams  # noqa: E402
+
+
+def random_params(rng, months=None):
+    """Random ``SimulationParams`` over the dashboard's input ranges, with some fees edited."""
+    params = SimulationParams(
+        initial_capital=int(rng.integers(1000, 20000)),
+        months=int(rng.integers(1, 60)) if months is None else months,
+        spread_percentage=float(np.round(rng.uniform(0.1, 10), 1)),
+        reinvestment_rate=int(rng.integers(0, 21)) * 5,
+        cycles_per_month=int(rng.integers(1, 31))
+    )
+    params.allocations = {name: int(rng.integers(0, 50)) * 100 for name in params.allocations}
+    if rng.random() < 0.3:
+        key = rng.choice(list(params.platform_data))
+        params.platform_data[key]['fee'] = float(np.round(rng.uniform(0, 2), 2))
+    return params
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(0)
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from backtest import read_ticks, run_backtest
+from simulation import SimulationParams
+
+START = 1_700_000_000
+
+
+@pytest.fixture
+def ticks(rng):
+    # Ten-minute quotes over 40 days, with venues drifting apart enough to trade now and then
+    params = SimulationParams()
+    venues = list(dict.fromkeys(params.allocation_platforms()))
+    times = np.arange(START, START + 40 * 86400, 600)
+    timestamps = np.repeat(times, len(venues)).astype(float)
+    mid = 60000 * (1 + rng.normal(0, 0.02, len(timestamps)))
+    return pd.DataFrame({
+        'timestamp': timestamps,
+        'venue': np.tile(venues, len(times)),
+        'bid': mid * 0.9995,
+        'ask': mid * 1.0005
+    })
+
+
+def write_parquet(frame, path, timestamp_type):
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    microseconds = pa.array(frame['timestamp'].to_numpy().astype(np.int64) * 1_000_000)
+    table = table.set_column(0, 'timestamp', microseconds.cast(pa.timestamp('us')).cast(timestamp_type))
+    pq.write_table(table, path)
+
+
+@pytest.mark.parametrize('timestamp_type', [
+    pa.timestamp('us'), pa.timestamp('us', tz='UTC'), pa.timestamp('ns'), pa.timestamp('ms', tz='America/New_York')
+])
+def test_datetime_timestamps_read_as_epoch_seconds(ticks, tmp_path, timestamp_type):
+    path = str(tmp_path / 'ticks.parquet')
+    write_parquet(ticks, path, timestamp_type)
+    chunks = list(read_ticks(path, chunk_rows=1000))
+    assert len(chunks) > 1
+    timestamps = pd.concat(chunks)['timestamp']
+    assert timestamps.dtype == float
+    np.testing.assert_array_equal(timestamps.to_numpy(), ticks['timestamp'].to_numpy())
+
+
+def test_backtest_is_the_same_for_any_timestamp_encoding(ticks, tmp_path):
+    params = SimulationParams(months=1)
+    ticks.to_csv(tmp_path / 'ticks.csv', index=False)
+    expected = run_backtest(params, str(tmp_path / 'ticks.csv'), bucket_seconds=600)
+    assert expected.actionable_buckets > 0
+    assert expected.start == START
+
+    write_parquet(ticks, str(tmp_path / 'ticks.parquet'), pa.timestamp('us', tz='UTC'))
+    result = run_backtest(params, str(tmp_path / 'ticks.parquet'), bucket_seconds=600)
+    pd.testing.assert_frame_equal(result.simulation_df, expected.simulation_df)
+    pd.testing.assert_frame_equal(result.trades_df, expected.trades_df)
+    assert result.buckets == expected.buckets
+
+
+def test_iso_timestamp_strings(ticks, tmp_path):
+    params = SimulationParams(months=1)
+    ticks.to_csv(tmp_path / 'epoch.csv', index=False)
+    expected = run_backtest(params, str(tmp_path / 'epoch.csv'), bucket_seconds=600)
+
+    times = pd.to_datetime(ticks['timestamp'], unit='s')
+    for name, strings in (('naive', times.dt.strftime('%Y-%m-%dT%H:%M:%S')),
+                          ('offset', times.dt.tz_localize('UTC').dt.tz_convert('Asia/Tokyo').map(pd.Timestamp.isoformat))):
+        path = str(tmp_path / f'{name}.csv')
+        ticks.assign(timestamp=strings).to_csv(path, index=False)
+        result = run_backtest(params, path, bucket_seconds=600)
+        pd.testing.assert_frame_equal(result.simulation_df, expected.simulation_df)
+        assert result.start == START
+
+
+def test_results_do_not_depend_on_chunk_size(ticks, tmp_path):
+    # A selling venue outside the allocations only starts quoting after the first chunks, with bids worth trading
+    late = ticks[ticks['timestamp'] >= START + 5 * 86400].drop_duplicates('timestamp').assign(venue='otc_desk')
+    late = late.assign(bid=late['bid'] * 1.01, ask=late['ask'] * 1.01)
+    path = str(tmp_path / 'ticks.csv')
+    pd.concat([ticks, late]).sort_values('timestamp', kind='stable').to_csv(path, index=False)
+
+    params = SimulationParams(months=1)
+    expected = run_backtest(params, path, bucket_seconds=600)
+    assert expected.trades_df['trades'].sum() > 0
+    for chunk_rows in (1000, 4999):
+        result = run_backtest(params, path, bucket_seconds=600, chunk_rows=chunk_rows)
+        pd.testing.assert_frame_equal(result.simulation_df, expected.simulation_df)
+        pd.testing.assert_frame_equal(result.trades_df, expected.trades_df)
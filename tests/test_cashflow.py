@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from cashflow import HOURS_PER_DAY, HOURS_PER_MONTH, monthly_row, simulate_cashflows
+from conftest import random_params
+from platforms import platform_arrays
+from simulation import SimulationParams, run_simulation
+
+
+def stepped_cashflows(params, step_hours):
+    """The cashflow model visiting every step, as a reference for the event-driven loop."""
+    fee, transfer_time, daily_limit = platform_arrays(params.platform_data, params.allocation_platforms())
+    day_steps = HOURS_PER_DAY // step_hours
+    month_steps = HOURS_PER_MONTH // step_hours
+    delay_steps = np.maximum(np.ceil((HOURS_PER_MONTH / params.cycles_per_month + transfer_time)
+                                     / step_hours).astype(np.int64), 1)
+    horizon = params.months * month_steps
+
+    available = params.allocation_vector()
+    in_transit = np.zeros(len(fee))
+    remaining_limit = np.zeros(len(fee))
+    idle_capital = params.initial_capital - available.sum()
+    arrival_principal = np.zeros((len(fee), horizon + int(delay_steps.max()) + 1))
+    arrival_profit = np.zeros_like(arrival_principal)
+
+    realized_profit = month_start_profit = 0.0
+    month_start_capital = float(params.initial_capital)
+    rows = [monthly_row(0, month_start_capital, 0.0, params.allocations, available, month_start_capital,
+                        params.initial_capital)]
+    for step in range(horizon):
+        available += arrival_principal[:, step] + arrival_profit[:, step] * params.reinvestment_rate / 100
+        in_transit -= arrival_principal[:, step]
+        realized_profit += arrival_profit[:, step].sum()
+        if step % day_steps == 0:
+            remaining_limit[:] = daily_limit
+
+        deploy = np.minimum(available, remaining_limit)
+        available -= deploy
+        remaining_limit -= deploy
+        in_transit += deploy
+        arrival_principal[np.arange(len(fee)), step + delay_steps] += deploy
+        arrival_profit[np.arange(len(fee)), step + delay_steps] += deploy * (params.spread_percentage - fee) / 100
+
+        if (step + 1) % month_steps == 0:
+            capital = idle_capital + (available + in_transit).sum()
+            rows.append(monthly_row((step + 1) // month_steps, capital, realized_profit - month_start_profit,
+                                    params.allocations, available + in_transit, month_start_capital,
+                                    params.initial_capital))
+            month_start_profit = realized_profit
+            month_start_capital = capital
+    return pd.DataFrame(rows)
+
+
+@pytest.mark.parametrize('step_hours', [24, 1])
+def test_same_schema_as_run_simulation(step_hours):
+    params = SimulationParams(months=6)
+    cashflows = simulate_cashflows(params, step_hours)
+    expected = run_simulation(params)[0]
+    assert list(cashflows.columns) == list(expected.columns)
+    assert list(cashflows['month']) == list(range(7))
+    assert cashflows['capital'].iloc[0] == params.initial_capital
+
+
+@pytest.mark.parametrize('step_hours', [24, 1])
+def test_capital_is_conserved_without_reinvestment(step_hours):
+    params = SimulationParams(months=6, reinvestment_rate=0)
+    cashflows = simulate_cashflows(params, step_hours)
+    np.testing.assert_allclose(cashflows['capital'], params.initial_capital)
+    assert (cashflows['profit'].iloc[1:] > 0).all()
+
+
+def test_profit_follows_daily_limit():
+    # $1,000 at 5.5% with no fee, locked for two days a cycle (48h execution, no transfer time), so it
+    # goes out on days 0, 2, ..., 28 and the last cycle's profit is booked when it lands in month 2
+    params = SimulationParams(initial_capital=1000, months=1, reinvestment_rate=0, cycles_per_month=15)
+    params.allocations = {name: 1000 if name == 'robinhood' else 0 for name in params.allocations}
+    params.platform_data['robinhood'] = {'fee': 0, 'transfer_time': 0, 'daily_limit': 1000}
+    cashflows = simulate_cashflows(params)
+    assert cashflows['profit'].iloc[1] == pytest.approx(14 * 1000 * 0.055)
+
+
+def test_rejects_uneven_steps():
+    with pytest.raises(ValueError):
+        simulate_cashflows(SimulationParams(), step_hours=5)
+
+
+def test_hourly_jumps_reset_daily_limits():
+    # Jumping to the next arrival skips midnight steps; the limit must still reset on the next day
+    params = SimulationParams(initial_capital=1000, months=3, cycles_per_month=7)
+    params.allocations = {name: 1000 if name == 'robinhood' else 0 for name in params.allocations}
+    cashflows = simulate_cashflows(params, step_hours=1)
+    pd.testing.assert_frame_equal(cashflows, stepped_cashflows(params, 1))
+    assert cashflows['capital'].iloc[2] == 1783.39
+
+
+@pytest.mark.parametrize('step_hours', [24, 6, 1])
+def test_event_loop_matches_every_step(rng, step_hours):
+    for _ in range(10):
+        params = random_params(rng, months=int(rng.integers(1, 7)))
+        pd.testing.assert_frame_equal(simulate_cashflows(params, step_hours), stepped_cashflows(params, step_hours))
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+
+from batch import simulate_batch, simulate_variations
+from conftest import random_params
+from simulation import SimulationParams, calculate_platform_profit, calculate_platform_profits, run_simulation
+
+
+def test_vectorized_profits_match_per_platform(rng):
+    for _ in range(50):
+        params = random_params(rng)
+        capitals = params.allocation_vector()
+        expected = [calculate_platform_profit(params, key, capital)
+                    for key, capital in zip(params.allocation_platforms(), capitals)]
+        np.testing.assert_allclose(calculate_platform_profits(params, capitals), expected, rtol=1e-12)
+
+
+def test_default_run():
+    simulation_df, comparison_df = run_simulation(SimulationParams())
+    assert len(simulation_df) == 13
+    assert simulation_df['capital'].iloc[0] == 4000
+    assert list(comparison_df['platform']) == list(SimulationParams().platform_data)
+
+
+def test_batch_matches_run_simulation(rng):
+    scenarios = [random_params(rng, months=24) for _ in range(100)]
+    result = simulate_batch(
+        [p.initial_capital for p in scenarios],
+        [p.spread_percentage for p in scenarios],
+        [p.cycles_per_month for p in scenarios],
+        [p.reinvestment_rate for p in scenarios],
+        np.array([p.allocation_vector() for p in scenarios]),
+        24
+    )
+    for i, params in enumerate(scenarios):
+        # Edited fees aren't per-scenario in simulate_batch, so only compare default platforms
+        if params.platform_data != SimulationParams().platform_data:
+            continue
+        pd.testing.assert_frame_equal(result.to_frame(i), run_simulation(params)[0], check_dtype=False, rtol=1e-9)
+
+
+def test_variations_match_run_simulation():
+    params = SimulationParams(months=36)
+    spreads = np.array([1.0, 2.5, 5.5, 8.0])
+    result = simulate_variations(params, record_platforms=True, spread_percentage=spreads)
+    for i, spread in enumerate(spreads):
+        params.spread_percentage = spread
+        pd.testing.assert_frame_equal(result.to_frame(i), run_simulation(params)[0], check_dtype=False, rtol=1e-9)
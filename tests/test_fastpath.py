@@ -0,0 +1,33 @@
+import numpy as np
+
+from batch import simulate_batch
+from fastpath import project_batch, project_capital, project_variations
+from simulation import SimulationParams, run_simulation
+
+
+def test_project_batch_matches_iteration(rng):
+    n = 5000
+    inputs = dict(
+        initial_capital=rng.uniform(1000, 20000, n),
+        spread_percentage=rng.uniform(0, 3, n),
+        cycles_per_month=rng.integers(1, 31, n),
+        reinvestment_rate=rng.uniform(0, 100, n),
+        allocations=rng.uniform(0, 3000, (n, 4)) * (rng.random((n, 4)) > 0.2)
+    )
+    for months in (1, 12, 36, 120):
+        expected = simulate_batch(months=months, record_platforms=False, **inputs).ending_capital
+        np.testing.assert_allclose(project_batch(months=months, **inputs), expected, rtol=1e-9)
+
+
+def test_per_scenario_horizons():
+    params = SimulationParams()
+    months = np.array([1, 5, 12, 60])
+    for horizon, capital in zip(months, project_variations(params, months)):
+        params.months = int(horizon)
+        # run_simulation rounds to cents
+        np.testing.assert_allclose(capital, run_simulation(params)[0]['capital'].iloc[-1], rtol=1e-9, atol=0.005)
+
+
+def test_project_capital_matches_run_simulation():
+    params = SimulationParams(months=36)
+    np.testing.assert_allclose(project_capital(params), run_simulation(params)[0]['capital'].iloc[-1], rtol=1e-9)
@@ -0,0 +1,71 @@
+import copy
+
+import pandas as pd
+
+from conftest import random_params
+from incremental import IncrementalSimulation
+from results_cache import ResultsCache
+from simulation import SimulationParams, run_simulation
+
+
+def assert_same(actual, expected):
+    pd.testing.assert_frame_equal(actual[0], expected[0])
+    pd.testing.assert_frame_equal(actual[1], expected[1])
+
+
+def test_matches_run_simulation(rng):
+    engine = IncrementalSimulation()
+    for _ in range(400):
+        params = random_params(rng)
+        assert_same(engine.run(params), run_simulation(params))
+
+
+def test_recomputes_only_changed_pieces():
+    engine = IncrementalSimulation()
+    params = SimulationParams(months=36)
+    engine.run(params)
+
+    # An unfunded platform rebuilds its profile and row but reuses the allocation series
+    edited = copy.deepcopy(params)
+    edited.platform_data['cashapp_fast']['fee'] = 1.0
+    assert_same(engine.run(edited), run_simulation(edited))
+    assert engine.last_run['rebuilt_profiles'] == ['cashapp_fast']
+    assert engine.last_run['series'] == 'reused'
+
+    # A funded platform recomputes the series
+    funded = copy.deepcopy(edited)
+    funded.platform_data['kraken']['daily_limit'] = 6000
+    assert_same(engine.run(funded), run_simulation(funded))
+    assert engine.last_run['rebuilt_profiles'] == ['kraken']
+    assert engine.last_run['series'] == 'computed'
+
+    # Shorter horizons slice the cached series, longer ones extend it
+    shorter = copy.deepcopy(funded)
+    shorter.months = 12
+    assert_same(engine.run(shorter), run_simulation(shorter))
+    assert engine.last_run['series'] == 'reused'
+
+    longer = copy.deepcopy(funded)
+    longer.months = 120
+    assert_same(engine.run(longer), run_simulation(longer))
+    assert engine.last_run['series'] == 'extended'
+
+
+def test_results_cache_reports_its_own_misses():
+    cache = ResultsCache()
+    params = SimulationParams(months=24)
+    report = {}
+    cache.simulate(params, report=report)
+    assert report['series'] == 'computed'
+
+    # Another caller's miss doesn't change this caller's report, and a hit leaves the report empty
+    edited = copy.deepcopy(params)
+    edited.platform_data['kraken']['fee'] = 0.5
+    other = {}
+    cache.simulate(edited, report=other)
+    assert other['rebuilt_profiles'] == ['kraken']
+    assert report['rebuilt_profiles'] == list(params.platform_data)
+
+    hit = {}
+    cache.simulate(params, report=hit)
+    assert hit == {}
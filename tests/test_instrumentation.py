@@ -0,0 +1,25 @@
+from instrumentation import Instrumentation
+
+
+def test_fragment_reruns_are_timed_apart_from_reruns():
+    instrumentation = Instrumentation()
+    timer = instrumentation.rerun(enabled=True)
+    timer.mark('widgets')
+    timer.mark('widgets')
+    timer.finish()
+    assert timer.finished
+
+    fragment = instrumentation.fragment_rerun('sweep_section')
+    fragment.mark('sweep')
+    fragment.finish()
+
+    samples = {row['stage']: row['samples'] for row in instrumentation.stage_summary()}
+    assert samples == {'widgets': 1, 'total': 1, 'sweep': 1, 'sweep_section_total': 1}
+    assert instrumentation.reruns == 1
+
+
+def test_disabled_timer_still_finishes():
+    timer = Instrumentation().rerun(enabled=False)
+    timer.finish()
+    timer.finish()
+    assert timer.finished
@@ -0,0 +1,26 @@
+import numpy as np
+import pytest
+
+import montecarlo
+from montecarlo import MonteCarloConfig, run_monte_carlo, worker_pool
+from simulation import SimulationParams
+
+
+@pytest.fixture
+def pools():
+    yield
+    montecarlo.shutdown_pools()
+
+
+def test_pool_is_reused_and_matches_in_process(pools):
+    params = SimulationParams(months=12)
+    config = MonteCarloConfig(paths=2000, chunk_size=500, workers=2)
+    pooled = run_monte_carlo(params, config)
+    pool = worker_pool(2)
+    again = run_monte_carlo(params, config)
+    assert worker_pool(2) is pool
+
+    in_process = run_monte_carlo(params, MonteCarloConfig(paths=2000, chunk_size=500, workers=1))
+    for result in (again, in_process):
+        np.testing.assert_array_equal(result.capital_bands, pooled.capital_bands)
+        assert result.loss_probability == pooled.loss_probability
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from optimizer import evaluate_allocations, optimize_allocation
+from simulation import SimulationParams
+
+
+def test_best_allocation_beats_current():
+    params = SimulationParams(months=12)
+    result = optimize_allocation(params, max_candidates=5000)
+    best = result.best
+    assert best['ending_capital'] >= result.current_ending_capital
+    allocation = best[[f'{name}_capital' for name in params.allocations]].to_numpy(dtype=float)
+    assert allocation.sum() == pytest.approx(params.initial_capital)
+    assert evaluate_allocations(params, allocation[None, :])[0] == pytest.approx(best['ending_capital'])
+
+
+def test_capital_beyond_monthly_volume():
+    # More than every platform's 30 days of daily limits put together (about $705k by default)
+    params = SimulationParams(initial_capital=1_000_000, months=12)
+    result = optimize_allocation(params, max_candidates=5000)
+    allocation = result.best[[f'{name}_capital' for name in params.allocations]].to_numpy(dtype=float)
+    assert allocation.sum() == pytest.approx(1_000_000)
+    assert result.best['ending_capital'] >= result.current_ending_capital
+
+
+def test_max_transfer_time_excludes_platforms():
+    params = SimulationParams(months=12)
+    result = optimize_allocation(params, max_candidates=5000, max_transfer_time=24)
+    excluded = [name for name, key in zip(params.allocations, params.allocation_platforms())
+                if params.platform_data[key]['transfer_time'] > 24]
+    assert excluded
+    assert np.all(result.allocations[[f'{name}_capital' for name in excluded]] == 0)
+
+    with pytest.raises(ValueError):
+        optimize_allocation(params, max_transfer_time=-1)
@@ -0,0 +1,52 @@
+import asyncio
+
+import numpy as np
+
+from pricefeed import ReplayFeed, SpreadTracker, Tick, write_synthetic_replay
+
+
+def replay_ticks(feed, count):
+    async def collect():
+        ticks = []
+        async for tick in feed.stream():
+            ticks.append(tick)
+            if len(ticks) == count:
+                return ticks
+    return asyncio.run(collect())
+
+
+def test_looping_replay_keeps_moving_forward(tmp_path):
+    path = tmp_path / 'replay.csv'
+    write_synthetic_replay(path, ['kraken', 'coinbase'], seconds=10, ticks_per_second=20, start=1000)
+    ticks = replay_ticks(ReplayFeed(path, loop=True), 3 * 200)
+    timestamps = np.array([tick.timestamp for tick in ticks])
+
+    assert (np.diff(timestamps) > 0).all()
+    span = timestamps[199] - timestamps[0]
+    np.testing.assert_allclose(timestamps[200:400] - timestamps[:200], span + span / 199)
+    np.testing.assert_allclose(timestamps[400:] - timestamps[:200], 2 * (span + span / 199))
+
+
+def test_window_stays_bounded_over_replay_passes(tmp_path):
+    path = tmp_path / 'replay.csv'
+    write_synthetic_replay(path, ['kraken', 'coinbase'], seconds=10, ticks_per_second=20, start=1000)
+    tracker = SpreadTracker(window_seconds=5)
+    for tick in replay_ticks(ReplayFeed(path, loop=True), 10 * 200):
+        tracker.update(tick)
+
+    assert tracker.rejected == 0
+    assert len(tracker.history) <= 6 * 20
+    assert tracker.now - tracker.history[0][0] <= 5
+
+
+def test_ticks_going_backwards_are_rejected():
+    tracker = SpreadTracker(window_seconds=60, stale_seconds=5)
+    tracker.update(Tick(100.0, 'kraken', 'BTC-USD', 99.0, 100.0))
+    tracker.update(Tick(101.0, 'coinbase', 'BTC-USD', 101.0, 102.0))
+    tracker.update(Tick(10.0, 'kraken', 'BTC-USD', 99.0, 100.0))
+
+    assert tracker.rejected == 1
+    assert tracker.quotes['kraken'].timestamp == 100.0
+    assert [entry[0] for entry in tracker.history] == [101.0]
+    summary = tracker.summary()
+    assert summary['ticks'] == 2 and summary['rejected'] == 1
@@ -0,0 +1,75 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from platforms import PlatformRegistry
+from routes import BANK, Edge, RouteGraph, build_graph
+
+
+def brute_force_routes(platform_data, spread_percentage, registry, capital, cycles_per_month):
+    """Monthly profit of every exchange -> venue -> rail route, leg by leg."""
+    exchanges = [key for key in platform_data if registry.role(key) == 'exchange']
+    rails = [key for key in platform_data if registry.role(key) == 'rail']
+    routes = {}
+    for exchange, venue, rail in itertools.product(exchanges, registry.p2p_venues, rails):
+        buy, sell, back = platform_data[exchange], registry.p2p_venues[venue], platform_data[rail]
+        multiplier = ((1 - buy['fee'] / 100) * (1 + spread_percentage / 100) * (1 - sell['fee'] / 100)
+                      * (1 - back['fee'] / 100))
+        cycle_time = buy['transfer_time'] + sell['transfer_time'] + back['transfer_time']
+        daily_limit = min(buy['daily_limit'], back['daily_limit'])
+        cycles = min(cycles_per_month * 720 / (720 + cycle_time),
+                     np.floor(30 * min(capital, daily_limit * 30) / daily_limit))
+        routes[('bank', exchange, venue, rail, 'bank')] = capital * (multiplier ** cycles - 1)
+    return routes
+
+
+def random_registry(rng, exchanges, venues, rails):
+    platforms = {}
+    for i in range(exchanges):
+        platforms[f'exchange_{i}'] = {'fee': rng.uniform(0, 1), 'transfer_time': rng.choice([1, 24, 144, 400]),
+                                      'daily_limit': rng.choice([1000, 5000, 20000]), 'role': 'exchange'}
+    for i in range(rails):
+        platforms[f'rail_{i}'] = {'fee': rng.uniform(0, 2), 'transfer_time': rng.choice([1, 24, 48]),
+                                  'daily_limit': rng.choice([2500, 7500]), 'role': 'rail'}
+    p2p_venues = {f'venue_{i}': {'fee': rng.uniform(0, 0.5), 'transfer_time': rng.choice([0, 1, 12])}
+                  for i in range(venues)}
+    return PlatformRegistry(platforms, {}, p2p_venues)
+
+
+def ranked_routes(registry, spread_percentage, capital, cycles_per_month, k):
+    platform_data = registry.platform_data()
+    graph = RouteGraph(build_graph(platform_data, spread_percentage, registry))
+    return graph, graph.rank(capital, cycles_per_month, k, registry)
+
+
+@pytest.mark.parametrize('capital', [500, 20000, 1_000_000])
+def test_rank_matches_brute_force(rng, capital):
+    registry = random_registry(rng, exchanges=12, venues=3, rails=4)
+    expected = brute_force_routes(registry.platform_data(), 5.5, registry, capital, 15)
+    graph, routes = ranked_routes(registry, 5.5, capital, 15, k=20)
+
+    assert len(graph.routes) == len(expected) == 12 * 3 * 4
+    best = sorted(expected.values(), reverse=True)[:20]
+    np.testing.assert_allclose(routes['monthly_profit'], best, rtol=1e-12)
+    for path, profit in zip(routes['path'], routes['monthly_profit']):
+        assert expected[tuple(path)] == pytest.approx(profit, rel=1e-12)
+
+
+def test_fast_route_outranks_many_better_returning_slow_ones():
+    # 80 slow routes return more per cycle than the fast exchange's, but run a fraction of the cycles
+    platforms = {f'slow_{i}': {'fee': 0.1, 'transfer_time': 2000, 'daily_limit': 20000} for i in range(20)}
+    platforms['fast'] = {'fee': 0.3, 'transfer_time': 1, 'daily_limit': 20000}
+    platforms.update({f'rail_{i}': {'fee': 0, 'transfer_time': 1, 'daily_limit': 20000, 'role': 'rail'}
+                      for i in range(2)})
+    registry = PlatformRegistry(platforms, {}, {f'venue_{i}': {'fee': 0, 'transfer_time': 0} for i in range(2)})
+
+    _, routes = ranked_routes(registry, 5.5, 10000, 15, k=4)
+    assert [path[1] for path in routes['path']] == ['fast'] * 4
+
+
+def test_profitable_loop_away_from_the_bank_is_rejected():
+    edges = [Edge(BANK, 'exchange', 0.99, 1, 1000, 'exchange'), Edge('exchange', 'venue', 1.1, 0, np.inf, 'venue'),
+             Edge('venue', 'exchange', 1.0, 0, np.inf, 'venue'), Edge('venue', BANK, 0.99, 1, 1000, 'rail')]
+    with pytest.raises(ValueError, match='Profitable loop'):
+        RouteGraph(edges)
@@ -0,0 +1,11 @@
+import pytest
+
+from scheduler import plan_deployments
+from simulation import SimulationParams
+
+
+def test_moves_that_take_no_time_are_rejected():
+    params = SimulationParams()
+    plan_deployments(params, days=10, move_days=2)
+    with pytest.raises(ValueError, match='move_days'):
+        plan_deployments(params, days=10, move_days=0)
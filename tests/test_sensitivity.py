@@ -0,0 +1,60 @@
+import copy
+
+import numpy as np
+
+from sensitivity import sensitivity_analysis, sensitivity_inputs
+from simulation import SimulationParams, calculate_platform_profits, run_simulation
+
+
+def moved_params(params, key, value):
+    """Copy of ``params`` with the sensitivity input ``key`` set to ``value``."""
+    params = copy.deepcopy(params)
+    kind, _, name = key.partition(':')
+    if kind == 'allocation':
+        params.allocations[name] = value
+    elif name:
+        params.platform_data[name][kind] = value
+    else:
+        setattr(params, kind, value)
+    return params
+
+
+def ending_capital(params):
+    # Unrounded, from the same per-month formula as run_simulation
+    capital = float(params.initial_capital)
+    capitals = params.allocation_vector()
+    for _ in range(params.months):
+        reinvested = calculate_platform_profits(params, capitals).sum() * params.reinvestment_rate / 100
+        capitals = capitals + reinvested * capitals / capital
+        capital += reinvested
+    return capital
+
+
+def test_every_perturbed_row_matches_the_model():
+    params = SimulationParams(months=24)
+    analysis = sensitivity_analysis(params)
+    rows = analysis[analysis['output'] == 'ending_capital']
+    assert list(rows['input']) == [item.key for item in sensitivity_inputs(params)]
+
+    for row in rows.itertuples():
+        assert np.isclose(row.base, ending_capital(params), rtol=1e-9)
+        assert np.isclose(row.low, ending_capital(moved_params(params, row.input, row.low_value)), rtol=1e-9)
+        assert np.isclose(row.high, ending_capital(moved_params(params, row.input, row.high_value)), rtol=1e-9)
+
+
+def test_base_matches_run_simulation():
+    params = SimulationParams(months=24)
+    analysis = sensitivity_analysis(params).set_index(['output', 'input'])
+    simulation_df = run_simulation(params)[0]
+    assert np.isclose(analysis.loc[('ending_capital', 'spread_percentage'), 'base'],
+                      simulation_df['capital'].iloc[-1], atol=0.005)
+    assert np.isclose(analysis.loc[('accumulated_return', 'spread_percentage'), 'base'],
+                      simulation_df['accumulated_return'].iloc[-1], atol=0.005)
+
+
+def test_gradient_signs():
+    # Without reinvestment ending capital doesn't depend on the spread, and with full reinvestment it rises
+    params = SimulationParams(months=12, reinvestment_rate=0)
+    analysis = sensitivity_analysis(params).set_index(['output', 'input'])
+    assert analysis.loc[('ending_capital', 'spread_percentage'), 'gradient'] == 0
+    assert analysis.loc[('ending_capital', 'reinvestment_rate'), 'gradient'] > 0
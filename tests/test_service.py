@@ -0,0 +1,150 @@
+import http.client
+import io
+import json
+import urllib.error
+import urllib.request
+
+import pyarrow as pa
+import pytest
+
+import service
+from results_cache import ResultsCache
+from service import ApiServer, ScenarioEvaluator, build_scenario, evaluate_specs, read_specs
+from simulation import SimulationParams, run_simulation
+
+
+@pytest.fixture
+def evaluator():
+    return ScenarioEvaluator(ResultsCache(), workers=1)
+
+
+@pytest.fixture
+def server(evaluator):
+    server = ApiServer(evaluator, port=0).start()
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+    server.server_close()
+
+
+def post(url, body, content_type='application/json'):
+    request = urllib.request.Request(url, data=body.encode(), headers={'Content-Type': content_type})
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+
+
+def test_read_specs_formats():
+    assert read_specs('{"months": 3}') == [{'months': 3}]
+    assert read_specs('{"months": 3}\n\n{"months": 4}\n', 'ndjson') == [{'months': 3}, {'months': 4}]
+    assert read_specs('months,kraken_capital\n3,\n4,200\n', 'csv') == [{'months': 3}, {'months': 4, 'kraken_capital': 200}]
+
+
+def test_build_scenario_validation():
+    scenario = build_scenario(0, {'id': 7, 'months': 6, 'kraken_capital': 2000})
+    assert scenario.id == '7'
+    assert scenario.params.months == 6
+    assert scenario.params.allocations['kraken'] == 2000
+
+    assert build_scenario(0, {'step_hours': 0}).step_hours is None
+    assert build_scenario(0, {'step_hours': 6.0}).step_hours == 6
+
+    # Numbers in strings are coerced; numbers keep their type, and with it the dashboard's cache key
+    scenario = build_scenario(0, {'spread_percentage': '3.5', 'kraken_capital': '200'})
+    assert scenario.params.spread_percentage == 3.5
+    assert scenario.params.allocations['kraken'] == 200
+    assert build_scenario(0, {}).key == build_scenario(0, SimulationParams().to_mapping()).key
+
+    platform_data = SimulationParams().platform_data
+    for spec in ({'months': 0}, {'initial_capital': -1}, {'unknown_input': 1}, [1, 2],
+                 {'step_hours': 5}, {'step_hours': 1.5}, {'step_hours': -6}, {'step_hours': '24'},
+                 {'spread_percentage': 'wide'}, {'months': 'a year'}, {'cycles_per_month': None},
+                 {'kraken_capital': [1000]}, {'reinvestment_rate': float('nan')},
+                 {'allocations': {'kraken': 'all of it'}}, {'allocations': {'unlisted': 100}},
+                 {'platform_data': {**platform_data, 'kraken': {'fee': 0.26, 'transfer_time': 24}}},
+                 {'platform_data': {**platform_data, 'kraken': {'fee': 'low', 'transfer_time': 24, 'daily_limit': 5000}}},
+                 {'platform_data': {**platform_data, 'kraken': {'fee': 0.26, 'transfer_time': 24, 'daily_limit': 0}}}):
+        with pytest.raises(ValueError):
+            build_scenario(0, spec)
+
+
+def test_evaluate_specs_matches_run_simulation(evaluator):
+    specs = [{'id': 'a', 'months': 12}, {'id': 'b', 'months': 24, 'spread_percentage': 3}, {'id': 'a', 'months': 12}]
+    out = io.BytesIO()
+    evaluate_specs(specs, out, evaluator)
+    rows = [json.loads(line) for line in out.getvalue().splitlines()]
+
+    assert [row['id'] for row in rows] == ['a', 'b', 'a']
+    for spec, row in zip(specs, rows):
+        params = SimulationParams.from_mapping({**SimulationParams().to_mapping(), **spec})
+        assert row['ending_capital'] == run_simulation(params)[0]['capital'].iloc[-1]
+    assert [row['cached'] for row in rows] == [False, False, False]
+
+    # A second request is served from the cache
+    out = io.BytesIO()
+    evaluate_specs(specs[:1], out, evaluator)
+    assert json.loads(out.getvalue())['cached'] is True
+
+
+def test_monthly_arrow_output(evaluator):
+    out = io.BytesIO()
+    evaluate_specs([{'months': 6}, {'months': 3}], out, evaluator, output_format='arrow', detail='monthly')
+    table = pa.ipc.open_stream(out.getvalue()).read_all()
+    assert table.num_rows == 7 + 4
+    assert table.column('scenario').to_pylist() == [0] * 7 + [1] * 4
+
+
+def test_http_api(server):
+    with urllib.request.urlopen(f'{server}/health') as response:
+        assert json.loads(response.read())['status'] == 'ok'
+
+    status, body = post(f'{server}/evaluate', json.dumps([{'months': 6}, {'months': 12}]))
+    assert status == 200
+    assert [json.loads(line)['months'] for line in body.splitlines()] == [6, 12]
+
+    status, body = post(f'{server}/evaluate?format=arrow', 'months\n6\n', 'text/csv')
+    assert status == 200
+    assert pa.ipc.open_stream(body).read_all().num_rows == 1
+
+    status, body = post(f'{server}/evaluate', json.dumps({'months': 0}))
+    assert status == 400
+    assert 'at least one month' in json.loads(body)['error']
+
+    status, body = post(f'{server}/evaluate', json.dumps({'months': 3, 'step_hours': 5}))
+    assert status == 400
+    assert 'step_hours' in json.loads(body)['error']
+
+    status, body = post(f'{server}/evaluate', json.dumps([{'months': 3}, {'months': 3, 'spread_percentage': 'wide'}]))
+    assert status == 400
+    assert 'spread_percentage' in json.loads(body)['error']
+
+
+def test_http_api_reports_failed_evaluations(server, monkeypatch):
+    def fail(*args):
+        raise RuntimeError("worker died")
+    monkeypatch.setattr(service, 'compute_simulation', fail)
+
+    status, body = post(f'{server}/evaluate', json.dumps({'months': 6}))
+    assert status == 500
+    assert 'worker died' in json.loads(body)['error']
+
+
+def test_http_api_cuts_off_a_stream_that_fails_later(evaluator, server, monkeypatch):
+    # One scenario per chunk, so the first is written before the third fails
+    evaluator.chunk_size = 1
+    compute = service.compute_simulation
+
+    def fail_long_runs(engine, params, step_hours=None, report=None):
+        if params.months > 12:
+            raise RuntimeError("worker died")
+        return compute(engine, params, step_hours, report)
+    monkeypatch.setattr(service, 'compute_simulation', fail_long_runs)
+
+    request = urllib.request.Request(f'{server}/evaluate', data=json.dumps([{'months': 6}, {'months': 7}, {'months': 24}]).encode())
+    with urllib.request.urlopen(request) as response:
+        assert response.status == 200
+        with pytest.raises(http.client.IncompleteRead) as error:
+            response.read()
+    months = [json.loads(line)['months'] for line in error.value.partial.splitlines()]
+    assert months and months == [6, 7][:len(months)]